@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from swapo.response_cache import response_cache
+from .models import User
+from .serializers import PublicUserSerializer
+
+PUBLIC_FIELDS = set(PublicUserSerializer.Meta.fields)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """Responses showing the user's public profile; saves such as last_login alone leave them be."""
+    if update_fields is not None and not PUBLIC_FIELDS.intersection(update_fields):
+        return
+    response_cache.invalidate(f"user:{instance.user_id}")
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    response_cache.invalidate(f"user:{instance.user_id}")
@@ -22,6 +22,8 @@ from cloudinary.uploader import upload as cloudinary_upload
 
 from listings.models import PortfolioImage
 from listings.serializers import UserPortfolioImageSerializer
+from listings.views import listing_tags
+from swapo.response_cache import cached_response
 
 
 logger = logging.getLogger(__name__)
@@ -344,6 +346,16 @@ class OtherUserProfileView(generics.RetrieveAPIView):
     lookup_field = 'user_id'       
     lookup_url_kwarg = 'user_id'
 
+    # The same for every logged-in user, so cached across users but private to the client.
+    @cached_response(
+        tags=lambda data, user_id: [f"user:{user_id}", f"user-listings:{user_id}"] + [
+            tag for listing in data["listings"] for tag in listing_tags(listing)
+        ],
+        public=False,
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 class UserPortfolioImagesView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -0,0 +1,121 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from listings.models import SkillListing
+from listings.search import index_listings, listing_document
+from listings.serializers import SkillListingSerializer
+from listings.views import ListingSearchView, listing_queryset
+from skills.models import Skill
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark listing search against downloading every listing and filtering it client-side, '
+        'on synthetic listings (written in a transaction that is rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=100_000, help='Number of synthetic listings')
+        parser.add_argument('--users', type=int, default=2_000)
+        parser.add_argument('--skills', type=int, default=500)
+        parser.add_argument('--words', type=int, default=20_000, help='Vocabulary size of titles and descriptions')
+        parser.add_argument('--queries', type=int, default=200, help='Number of searches to time')
+        parser.add_argument('--baseline-runs', type=int, default=3, help='Number of full downloads to time')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options)
+            transaction.set_rollback(True)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        vocabulary = list({
+            ''.join(rng.choices(letters, k=rng.randint(3, 10))) for _ in range(options['words'])
+        })
+        # Word frequencies are skewed, as in real text.
+        cumulative, total = [], 0
+        for rank in range(len(vocabulary)):
+            total += 1 / (rank + 1)
+            cumulative.append(total)
+
+        def text(words):
+            return ' '.join(rng.choices(vocabulary, cum_weights=cumulative, k=words))
+
+        started = time.perf_counter()
+        users = User.objects.bulk_create(
+            User(email=f'search-bench-{n}@example.com', username=f'search-bench-{n}') for n in range(options['users'])
+        )
+        skills = Skill.objects.bulk_create(
+            Skill(skill_name=f'bench skill {n}', category=f'category {n % 20}') for n in range(options['skills'])
+        )
+        statuses = ['active'] * 8 + ['paused', 'completed']
+        listings = []
+        for _ in range(options['listings']):
+            offered, desired = rng.sample(skills, 2)
+            listing = SkillListing(
+                user=rng.choice(users), skill_offered=offered, skill_desired=desired,
+                title=text(5), description=text(40), status=rng.choice(statuses),
+                location_preference=f'city {rng.randrange(200)}',
+            )
+            # bulk_create skips the signals that fill in the search document.
+            listing.search_document = listing_document(
+                listing.title, listing.description, offered.skill_name, desired.skill_name,
+                listing.location_preference,
+            )
+            listings.append(listing)
+        listings = SkillListing.objects.bulk_create(listings, batch_size=2000)
+        index_listings(listings)
+        self.stdout.write(f'Loaded {len(listings):,} listings in {time.perf_counter() - started:.1f}s')
+
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        search = ListingSearchView.as_view()
+        queries = [
+            # A mix of common and rare words, some cut short as typed so far.
+            ' '.join(rng.choice(vocabulary[:2000])[:rng.randint(3, 10)] for _ in range(rng.randint(1, 2)))
+            for _ in range(options['queries'])
+        ]
+        timings, sizes = [], []
+        for query in queries:
+            started = time.perf_counter()
+            response = search(factory.get('/api/v1/listings/search/', {'q': query}))
+            response.render()
+            timings.append((time.perf_counter() - started) * 1000)
+            sizes.append(len(response.content))
+        p50, p95 = percentiles(timings)
+        self.stdout.write(
+            f'search endpoint: p50 {p50:.1f} ms, p95 {p95:.1f} ms, '
+            f'{statistics.mean(sizes) / 1024:.1f} KiB per response'
+        )
+
+        # What clients did before: download every active listing, then filter locally.
+        timings = []
+        for query in queries[:options['baseline_runs']]:
+            started = time.perf_counter()
+            payload = json.dumps(
+                SkillListingSerializer(listing_queryset().filter(status='active'), many=True).data
+            )
+            rows = json.loads(payload)
+            terms = query.lower().split()
+            [
+                row for row in rows
+                if all(term in f"{row['title']} {row['description']}".lower() for term in terms)
+            ]
+            timings.append((time.perf_counter() - started) * 1000)
+        p50, p95 = percentiles(timings)
+        self.stdout.write(self.style.SUCCESS(
+            f'fetch everything: p50 {p50:.1f} ms, p95 {p95:.1f} ms, {len(payload) / 1024 / 1024:.1f} MiB per download'
+        ))
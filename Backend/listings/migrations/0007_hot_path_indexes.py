@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_alter_portfolioimage_listing'),
+        ('skills', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='skilllisting',
+            index=models.Index(fields=['status', '-creation_date', '-listing_id'], name='listing_status_created_idx'),
+        ),
+    ]
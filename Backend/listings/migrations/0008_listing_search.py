@@ -0,0 +1,86 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:26
+
+import django.db.models.deletion
+import listings.models
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE listings_listing_fts USING fts5(search_document, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO listings_listing_fts (rowid, search_document) SELECT listing_id, search_document FROM listings_skilllisting",
+]
+POSTGRES_INDEXES = [
+    # Needs a role allowed to create extensions; it is a no-op once installed.
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # The expression SearchVector('search_document', config='simple') compiles to.
+    "CREATE INDEX listing_search_fts_idx ON listings_skilllisting "
+    "USING gin (to_tsvector('simple'::regconfig, COALESCE(search_document, '')))",
+    "CREATE INDEX listing_search_trgm_idx ON listings_skilllisting USING gin (search_document gin_trgm_ops)",
+]
+
+
+def listing_document(*parts):
+    # Frozen copy of listings.search.listing_document as of this migration.
+    return " ".join(part for part in parts if part)
+
+
+def backfill_documents(apps, schema_editor):
+    SkillListing = apps.get_model('listings', 'SkillListing')
+    listings = SkillListing.objects.select_related('skill_offered', 'skill_desired').order_by('listing_id')
+    batch = []
+    for listing in listings.iterator(chunk_size=1000):
+        listing.search_document = listing_document(
+            listing.title,
+            listing.description,
+            listing.skill_offered.skill_name,
+            listing.skill_desired.skill_name,
+            listing.location_preference,
+        )
+        batch.append(listing)
+        if len(batch) == 1000:
+            SkillListing.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    SkillListing.objects.bulk_update(batch, ['search_document'])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FTS, 'postgresql': POSTGRES_INDEXES}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS listings_listing_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS listing_search_fts_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS listing_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingSearchEntry',
+            fields=[
+                ('listing', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='listings.skilllisting')),
+                ('search_document', listings.models.FTS5Field()),
+            ],
+            options={
+                'db_table': 'listings_listing_fts',
+                'managed': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='skilllisting',
+            name='search_document',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Lookup
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from skills.models import Skill
@@ -23,10 +24,53 @@ class SkillListing(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     location_preference = models.CharField(max_length=200, blank=True, null=True)
     portfolio_link = models.URLField( max_length=500, blank=True, null=True)
+    # Title, description, both skill names and location in one string, kept up to date by
+    # listings.signals; it is what the full-text index covers (see listings.search).
+    search_document = models.TextField(default="", editable=False)
+
+    class Meta:
+      indexes = [
+        # Public feed: active listings, newest first.
+        models.Index(fields=["status", "-creation_date", "-listing_id"], name="listing_status_created_idx"),
+      ]
 
     def __str__(self):
       return f"{self.title} ({self.status})"
     
+class FTS5Field(models.TextField):
+  """A column of an SQLite FTS5 table; supports `__match` with an FTS5 query string."""
+
+
+@FTS5Field.register_lookup
+class FTS5Match(Lookup):
+  lookup_name = "match"
+
+  def as_sql(self, compiler, connection):
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    rhs, rhs_params = self.process_rhs(compiler, connection)
+    return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class ListingSearchEntry(models.Model):
+  """
+  The SQLite FTS5 table mirroring SkillListing.search_document, rowid = listing_id.
+  Created by migration 0008 on SQLite only (PostgreSQL indexes the column itself).
+  """
+  listing = models.OneToOneField(
+    SkillListing,
+    on_delete=models.DO_NOTHING,
+    primary_key=True,
+    db_column="rowid",
+    db_constraint=False,
+    related_name="search_entry",
+  )
+  search_document = FTS5Field()
+
+  class Meta:
+    managed = False
+    db_table = "listings_listing_fts"
+
+
 class PortfolioImage(models.Model):
   user = models.ForeignKey(
       settings.AUTH_USER_MODEL,
@@ -0,0 +1,132 @@
+"""
+Full-text search over listings.
+
+Each listing's title, description, skill names and location are folded into
+SkillListing.search_document (see listings.signals), and that column is what
+gets indexed:
+
+- PostgreSQL: a GIN index on its `simple` tsvector, ranked with ts_rank, plus
+  a pg_trgm GIN index so a misspelt word still finds listings through word
+  similarity (`<%`).
+- SQLite (local and test use): an FTS5 table (ListingSearchEntry) ranked
+  with bm25.
+
+On both, every search term also matches as a prefix ("pyth" finds "python").
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, Count, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from .models import ListingSearchEntry
+
+# Search terms beyond this are ignored, to keep query plans bounded.
+MAX_TERMS = 8
+TERM_RE = re.compile(r"\w+")
+
+
+def listing_document(title, description, skill_offered, skill_desired, location):
+    return " ".join(part for part in (title, description, skill_offered, skill_desired, location) if part)
+
+
+def document_for(listing):
+    return listing_document(
+        listing.title,
+        listing.description,
+        listing.skill_offered.skill_name,
+        listing.skill_desired.skill_name,
+        listing.location_preference,
+    )
+
+
+def refresh_documents(listings):
+    """
+    Recompute the search documents of `listings` (a SkillListing queryset),
+    for writes that bypass the model's signals, e.g. a skill renamed or merged.
+    """
+    changed = []
+    for listing in listings.select_related("skill_offered", "skill_desired"):
+        document = document_for(listing)
+        if document != listing.search_document:
+            listing.search_document = document
+            changed.append(listing)
+    listings.model.objects.bulk_update(changed, ["search_document"], batch_size=500)
+    index_listings(changed)
+    return len(changed)
+
+
+def search_terms(query):
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class BM25(Func):
+    """FTS5 relevance of the current match, negated so that higher is better like ts_rank."""
+    template = "(-bm25(%(table)s))"
+    output_field = FloatField()
+
+    def __init__(self):
+        super().__init__(table=connection.ops.quote_name(ListingSearchEntry._meta.db_table))
+
+
+def search(queryset, query):
+    """
+    Narrow a SkillListing queryset to the listings matching `query` and
+    annotate their relevance as `rank` (higher is better). A query without
+    any words matches everything with rank 0.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+    if connection.vendor == "postgresql":
+        return postgres_search(queryset, terms)
+    return sqlite_search(queryset, terms)
+
+
+def sqlite_search(queryset, terms):
+    # Terms are \w+ only, so quoting each one is enough to keep FTS5 syntax out.
+    match = " ".join(f'"{term}"*' for term in terms)
+    return queryset.filter(search_entry__search_document__match=match).annotate(rank=BM25())
+
+
+def postgres_search(queryset, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+
+    # Must stay the expression the GIN index of migration 0008 is built on.
+    vector = SearchVector("search_document", config="simple")
+    tsquery = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config="simple")
+    phrase = " ".join(terms)
+    return queryset.annotate(
+        document=vector,
+        # `<%` is true above pg_trgm.word_similarity_threshold and uses the trigram index.
+        similar=RawSQL("%s <%% search_document", (phrase,), output_field=BooleanField()),
+        # ts_rank and word_similarity are real (float4); the cursor compares ranks
+        # as double precision, so the sum is cast or page-boundary ties never match.
+        rank=Cast(SearchRank(vector, tsquery) + TrigramWordSimilarity(Value(phrase), "search_document"), FloatField()),
+    ).filter(Q(document=tsquery) | Q(similar=True))
+
+
+def facet_counts(queryset, field):
+    """{value: number of listings} for `field` over `queryset`."""
+    rows = queryset.order_by().values(field).annotate(count=Count("listing_id"))
+    return {row[field]: row["count"] for row in rows}
+
+
+def index_listings(listings):
+    """Copy search documents into the SQLite FTS table; PostgreSQL indexes the column itself."""
+    if connection.vendor != "sqlite":
+        return
+    rows = [(listing.listing_id, listing.search_document) for listing in listings]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {ListingSearchEntry._meta.db_table} WHERE rowid = %s", [row[:1] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {ListingSearchEntry._meta.db_table} (rowid, search_document) VALUES (%s, %s)", rows
+        )
+
+
+def unindex_listing(listing_id):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {ListingSearchEntry._meta.db_table} WHERE rowid = %s", [listing_id])
@@ -0,0 +1,47 @@
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from skills.models import Skill
+from swapo.response_cache import response_cache
+from .models import PortfolioImage, SkillListing
+from .search import document_for, index_listings, refresh_documents, unindex_listing
+
+
+@receiver(pre_save, sender=SkillListing)
+def refresh_search_document(sender, instance, raw=False, **kwargs):
+  """Fold the searchable fields into search_document before every save"""
+  if not raw:
+    instance.search_document = document_for(instance)
+
+
+@receiver(post_save, sender=SkillListing)
+def index_listing(sender, instance, raw=False, **kwargs):
+  if not raw:
+    index_listings([instance])
+
+
+@receiver(post_delete, sender=SkillListing)
+def remove_listing_from_index(sender, instance, **kwargs):
+  unindex_listing(instance.listing_id)
+
+
+@receiver(post_save, sender=Skill)
+def reindex_listings_for_skill(sender, instance, created, raw=False, **kwargs):
+  """A renamed skill changes the search document of every listing that names it"""
+  if created or raw:
+    return
+  refresh_documents(SkillListing.objects.filter(Q(skill_offered=instance) | Q(skill_desired=instance)))
+
+
+@receiver(post_save, sender=SkillListing)
+@receiver(post_delete, sender=SkillListing)
+def invalidate_cached_listing(sender, instance, **kwargs):
+  """The listing itself, the feed it may enter or leave and its owner's profile"""
+  response_cache.invalidate('listings', f'listing:{instance.listing_id}', f'user-listings:{instance.user_id}')
+
+
+@receiver(post_save, sender=PortfolioImage)
+@receiver(post_delete, sender=PortfolioImage)
+def invalidate_cached_listing_images(sender, instance, **kwargs):
+  if instance.listing_id:
+    response_cache.invalidate(f'listing:{instance.listing_id}')
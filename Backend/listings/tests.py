@@ -1,3 +1,293 @@
-from django.test import TestCase
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from skills.models import Skill
+from swapo.response_cache import response_cache
+from swapo.testing import QueryPlanMixin
+from .models import SkillListing, PortfolioImage
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ListingFeedTests(TestCase):
+  @classmethod
+  def setUpTestData(cls):
+    cls.offered = Skill.objects.create(skill_name="Guitar", category="Music")
+    cls.desired = Skill.objects.create(skill_name="Python", category="Programming")
+
+  def setUp(self):
+    self.client = APIClient()
+
+  def make_listings(self, count):
+    for i in range(count):
+      user = User.objects.create_user(email=f"feed{SkillListing.objects.count()}@example.com")
+      listing = SkillListing.objects.create(
+        user=user, skill_offered=self.offered, skill_desired=self.desired,
+        title=f"Listing {i}", description="desc",
+      )
+      PortfolioImage.objects.create(user=user, listing=listing, image_url="https://example.com/a.png")
+
+  def count_feed_queries(self):
+    with CaptureQueriesContext(connection) as ctx:
+      response = self.client.get("/api/v1/listings/", {"page_size": 50})
+    self.assertEqual(response.status_code, 200)
+    return len(ctx.captured_queries)
+
+  def test_query_count_is_flat_as_table_grows(self):
+    self.make_listings(3)
+    small = self.count_feed_queries()
+    self.make_listings(30)
+    self.assertEqual(self.count_feed_queries(), small)
+
+  def test_cursor_walks_every_active_listing_once(self):
+    self.make_listings(7)
+    SkillListing.objects.filter(title="Listing 0").update(status="paused")
+
+    seen, params = [], {"page_size": 3}
+    while True:
+      body = self.client.get("/api/v1/listings/", params).json()
+      self.assertLessEqual(len(body["results"]), 3)
+      seen += [row["listing_id"] for row in body["results"]]
+      if not body["next"]:
+        break
+      params = {k: v[0] for k, v in parse_qs(urlparse(body["next"]).query).items()}
+
+    expected = list(SkillListing.objects.filter(status="active")
+                    .order_by("-creation_date", "-listing_id")
+                    .values_list("listing_id", flat=True))
+    self.assertEqual(seen, expected)
+
+  def test_page_size_is_capped(self):
+    self.make_listings(3)
+    body = self.client.get("/api/v1/listings/", {"page_size": 10000}).json()
+    self.assertEqual(len(body["results"]), 3)
+
+  def test_invalid_cursor_is_404(self):
+    response = self.client.get("/api/v1/listings/", {"cursor": "not-a-cursor"})
+    self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ListingCreateTests(TestCase):
+  def setUp(self):
+    self.python = Skill.objects.create(skill_name="Python", category="Programming")
+    self.client = APIClient()
+    self.client.force_authenticate(User.objects.create_user(email="maker@example.com"))
+
+  def test_custom_skills_resolve_through_the_catalogue(self):
+    response = self.client.post("/api/v1/listings/", {
+      "title": "t", "description": "d",
+      "skill_offered": "other", "custom_offer_skill": " py ",
+      "skill_desired": "other", "custom_desired_skill": "Ukulele",
+    })
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual(response.json()["skill_offered"], self.python.pk)
+    self.assertEqual(response.json()["skill_desired_name"], "Ukulele")
+
+    response = self.client.post("/api/v1/listings/", {
+      "title": "t", "description": "d",
+      "skill_offered": "other", "custom_offer_skill": "PYTHON",
+      "skill_desired": "other", "custom_desired_skill": "ukulele",
+    })
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual(response.json()["skill_offered"], self.python.pk)
+    self.assertEqual(Skill.objects.filter(skill_name__iexact="ukulele").count(), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ListingResponseCacheTests(TestCase):
+  @classmethod
+  def setUpTestData(cls):
+    cls.owner = User.objects.create_user(email="owner@example.com", first_name="Ada")
+    cls.guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+    cls.python = Skill.objects.create(skill_name="Python", category="Programming")
+    cls.listing = SkillListing.objects.create(
+      user=cls.owner, skill_offered=cls.guitar, skill_desired=cls.python, title="Lessons", description="d"
+    )
+
+  def setUp(self):
+    caches["responses"].clear()
+    self.client = APIClient()
+
+  def get(self, path, expect_cached, **headers):
+    with CaptureQueriesContext(connection) as ctx:
+      response = self.client.get(path, headers=headers)
+    self.assertEqual(response["X-Cache"], "HIT" if expect_cached else "MISS")
+    self.assertEqual(len(ctx.captured_queries) == 0, expect_cached)
+    return response
+
+  def test_repeated_reads_are_served_from_the_cache(self):
+    detail = f"/api/v1/listings/{self.listing.listing_id}/"
+    first = self.get(detail, expect_cached=False)
+    second = self.get(detail, expect_cached=True)
+    self.assertEqual(second.json(), first.json())
+    self.assertEqual(second["ETag"], first["ETag"])
+    self.assertIn("public", second["Cache-Control"])
+
+    self.get("/api/v1/listings/", expect_cached=False)
+    self.get("/api/v1/listings/", expect_cached=True)
+    self.get("/api/v1/listings/?page_size=5", expect_cached=False)
+
+  def test_matching_etag_gets_304(self):
+    etag = self.get("/api/v1/listings/", expect_cached=False)["ETag"]
+    response = self.get("/api/v1/listings/", expect_cached=True, if_none_match=etag)
+    self.assertEqual(response.status_code, 304)
+    self.assertEqual(response.content, b"")
+
+  def test_writes_invalidate_exactly_the_responses_built_from_them(self):
+    detail = f"/api/v1/listings/{self.listing.listing_id}/"
+    other_owner = User.objects.create_user(email="other@example.com")
+    other = SkillListing.objects.create(
+      user=other_owner, skill_offered=self.python, skill_desired=self.python, title="Other", description="d"
+    )
+    other_detail = f"/api/v1/listings/{other.listing_id}/"
+    for path in (detail, other_detail):
+      self.get(path, expect_cached=False)
+
+    self.guitar.skill_name = "Electric Guitar"
+    self.guitar.save()
+    self.assertEqual(self.get(detail, expect_cached=False).json()["skill_offered_name"], "Electric Guitar")
+    self.get(other_detail, expect_cached=True)
+
+    PortfolioImage.objects.create(user=self.owner, listing=self.listing, image_url="https://example.com/a.png")
+    self.assertEqual(len(self.get(detail, expect_cached=False).json()["portfolio_images"]), 1)
+
+    self.owner.first_name = "Grace"
+    self.owner.save()
+    self.assertEqual(self.get(detail, expect_cached=False).json()["user"]["first_name"], "Grace")
+    self.get(other_detail, expect_cached=True)
+
+    # Saves that leave the public profile alone keep the cache.
+    self.owner.save(update_fields=["last_login"])
+    self.get(detail, expect_cached=True)
+
+    other.delete()
+    self.assertEqual(self.client.get(other_detail).status_code, 404)
+
+  def test_data_read_before_a_concurrent_write_is_not_stored(self):
+    epoch = response_cache.epoch()
+    # The view has read the listing; meanwhile its owner is updated and the bump lands.
+    self.owner.first_name = "Grace"
+    self.owner.save()
+    entry = response_cache.set("response:test", {"user": "Ada"}, [f"user:{self.owner.user_id}"], epoch)
+    self.assertEqual(entry["data"], {"user": "Ada"})
+    self.assertIsNone(response_cache.get("response:test"))
+
+    response_cache.set("response:test", {"user": "Grace"}, [f"user:{self.owner.user_id}"], response_cache.epoch())
+    self.assertEqual(response_cache.get("response:test")["data"], {"user": "Grace"})
+
+  def test_stats_are_staff_only(self):
+    response_cache.reset_stats()
+    self.get("/api/v1/listings/", expect_cached=False)
+    self.get("/api/v1/listings/", expect_cached=True)
+
+    self.client.force_authenticate(self.owner)
+    self.assertEqual(self.client.get("/api/v1/cache/stats/").status_code, 403)
+    self.client.force_authenticate(User.objects.create_user(email="staff@example.com", is_staff=True))
+    stats = self.client.get("/api/v1/cache/stats/").json()
+    self.assertEqual((stats["hits"], stats["misses"], stats["hit_ratio"]), (1, 1, 0.5))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ListingSearchTests(TestCase):
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_user(email="search@example.com")
+    cls.guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+    cls.python = Skill.objects.create(skill_name="Python", category="Programming")
+    cls.cooking = Skill.objects.create(skill_name="Cooking", category="Food")
+
+  def setUp(self):
+    self.client = APIClient()
+
+  def make_listing(self, title, offered, desired, description="desc", **kwargs):
+    return SkillListing.objects.create(
+      user=self.user, skill_offered=offered, skill_desired=desired, title=title, description=description, **kwargs
+    )
+
+  def search(self, **params):
+    response = self.client.get("/api/v1/listings/search/", params)
+    self.assertEqual(response.status_code, 200)
+    return response.json()
+
+  def ids(self, body):
+    return [row["listing_id"] for row in body["results"]]
+
+  def test_matches_title_description_skill_names_and_location(self):
+    titled = self.make_listing("Jazz improvisation", self.guitar, self.python)
+    described = self.make_listing("Lessons", self.cooking, self.guitar, description="Sourdough and pasta")
+    located = self.make_listing("Lessons", self.cooking, self.guitar, location_preference="Lisbon")
+    self.assertEqual(self.ids(self.search(q="jazz")), [titled.listing_id])
+    self.assertEqual(self.ids(self.search(q="sourdough")), [described.listing_id])
+    self.assertEqual(self.ids(self.search(q="lisbon")), [located.listing_id])
+    self.assertEqual(sorted(self.ids(self.search(q="python"))), [titled.listing_id])
+    self.assertEqual(len(self.search(q="guitar")["results"]), 3)
+
+  def test_every_term_must_match_and_terms_match_as_prefixes(self):
+    both = self.make_listing("Python for guitarists", self.guitar, self.python)
+    self.make_listing("Python basics", self.cooking, self.python)
+    self.assertEqual(self.ids(self.search(q="pyth guit")), [both.listing_id])
+
+  def test_more_relevant_listings_rank_first(self):
+    once = self.make_listing("Cooking lessons", self.cooking, self.guitar)
+    often = self.make_listing("Python, Python, Python", self.python, self.cooking, description="All about Python")
+    self.assertEqual(self.ids(self.search(q="python")), [often.listing_id])
+    self.assertEqual(self.ids(self.search(q="cooking")), [once.listing_id, often.listing_id])
+
+  def test_edits_renames_and_deletes_reach_the_index(self):
+    listing = self.make_listing("Knitting circle", self.cooking, self.guitar)
+    listing.title = "Crochet circle"
+    listing.save()
+    self.assertEqual(self.search(q="knitting")["results"], [])
+    self.assertEqual(self.ids(self.search(q="crochet")), [listing.listing_id])
+
+    self.guitar.skill_name = "Ukulele"
+    self.guitar.save()
+    self.assertEqual(self.ids(self.search(q="ukulele")), [listing.listing_id])
+
+    listing.delete()
+    self.assertEqual(self.search(q="crochet")["results"], [])
+
+  def test_filters_and_facets(self):
+    self.make_listing("Guitar lessons", self.guitar, self.python)
+    self.make_listing("Guitar repair", self.guitar, self.cooking, status="paused")
+    self.make_listing("Python and guitar", self.python, self.guitar)
+    self.make_listing("Unrelated", self.cooking, self.python)
+
+    body = self.search(q="guitar", category="Music")
+    self.assertEqual(len(body["results"]), 1)
+    # Category counts use the status filter, status counts use the category filter.
+    self.assertEqual(body["facets"]["category"], {"Music": 1, "Programming": 1})
+    self.assertEqual(body["facets"]["status"], {"active": 1, "paused": 1})
+    self.assertEqual(len(self.search(q="guitar", status="active,paused")["results"]), 3)
+    self.assertEqual(self.client.get("/api/v1/listings/search/", {"status": "bogus"}).status_code, 400)
+
+  def test_cursor_walks_ranked_results_once(self):
+    for i in range(7):
+      self.make_listing("Guitar " * (i % 3 + 1), self.guitar, self.python)
+
+    params = {"q": "guitar", "page_size": 3}
+    with CaptureQueriesContext(connection) as ctx:
+      body = self.search(**params)
+    # The page, its portfolio images and one query per facet.
+    self.assertEqual(len(ctx.captured_queries), 4)
+
+    seen = []
+    while True:
+      seen += self.ids(body)
+      if not body["next"]:
+        break
+      body = self.search(**{k: v[0] for k, v in parse_qs(urlparse(body["next"]).query).items()})
+      self.assertNotIn("facets", body)
+    self.assertEqual(sorted(seen), sorted(SkillListing.objects.values_list("listing_id", flat=True)))
+
+
+class ListingIndexTests(QueryPlanMixin, TestCase):
+  def test_feed_uses_status_created_index(self):
+    feed = SkillListing.objects.filter(status="active").order_by("-creation_date", "-listing_id")
+    self.assertUsesIndex(feed, "listing_status_created_idx")
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import SkillListingView
+from .views import SkillListingView, ListingSearchView
 
 urlpatterns = [
   path('', SkillListingView.as_view(), name='listings'),
+  path('search/', ListingSearchView.as_view(), name='listing-search'),
   path('<int:listing_id>/', SkillListingView.as_view(), name='listing-detail')
 ]
@@ -1,19 +1,59 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
 from cloudinary.uploader import upload as cloudinary_upload
 
+from . import search
 from .models import SkillListing
-from skills.models import Skill
+from skills.catalogue import name_key, resolve_skills
+from skills.taxonomy import skills_under
 from listings.models import PortfolioImage
 from .serializers import SkillListingSerializer
+from swapo.pagination import KeysetCursorPagination
+from swapo.response_cache import cached_response
+
+
+class ListingFeedPagination(KeysetCursorPagination):
+    ordering = ("-creation_date", "-listing_id")
+    page_size = 20
+    max_page_size = 50
+
+
+class ListingSearchPagination(KeysetCursorPagination):
+    ordering = ("-rank", "-listing_id")
+    page_size = 20
+    max_page_size = 50
+
+
+def listing_queryset():
+    """Listings with everything SkillListingSerializer reads already joined in."""
+    return SkillListing.objects.select_related(
+        "user", "skill_offered", "skill_desired"
+    ).prefetch_related("portfolio_images")
+
+
+def listing_tags(listing):
+    """Cache tags of one serialized listing: itself, its owner and both skills."""
+    return [
+        f"listing:{listing['listing_id']}",
+        f"user:{listing['user']['user_id']}",
+        f"skill:{listing['skill_offered']}",
+        f"skill:{listing['skill_desired']}",
+    ]
+
+
+def listing_view_tags(data, listing_id=None):
+    if listing_id:
+        return listing_tags(data)
+    return ["listings"] + [tag for listing in data["results"] for tag in listing_tags(listing)]
 
 
 class SkillListingView(APIView):
     """
-    GET: public, returns active listings
+    GET: public, returns active listings, newest first, one cursor page at a time
     POST: authenticated, create a listing or upload user portfolio images
     PUT/PATCH: authenticated, update own listing
     DELETE: authenticated, delete own listing
@@ -23,15 +63,19 @@ class SkillListingView(APIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    @cached_response(tags=listing_view_tags)
     def get(self, request, listing_id=None):
         if listing_id:
-            listing = get_object_or_404(SkillListing, listing_id=listing_id)
+            listing = get_object_or_404(listing_queryset(), listing_id=listing_id)
             serializer = SkillListingSerializer(listing)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
-        listings = SkillListing.objects.filter(status='active').order_by('-creation_date')
+        paginator = ListingFeedPagination()
+        listings = paginator.paginate_queryset(
+            listing_queryset().filter(status='active'), request, view=self
+        )
         serializer = SkillListingSerializer(listings, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         """
@@ -46,17 +90,19 @@ class SkillListingView(APIView):
         if not listing_id:
             data = request.data.dict()
 
-            # Handle custom offered skill
+            # Custom skills typed in place of "other" go through the catalogue,
+            # so "py" or "python" end up on the existing Python skill.
+            custom = {}
             if data.get("skill_offered") == "other" and data.get("custom_offer_skill"):
-                skill_name = data.pop("custom_offer_skill").strip()
-                skill, _ = Skill.objects.get_or_create(skill_name=skill_name)
-                data["skill_offered"] = skill.pk
-
-            # Handle custom desired skill
+                custom["skill_offered"] = data.pop("custom_offer_skill")
             if data.get("skill_desired") == "other" and data.get("custom_desired_skill"):
-                skill_name = data.pop("custom_desired_skill").strip()
-                skill, _ = Skill.objects.get_or_create(skill_name=skill_name)
-                data["skill_desired"] = skill.pk
+                custom["skill_desired"] = data.pop("custom_desired_skill")
+            if custom:
+                skills, _ = resolve_skills([{"skill_name": name} for name in custom.values()])
+                for field, name in custom.items():
+                    skill = skills.get(name_key(name))
+                    if skill is not None:
+                        data[field] = skill.pk
 
             serializer = SkillListingSerializer(data=data)
             if serializer.is_valid():
@@ -131,3 +177,46 @@ class SkillListingView(APIView):
         listing = get_object_or_404(SkillListing, listing_id=listing_id, user=request.user)
         listing.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def list_param(request, name):
+    raw = request.query_params.get(name, "")
+    return [value.strip() for value in raw.split(",") if value.strip()]
+
+
+class ListingSearchView(APIView):
+    """
+    GET /listings/search/?q=python guitar&category=Music&status=active
+    Public. Listings whose title, description, skill names or location match
+    every word of `q` (each as a prefix; misspellings too on PostgreSQL), most
+    relevant first, one cursor page at a time.
+    ?category= (offered skill's category, subcategories included) and ?status=
+    (default active) take comma-separated values. The first page also carries `facets`: listing
+    counts per category and per status, each counted with the other filter applied.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        statuses = list_param(request, "status") or ["active"]
+        unknown = set(statuses) - {value for value, _ in SkillListing.STATUS_CHOICES}
+        if unknown:
+            raise ValidationError({"status": f"Unknown status: {', '.join(sorted(unknown))}"})
+        categories = list_param(request, "category")
+
+        matches = search.search(SkillListing.objects.all(), request.query_params.get("q", ""))
+        in_categories = matches.filter(skill_offered__in=skills_under(categories)) if categories else matches
+        results = in_categories.filter(status__in=statuses)
+
+        paginator = ListingSearchPagination()
+        page = paginator.paginate_queryset(
+            results.select_related("user", "skill_offered", "skill_desired").prefetch_related("portfolio_images"),
+            request,
+            view=self,
+        )
+        response = paginator.get_paginated_response(SkillListingSerializer(page, many=True).data)
+        if paginator.position is None:
+            response.data["facets"] = {
+                "category": search.facet_counts(matches.filter(status__in=statuses), "skill_offered__category"),
+                "status": search.facet_counts(in_categories, "status"),
+            }
+        return response
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Message
+from .models import Message, Conversation
 # Register your models here.
 
 
-admin.site.register(Message)
\ No newline at end of file
+admin.site.register(Message)
+admin.site.register(Conversation)
@@ -0,0 +1,18 @@
+from django.db.models import Q, Sum
+
+from swapo.counters import UnreadCounter
+from .models import Conversation
+
+
+class MessageUnreadCounter(UnreadCounter):
+    """Unread received messages, summed from the conversation summaries."""
+
+    def count_unread(self, user_id):
+        totals = Conversation.objects.for_user(user_id).aggregate(
+            as_a=Sum("unread_for_a", filter=Q(user_a_id=user_id)),
+            as_b=Sum("unread_for_b", filter=Q(user_b_id=user_id)),
+        )
+        return (totals["as_a"] or 0) + (totals["as_b"] or 0)
+
+
+message_unread = MessageUnreadCounter("messages")
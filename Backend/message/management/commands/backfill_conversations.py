@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Greatest, Least
+from message.models import Message, Conversation
+
+
+class Command(BaseCommand):
+    help = 'Rebuild conversation summaries from existing messages, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of conversations written per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        pairs = (
+            Message.objects
+            .annotate(user_a=Least('sender_id', 'receiver_id'), user_b=Greatest('sender_id', 'receiver_id'))
+            .values('user_a', 'user_b')
+            .annotate(
+                last_activity=Max('timestamp'),
+                unread_for_a=Count('message_id', filter=Q(is_read=False, receiver_id=Least('sender_id', 'receiver_id'))),
+                unread_for_b=Count('message_id', filter=Q(is_read=False, receiver_id=Greatest('sender_id', 'receiver_id'))),
+            )
+            .order_by('user_a', 'user_b')
+        )
+
+        written = 0
+        batch = []
+        for row in pairs.iterator(chunk_size=batch_size):
+            batch.append(Conversation(
+                user_a_id=row['user_a'],
+                user_b_id=row['user_b'],
+                last_activity=row['last_activity'],
+                unread_for_a=row['unread_for_a'],
+                unread_for_b=row['unread_for_b'],
+            ))
+            if len(batch) >= batch_size:
+                written += self.write_batch(batch)
+                batch = []
+        if batch:
+            written += self.write_batch(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully backfilled {written} conversations')
+        )
+
+    def write_batch(self, batch):
+        with transaction.atomic():
+            Conversation.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['user_a', 'user_b'],
+                update_fields=['last_activity', 'unread_for_a', 'unread_for_b'],
+            )
+            # Point each summary at its newest message with one correlated UPDATE.
+            last_message = Message.objects.filter(
+                Q(sender_id=OuterRef('user_a_id'), receiver_id=OuterRef('user_b_id'))
+                | Q(sender_id=OuterRef('user_b_id'), receiver_id=OuterRef('user_a_id'))
+            ).order_by('-timestamp', '-message_id').values('message_id')[:1]
+            Conversation.objects.filter(
+                pk__in=[conversation.pk for conversation in batch]
+            ).update(last_message=Subquery(last_message))
+        self.stdout.write(f'  {len(batch)} conversations written')
+        return len(batch)
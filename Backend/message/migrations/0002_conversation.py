@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('conversation_id', models.AutoField(primary_key=True, serialize=False)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('unread_for_a', models.PositiveIntegerField(default=0)),
+                ('unread_for_b', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='message.message')),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_a', '-last_activity'], name='conversation_a_activity_idx'), models.Index(fields=['user_b', '-last_activity'], name='conversation_b_activity_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_a', 'user_b'), name='unique_conversation_pair'), models.CheckConstraint(condition=models.Q(('user_a__lte', models.F('user_b'))), name='conversation_pair_ordered')],
+            },
+        ),
+    ]
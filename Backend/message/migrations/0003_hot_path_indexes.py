@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0002_conversation'),
+        ('trade', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'receiver', '-timestamp', '-message_id'], name='message_pair_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['receiver', 'sender'], name='message_unread_idx'),
+        ),
+    ]
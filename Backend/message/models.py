@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from accounts.models import User
 from trade.models import Trade, TradeProposal
@@ -26,5 +28,131 @@ class Message(models.Model):
     is_read = models.BooleanField(default=False)
     message_type = models.CharField(max_length=20, choices=MESSAGE_TYPES, default="text")
 
+    class Meta:
+        indexes = [
+            # Conversation history: (sender, receiver) pair, paged by time.
+            models.Index(fields=["sender", "receiver", "-timestamp", "-message_id"], name="message_pair_time_idx"),
+            # Unread messages per receiver and partner; only unread rows are indexed.
+            models.Index(
+                fields=["receiver", "sender"], condition=models.Q(is_read=False), name="message_unread_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"Message {self.message_id} from {self.sender} to {self.receiver}"
+
+
+class ConversationManager(models.Manager):
+    def pair(self, user_id, other_id):
+        """Lookup kwargs for the row of an unordered pair of users."""
+        low, high = sorted((user_id, other_id))
+        return {"user_a_id": low, "user_b_id": high}
+
+    def for_user(self, user):
+        return self.filter(models.Q(user_a=user) | models.Q(user_b=user))
+
+    def record_message(self, message):
+        """
+        Fold a newly created message into its conversation summary: bump the
+        receiver's unread counter and move last_message forward if it is newer.
+        """
+        pair = self.pair(message.sender_id, message.receiver_id)
+        unread_field = "unread_for_a" if message.receiver_id == pair["user_a_id"] else "unread_for_b"
+
+        with transaction.atomic():
+            conversation, created = self.get_or_create(
+                **pair,
+                defaults={
+                    "last_message": message,
+                    "last_activity": message.timestamp,
+                    unread_field: 0 if message.is_read else 1,
+                },
+            )
+            if created:
+                return conversation
+
+            updates = {"last_message": message, "last_activity": message.timestamp}
+            if not message.is_read:
+                updates[unread_field] = F(unread_field) + 1
+            newer = self.filter(pk=conversation.pk).filter(
+                models.Q(last_activity__isnull=True) | models.Q(last_activity__lte=message.timestamp)
+            ).update(**updates)
+            if not newer and not message.is_read:
+                # An out-of-order (backdated) message still counts as unread.
+                self.filter(pk=conversation.pk).update(**{unread_field: F(unread_field) + 1})
+        return conversation
+
+    def record_deletion(self, message):
+        """
+        Undo a deleted message's part in its conversation summary: take it off
+        the receiver's unread counter and, when it was the last message (already
+        nulled by SET_NULL), fall back to the newest message left.
+        """
+        pair = self.pair(message.sender_id, message.receiver_id)
+        unread_field = "unread_for_a" if message.receiver_id == pair["user_a_id"] else "unread_for_b"
+
+        with transaction.atomic():
+            conversation = self.select_for_update().filter(**pair).first()
+            if conversation is None:
+                # Deleted along with one of the users.
+                return
+            updates = {}
+            if not message.is_read:
+                updates[unread_field] = Greatest(F(unread_field) - 1, 0)
+            if conversation.last_message_id in (None, message.message_id):
+                latest = Message.objects.filter(
+                    models.Q(sender_id=pair["user_a_id"], receiver_id=pair["user_b_id"])
+                    | models.Q(sender_id=pair["user_b_id"], receiver_id=pair["user_a_id"])
+                ).order_by("-timestamp", "-message_id").first()
+                updates["last_message"] = latest
+                updates["last_activity"] = latest.timestamp if latest else None
+            if updates:
+                self.filter(pk=conversation.pk).update(**updates)
+
+    def mark_read(self, reader_id, other_id, count):
+        """Take `count` messages just marked read off the reader's unread counter."""
+        if not count:
+            return
+        pair = self.pair(reader_id, other_id)
+        unread_field = "unread_for_a" if reader_id == pair["user_a_id"] else "unread_for_b"
+        self.filter(**pair).update(**{unread_field: Greatest(F(unread_field) - count, 0)})
+
+
+class Conversation(models.Model):
+    """
+    Denormalized summary of the messages exchanged between two users, kept up
+    to date as messages are sent and read so the inbox never scans Message.
+    `user_a` is always the participant with the lower user_id.
+    """
+    conversation_id = models.AutoField(primary_key=True)
+    user_a = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    user_b = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    last_message = models.ForeignKey(
+        Message, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    last_activity = models.DateTimeField(null=True, blank=True)
+    unread_for_a = models.PositiveIntegerField(default=0)
+    unread_for_b = models.PositiveIntegerField(default=0)
+
+    objects = ConversationManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_a", "user_b"], name="unique_conversation_pair"),
+            models.CheckConstraint(
+                condition=models.Q(user_a__lte=models.F("user_b")), name="conversation_pair_ordered"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user_a", "-last_activity"], name="conversation_a_activity_idx"),
+            models.Index(fields=["user_b", "-last_activity"], name="conversation_b_activity_idx"),
+        ]
+
+    def other_user(self, user):
+        return self.user_b if user.pk == self.user_a_id else self.user_a
+
+    def unread_count(self, user):
+        return self.unread_for_a if user.pk == self.user_a_id else self.unread_for_b
+
+    def __str__(self):
+        return f"Conversation {self.conversation_id} between {self.user_a_id} and {self.user_b_id}"
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Message, Conversation
+from .counters import message_unread
+
+
+@receiver(post_save, sender=Message)
+def update_conversation_summary(sender, instance, created, **kwargs):
+    """Keep the sender/receiver conversation summary in step with new messages"""
+    if created and not kwargs.get("raw"):
+        Conversation.objects.record_message(instance)
+        if not instance.is_read:
+            message_unread.add(instance.receiver_id, 1)
+
+
+@receiver(post_delete, sender=Message)
+def remove_from_conversation_summary(sender, instance, **kwargs):
+    """A deleted message may have been the last one shown in the inbox, or still unread"""
+    Conversation.objects.record_deletion(instance)
+    if not instance.is_read:
+        message_unread.add(instance.receiver_id, -1)
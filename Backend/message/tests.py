@@ -1,3 +1,218 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from swapo.testing import QueryPlanMixin
+from .counters import message_unread
+from .models import Message, Conversation
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConversationInboxTests(TestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(email="me@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+        self.now = timezone.now()
+
+    def make_partner(self, n, minutes_ago, unread=1):
+        partner = User.objects.create_user(email=f"partner{n}@example.com")
+        at = self.now - timedelta(minutes=minutes_ago)
+        Message.objects.create(sender=self.me, receiver=partner, content="hi", timestamp=at - timedelta(seconds=30))
+        for i in range(unread):
+            Message.objects.create(sender=partner, receiver=self.me, content=f"reply {i}", timestamp=at)
+        return partner
+
+    def get_inbox(self, **params):
+        response = self.client.get("/api/v1/messages/conversations/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_summary_shape_and_order(self):
+        old = self.make_partner(1, minutes_ago=10, unread=2)
+        recent = self.make_partner(2, minutes_ago=1, unread=0)
+        Message.objects.create(sender=self.me, receiver=recent, content="latest", timestamp=self.now)
+
+        results = self.get_inbox()["results"]
+
+        self.assertEqual([c["other_user"]["user_id"] for c in results], [recent.user_id, old.user_id])
+        self.assertEqual(results[0]["last_message"]["content"], "latest")
+        self.assertEqual(results[0]["unread_count"], 0)
+        self.assertEqual(results[1]["unread_count"], 2)
+        self.assertEqual(set(results[1]), {"other_user", "last_message", "unread_count"})
+
+    def test_query_count_does_not_grow_with_partners(self):
+        for n in range(3):
+            self.make_partner(n, minutes_ago=n)
+        with CaptureQueriesContext(connection) as small:
+            self.get_inbox()
+        for n in range(3, 25):
+            self.make_partner(n, minutes_ago=n, unread=3)
+        with CaptureQueriesContext(connection) as large:
+            self.get_inbox(page_size=50)
+        self.assertEqual(len(large), len(small))
+
+    def test_pages_by_last_activity(self):
+        partners = [self.make_partner(n, minutes_ago=n) for n in range(5)]
+
+        seen, params = [], {"page_size": 2}
+        while True:
+            body = self.get_inbox(**params)
+            seen += [c["other_user"]["user_id"] for c in body["results"]]
+            if not body["next"]:
+                break
+            params = {k: v[0] for k, v in parse_qs(urlparse(body["next"]).query).items()}
+
+        self.assertEqual(seen, [p.user_id for p in partners])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConversationSummaryTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com")
+        self.bob = User.objects.create_user(email="bob@example.com")
+        self.client = APIClient()
+
+    def summary(self):
+        return Conversation.objects.get(**Conversation.objects.pair(self.alice.pk, self.bob.pk))
+
+    def test_one_row_per_pair_tracks_last_message_and_unread(self):
+        Message.objects.create(sender=self.alice, receiver=self.bob, content="one")
+        Message.objects.create(sender=self.bob, receiver=self.alice, content="two")
+        last = Message.objects.create(sender=self.alice, receiver=self.bob, content="three")
+
+        self.assertEqual(Conversation.objects.count(), 1)
+        conversation = self.summary()
+        self.assertEqual(conversation.last_message, last)
+        self.assertEqual(conversation.unread_count(self.bob), 2)
+        self.assertEqual(conversation.unread_count(self.alice), 1)
+
+    def test_fetching_a_conversation_clears_the_readers_counter(self):
+        Message.objects.create(sender=self.alice, receiver=self.bob, content="one")
+        Message.objects.create(sender=self.bob, receiver=self.alice, content="two")
+
+        self.client.force_authenticate(self.bob)
+        self.client.get(f"/api/v1/messages/conversation/{self.alice.pk}/")
+
+        conversation = self.summary()
+        self.assertEqual(conversation.unread_count(self.bob), 0)
+        self.assertEqual(conversation.unread_count(self.alice), 1)
+
+    def test_deleting_the_last_message_falls_back_to_the_previous_one(self):
+        first = Message.objects.create(sender=self.alice, receiver=self.bob, content="one")
+        last = Message.objects.create(sender=self.bob, receiver=self.alice, content="two", is_read=True)
+
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.delete(f"/api/v1/messages/{last.pk}/").status_code, 204)
+        conversation = self.summary()
+        self.assertEqual((conversation.last_message, conversation.last_activity), (first, first.timestamp))
+        inbox = self.client.get("/api/v1/messages/conversations/").json()["results"]
+        self.assertEqual(len(inbox), 1)
+
+        first.delete()
+        conversation = self.summary()
+        self.assertEqual((conversation.last_message, conversation.last_activity), (None, None))
+
+    def test_deleting_an_unread_message_takes_it_off_the_counters(self):
+        cache.clear()
+        Message.objects.create(sender=self.alice, receiver=self.bob, content="one")
+        second = Message.objects.create(sender=self.alice, receiver=self.bob, content="two")
+        self.assertEqual(message_unread.get(self.bob.pk), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.summary().unread_count(self.bob), 1)
+        self.assertEqual(message_unread.get(self.bob.pk), 1)
+
+    def test_backfill_rebuilds_summaries(self):
+        Message.objects.create(sender=self.alice, receiver=self.bob, content="one")
+        last = Message.objects.create(sender=self.bob, receiver=self.alice, content="two", is_read=True)
+        Conversation.objects.all().delete()
+
+        call_command("backfill_conversations", batch_size=1, stdout=StringIO())
+
+        conversation = self.summary()
+        self.assertEqual(conversation.last_message, last)
+        self.assertEqual(conversation.last_activity, last.timestamp)
+        self.assertEqual(conversation.unread_count(self.bob), 1)
+        self.assertEqual(conversation.unread_count(self.alice), 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConversationHistoryTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com")
+        self.bob = User.objects.create_user(email="bob@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+        start = timezone.now() - timedelta(hours=1)
+        self.messages = [
+            Message.objects.create(
+                sender=self.alice, receiver=self.bob, content=f"m{i}", timestamp=start + timedelta(minutes=i)
+            )
+            for i in range(5)
+        ]
+        self.url = f"/api/v1/messages/conversation/{self.alice.pk}/"
+
+    def ids(self, body):
+        return [m["message_id"] for m in body["results"]]
+
+    def test_pages_backwards_and_marks_only_delivered_rows_read(self):
+        body = self.client.get(self.url, {"page_size": 2}).json()
+
+        self.assertEqual(self.ids(body), [m.message_id for m in self.messages[3:]])
+        self.assertEqual(
+            list(Message.objects.filter(is_read=True).values_list("message_id", flat=True).order_by("message_id")),
+            [m.message_id for m in self.messages[3:]],
+        )
+        conversation = Conversation.objects.get(**Conversation.objects.pair(self.alice.pk, self.bob.pk))
+        self.assertEqual(conversation.unread_count(self.bob), 3)
+
+        older = self.client.get(body["next"]).json()
+        self.assertEqual(self.ids(older), [m.message_id for m in self.messages[1:3]])
+
+    def test_after_returns_only_newer_messages(self):
+        body = self.client.get(self.url, {"after": self.messages[2].message_id}).json()
+        self.assertEqual(self.ids(body), [m.message_id for m in self.messages[3:]])
+
+        self.assertEqual((body["has_more"], body["next"]), (False, None))
+
+        latest = self.client.get(self.url, {"after": self.messages[-1].message_id}).json()
+        self.assertEqual(latest["results"], [])
+
+    def test_after_signals_truncation_and_links_the_rest(self):
+        body = self.client.get(self.url, {"after": self.messages[0].message_id, "page_size": 3}).json()
+        self.assertEqual(self.ids(body), [m.message_id for m in self.messages[1:4]])
+        self.assertTrue(body["has_more"])
+
+        rest = self.client.get(body["next"]).json()
+        self.assertEqual(self.ids(rest), [self.messages[4].message_id])
+        self.assertEqual((rest["has_more"], rest["next"]), (False, None))
+
+    def test_after_must_belong_to_the_conversation(self):
+        stranger = User.objects.create_user(email="carol@example.com")
+        other = Message.objects.create(sender=stranger, receiver=self.bob, content="hey")
+        response = self.client.get(self.url, {"after": other.message_id})
+        self.assertEqual(response.status_code, 400)
+
+
+class MessageIndexTests(QueryPlanMixin, TestCase):
+    def test_history_uses_pair_time_index(self):
+        history = Message.objects.filter(
+            Q(sender_id=1, receiver_id=2) | Q(sender_id=2, receiver_id=1)
+        ).order_by("-timestamp", "-message_id")
+        self.assertUsesIndex(history, "message_pair_time_idx")
+
+    def test_unread_from_partner_uses_partial_index(self):
+        unread = Message.objects.filter(receiver_id=1, sender_id=2, is_read=False)
+        self.assertUsesIndex(unread, "message_unread_idx")
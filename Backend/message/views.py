@@ -1,8 +1,32 @@
 from rest_framework import viewsets, permissions, decorators, response, status
-from django.db.models import Q, Max, Count, Case, When, IntegerField
-from .models import Message
+from rest_framework.utils.urls import replace_query_param
+from django.db import transaction
+from django.db.models import Q
+from .models import Message, Conversation
 from .serializers import MessageSerializer, ConversationSerializer
-from accounts.models import User
+from swapo.pagination import KeysetCursorPagination
+from realtime.events import publish
+from .counters import message_unread
+
+
+class ConversationPagination(KeysetCursorPagination):
+    ordering = ("-last_activity", "-conversation_id")
+    page_size = 20
+    max_page_size = 50
+
+
+class MessageHistoryPagination(KeysetCursorPagination):
+    """Pages backwards through a conversation, newest messages first."""
+    ordering = ("-timestamp", "-message_id")
+    page_size = 50
+    max_page_size = 200
+
+
+class MessageDeltaPagination(KeysetCursorPagination):
+    """Seeks forwards from a known message to fetch only newer ones."""
+    ordering = ("timestamp", "message_id")
+    page_size = 200
+    max_page_size = 200
 
 
 class MessageViewSet(viewsets.ModelViewSet):
@@ -15,15 +39,39 @@ class MessageViewSet(viewsets.ModelViewSet):
         return Message.objects.filter(Q(sender=user) | Q(receiver=user)).order_by("timestamp")
 
     def perform_create(self, serializer):
-        serializer.save(sender=self.request.user)
+        # The conversation summary is updated by a post_save signal; keep both in one transaction.
+        with transaction.atomic():
+            serializer.save(sender=self.request.user)
+
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        with transaction.atomic():
+            message = serializer.save()
+            if message.is_read and not was_read:
+                Conversation.objects.mark_read(message.receiver_id, message.sender_id, 1)
+                message_unread.add(message.receiver_id, -1)
+                self.publish_read_receipt(message.receiver_id, message.sender_id, [message.message_id])
+
+    def publish_read_receipt(self, reader_id, sender_id, message_ids):
+        """Tell the sender's open connections which of their messages were read"""
+        publish(
+            [sender_id],
+            "message.read",
+            lambda: {"reader_id": reader_id, "message_ids": message_ids},
+        )
 
     @decorators.action(detail=False, methods=["get"], url_path="conversation/(?P<user_id>[^/.]+)")
     def get_conversation(self, request, user_id=None):
         """
         Custom endpoint:
         GET /api/v1/messages/conversation/<user_id>/
-        Returns all messages between the logged-in user and the given user.
-        Marks messages as read.
+        Returns the newest page of messages between the logged-in user and the
+        given user, oldest first. `next` links to the page of older messages.
+        GET /api/v1/messages/conversation/<user_id>/?after=<message_id>
+        Returns only messages newer than `after`, for polling, at most page_size
+        (200) at a time; `has_more` is true and `next` links to the following
+        batch when more are waiting.
+        Marks the delivered messages as read.
         """
         current_user = request.user
 
@@ -31,66 +79,82 @@ class MessageViewSet(viewsets.ModelViewSet):
         messages = Message.objects.filter(
             Q(sender=current_user, receiver__user_id=user_id)
             | Q(sender__user_id=user_id, receiver=current_user)
-        ).order_by("timestamp")
+        ).select_related("sender", "receiver")
+
+        after = request.query_params.get("after")
+        if after:
+            paginator = MessageDeltaPagination()
+            try:
+                anchor = messages.get(message_id=after)
+            except (Message.DoesNotExist, ValueError):
+                return response.Response(
+                    {"detail": "Unknown message id for 'after'"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            page_size = paginator.get_page_size(request)
+            # One extra row tells whether more new messages are waiting.
+            page = list(
+                messages.filter(paginator.get_seek_filter([anchor.timestamp, anchor.message_id]))
+                .order_by(*paginator.ordering)[:page_size + 1]
+            )
+            has_more = len(page) > page_size
+            page = page[:page_size]
+        else:
+            paginator = MessageHistoryPagination()
+            page = paginator.paginate_queryset(messages, request, view=self)[::-1]
 
-        # Mark unread messages as read
-        messages.filter(receiver=current_user, is_read=False).update(is_read=True)
+        # Mark only the delivered unread messages as read
+        unread = [m for m in page if m.receiver_id == current_user.user_id and not m.is_read]
+        if unread:
+            with transaction.atomic():
+                marked = Message.objects.filter(
+                    message_id__in=[m.message_id for m in unread], is_read=False
+                ).update(is_read=True)
+                Conversation.objects.mark_read(current_user.user_id, int(user_id), marked)
+                message_unread.add(current_user.user_id, -marked)
+                self.publish_read_receipt(current_user.user_id, int(user_id), [m.message_id for m in unread])
+            for message in unread:
+                message.is_read = True
 
-        serializer = self.get_serializer(messages, many=True)
-        return response.Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = self.get_serializer(page, many=True)
+        if after:
+            # `next` carries on from the last message delivered, like a poll would.
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "after", page[-1].message_id
+            ) if has_more else None
+            return response.Response(
+                {"next": next_link, "has_more": has_more, "results": serializer.data}, status=status.HTTP_200_OK
+            )
+        return paginator.get_paginated_response(serializer.data)
 
     @decorators.action(detail=False, methods=["get"], url_path="conversations")
     def get_conversations(self, request):
         """
         Custom endpoint:
         GET /api/v1/messages/conversations/
-        Returns a list of all conversations (chat summaries) for the current user.
+        Returns a cursor-paginated list of conversations (chat summaries) for the
+        current user, most recently active first.
         Each conversation includes: other user details, last message, unread count.
         """
         current_user = request.user
 
-        # Get all users the current user has conversed with
-        user_messages = Message.objects.filter(Q(sender=current_user) | Q(receiver=current_user))
-        
-        # Get unique user IDs (excluding current user)
-        other_user_ids = set()
-        for msg in user_messages:
-            if msg.sender.user_id != current_user.user_id:
-                other_user_ids.add(msg.sender.user_id)
-            if msg.receiver.user_id != current_user.user_id:
-                other_user_ids.add(msg.receiver.user_id)
-
-        conversations = []
-        for other_user_id in other_user_ids:
-            try:
-                other_user = User.objects.get(user_id=other_user_id)
-                
-                # Get conversation messages
-                conversation_messages = Message.objects.filter(
-                    Q(sender=current_user, receiver=other_user)
-                    | Q(sender=other_user, receiver=current_user)
-                ).order_by("-timestamp")
-
-                if conversation_messages.exists():
-                    last_message = conversation_messages.first()
-                    
-                    # Count unread messages from the other user
-                    unread_count = conversation_messages.filter(
-                        sender=other_user,
-                        receiver=current_user,
-                        is_read=False
-                    ).count()
-
-                    conversations.append({
-                        "other_user": other_user,
-                        "last_message": last_message,
-                        "unread_count": unread_count,
-                    })
-            except User.DoesNotExist:
-                continue
-
-        # Sort by last message timestamp
-        conversations.sort(key=lambda x: x["last_message"].timestamp, reverse=True)
+        # One indexed read of the maintained summaries, with everything joined in.
+        summaries = Conversation.objects.for_user(current_user).filter(
+            last_message__isnull=False
+        ).select_related(
+            "user_a", "user_b", "last_message__sender", "last_message__receiver"
+        )
+
+        paginator = ConversationPagination()
+        page = paginator.paginate_queryset(summaries, request, view=self)
+
+        conversations = [
+            {
+                "other_user": conversation.other_user(current_user),
+                "last_message": conversation.last_message,
+                "unread_count": conversation.unread_count(current_user),
+            }
+            for conversation in page
+        ]
 
         serializer = ConversationSerializer(conversations, many=True)
-        return response.Response(serializer.data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(serializer.data)
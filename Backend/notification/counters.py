@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from swapo.counters import UnreadCounter
+from .models import Notification, BroadcastNotification
+
+
+class NotificationUnreadCounter(UnreadCounter):
+    """Unread personal notifications plus unread broadcasts."""
+
+    def key(self, user_id):
+        # Bumping the broadcast generation invalidates every user's count at once.
+        return f"{super().key(user_id)}:{self.broadcast_generation()}"
+
+    def broadcast_generation(self):
+        return cache.get_or_set("unread:broadcast_generation", 0, None)
+
+    def broadcast_created(self):
+        def bump():
+            try:
+                cache.incr("unread:broadcast_generation")
+            except ValueError:
+                cache.set("unread:broadcast_generation", 1, None)
+        transaction.on_commit(bump)
+
+    def count_unread(self, user_id):
+        personal = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        broadcasts = BroadcastNotification.objects.for_user(user_id).filter(is_read=False).count()
+        return personal + broadcasts
+
+
+notification_unread = NotificationUnreadCounter("notifications")
@@ -0,0 +1,298 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.dispatch import Signal
+
+from message.models import Message
+from trade.models import Trade, TradeProposal
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Sent with `notifications=[...]` after each bulk insert; bulk_create fires no post_save.
+# Message notifications are coalesced with save()/create() and use post_save instead.
+notifications_created = Signal()
+
+
+def display_name(user):
+    return f"{user.first_name} {user.last_name}" if user.first_name else user.username
+
+
+def message_notification_text(sender, count):
+    if count == 1:
+        return f"New message from {sender.username}"
+    return f"{count} new messages from {sender.username}"
+
+
+def coalesce_message_notifications(message_ids):
+    """
+    Fold new messages into the receiver's unread new_message notification
+    from the same sender, creating one only when none is pending.
+
+    Messages are grouped per (receiver, sender) first, so a burst costs one
+    write however many messages it holds. A burst that cannot be written is
+    logged and skipped; it does not cost the other bursts their notification.
+    """
+    messages = Message.objects.select_related("sender").filter(message_id__in=message_ids).order_by("message_id")
+    bursts = defaultdict(list)
+    for message in messages:
+        bursts[(message.receiver_id, message.sender_id)].append(message)
+    notifications = []
+    for (receiver_id, sender_id), burst in bursts.items():
+        try:
+            notifications.append(fold_message_burst(receiver_id, burst))
+        except IntegrityError:
+            logger.exception(
+                "Failed to notify user %s of %d messages from user %s", receiver_id, len(burst), sender_id
+            )
+    return notifications
+
+
+def fold_message_burst(receiver_id, burst):
+    latest = burst[-1]
+    pending = Notification.objects.filter(
+        user_id=receiver_id, sender_id=latest.sender_id, type="new_message", is_read=False
+    )
+    # Two passes: a conflict on the first means another worker created the
+    # pending row, which the second finds. Anything failing twice is no race.
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                # The row lock makes concurrent senders' increments queue up;
+                # a reader marking it read in between waits for us too.
+                notification = pending.select_for_update().first()
+                if notification is None:
+                    return Notification.objects.create(
+                        user_id=receiver_id,
+                        message=latest,
+                        sender_id=latest.sender_id,
+                        type="new_message",
+                        count=len(burst),
+                        message_text=message_notification_text(latest.sender, len(burst)),
+                        timestamp=latest.timestamp,
+                        link_url=f"/app/dashboard/messages"
+                    )
+                notification.count += len(burst)
+                notification.message = latest
+                notification.message_text = message_notification_text(latest.sender, notification.count)
+                notification.timestamp = latest.timestamp
+                notification.save(update_fields=["count", "message", "message_text", "timestamp"])
+                return notification
+        except IntegrityError:
+            # Another worker created the pending row first (notification_coalesce_uniq);
+            # the next pass finds and updates it. Other violations (a message or
+            # receiver deleted meanwhile) fail the same way again: give up.
+            if attempt:
+                raise
+
+
+def build_proposal_notifications(proposal_ids):
+    proposals = TradeProposal.objects.select_related(
+        "proposer", "skill_offered_by_proposer", "skill_desired_by_proposer"
+    ).filter(proposal_id__in=proposal_ids)
+    return [
+        Notification(
+            user_id=proposal.recipient_id,
+            proposal=proposal,
+            type="trade_proposal",
+            message_text=f"{display_name(proposal.proposer)} {'countered with' if proposal.parent_id else 'proposed'} a trade: {proposal.skill_offered_by_proposer.skill_name} for {proposal.skill_desired_by_proposer.skill_name}",
+            link_url=f"/app/dashboard/proposal/{proposal.proposal_id}"
+        )
+        for proposal in proposals
+    ]
+
+
+def build_proposal_accepted_notifications(proposal_ids):
+    proposals = TradeProposal.objects.select_related("recipient", "trade").filter(proposal_id__in=proposal_ids)
+    notifications = []
+    for proposal in proposals:
+        trade = getattr(proposal, "trade", None)
+        notifications.append(Notification(
+            user_id=proposal.proposer_id,
+            proposal=proposal,
+            trade=trade,
+            type="trade_accepted",
+            message_text=f"{display_name(proposal.recipient).title()} accepted your trade proposal!",
+            link_url=f"/app/dashboard/trade/{trade.trade_id}" if trade else f"/app/dashboard/proposal/{proposal.proposal_id}"
+        ))
+    return notifications
+
+
+def build_proposal_rejected_notifications(proposal_ids):
+    proposals = TradeProposal.objects.select_related("recipient").filter(proposal_id__in=proposal_ids)
+    return [
+        Notification(
+            user_id=proposal.proposer_id,
+            proposal=proposal,
+            type="trade_proposal",
+            message_text=f"{display_name(proposal.recipient)} declined your trade proposal",
+            link_url=f"/app/dashboard/proposal/{proposal.proposal_id}"
+        )
+        for proposal in proposals
+    ]
+
+
+def build_proposal_withdrawn_notifications(proposal_ids):
+    proposals = TradeProposal.objects.select_related("proposer").filter(proposal_id__in=proposal_ids)
+    return [
+        Notification(
+            user_id=proposal.recipient_id,
+            proposal=proposal,
+            type="trade_proposal",
+            message_text=f"{display_name(proposal.proposer)} withdrew their trade proposal",
+            link_url=f"/app/dashboard/proposal/{proposal.proposal_id}"
+        )
+        for proposal in proposals
+    ]
+
+
+TRADE_STATUS_TYPES = {
+    "in_progress": "trade_active",
+    "completed": "trade_completed",
+    "cancelled": "trade_cancelled",
+}
+
+
+def build_trade_status_notifications(trade_statuses):
+    """
+    One notification per participant for each (trade_id, status) transition.
+    The status travels with the event: by the time a worker runs, the trade
+    may already have moved on (started, then completed).
+    """
+    trade_statuses = {(trade_id, status) for trade_id, status in trade_statuses if status in TRADE_STATUS_TYPES}
+    trades = Trade.objects.select_related("user1", "user2", "skill1", "skill2").in_bulk(
+        {trade_id for trade_id, _ in trade_statuses}
+    )
+    status_names = dict(Trade.TRADE_STATUS_CHOICES)
+    # TRADE_STATUS_TYPES is in lifecycle order: "in progress" is written before "completed".
+    lifecycle = list(TRADE_STATUS_TYPES)
+    notifications = []
+    for trade_id, status in sorted(trade_statuses, key=lambda event: (event[0], lifecycle.index(event[1]))):
+        trade = trades.get(trade_id)
+        if trade is None:
+            continue
+        skills = f"{trade.skill1.skill_name} ↔ {trade.skill2.skill_name}"
+        for user, partner in ((trade.user2, trade.user1), (trade.user1, trade.user2)):
+            notifications.append(Notification(
+                user=user,
+                trade=trade,
+                type=TRADE_STATUS_TYPES[status],
+                message_text=f"Trade with {display_name(partner)} is now {status_names[status].lower()}: {skills}",
+                link_url=f"/app/dashboard/trade/{trade.trade_id}"
+            ))
+    return notifications
+
+
+BUILDERS = {
+    "trade_proposal": build_proposal_notifications,
+    "proposal_accepted": build_proposal_accepted_notifications,
+    "proposal_rejected": build_proposal_rejected_notifications,
+    "proposal_withdrawn": build_proposal_withdrawn_notifications,
+    "trade_status": build_trade_status_notifications,
+}
+
+
+class NotificationDispatcher:
+    """
+    Turns (kind, object_id) events into Notification rows off the request path.
+    For "trade_status" the object_id is a (trade_id, new_status) pair.
+
+    In "async" mode events are queued and a small pool of worker threads
+    drains them in batches: duplicate events are coalesced, related rows are
+    loaded with one query per kind and the notifications are written with a
+    single bulk_create (message notifications are folded into the pending
+    row per sender instead, see coalesce_message_notifications).
+
+    The queue lives in process memory and the workers are daemon threads, so
+    events still queued when a worker process dies (crash, kill, a restart
+    that skips atexit) are lost; the atexit drain only covers clean exits.
+
+    In "sync" mode (tests, management commands) each event is processed
+    immediately in the calling thread.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def dispatch(self, kind, object_id):
+        if settings.NOTIFICATION_DISPATCH_MODE == "sync":
+            self.process([(kind, object_id)])
+            return
+        self.start()
+        self.queue.put((kind, object_id))
+
+    def start(self):
+        if self.workers:
+            return
+        with self.lock:
+            if self.workers:
+                return
+            for i in range(settings.NOTIFICATION_DISPATCH_WORKERS):
+                worker = threading.Thread(target=self.work, name=f"notification-dispatch-{i}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+            atexit.register(self.drain)
+
+    def work(self):
+        while True:
+            events = self.next_batch()
+            close_old_connections()
+            try:
+                self.process(events)
+            except Exception:
+                logger.exception("Failed to dispatch %d notification events", len(events))
+            finally:
+                close_old_connections()
+
+    def next_batch(self):
+        """Block for one event, then collect more until the batch fills or the flush interval passes."""
+        events = [self.queue.get()]
+        deadline = time.monotonic() + settings.NOTIFICATION_DISPATCH_FLUSH_INTERVAL
+        while len(events) < settings.NOTIFICATION_DISPATCH_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                events.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return events
+
+    def drain(self):
+        """Process whatever is still queued; registered to run at interpreter exit."""
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if events:
+            self.process(events)
+
+    def process(self, events):
+        ids_by_kind = defaultdict(set)
+        for kind, object_id in events:
+            ids_by_kind[kind].add(object_id)
+
+        # Everything else is written first, so a failing message burst cannot hold it back.
+        message_ids = ids_by_kind.pop("new_message", None)
+        notifications = []
+        for kind, object_ids in ids_by_kind.items():
+            notifications += BUILDERS[kind](object_ids)
+        if notifications:
+            notifications = Notification.objects.bulk_create(notifications)
+            notifications_created.send(sender=Notification, notifications=notifications)
+
+        coalesced = coalesce_message_notifications(message_ids) if message_ids else []
+        return coalesced + notifications
+
+
+dispatcher = NotificationDispatcher()
@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
-from notification.models import Notification
+from django.db.models import Exists, OuterRef
+from notification.dispatcher import notifications_created
+from notification.models import Notification, BroadcastNotification
 from accounts.models import User
 
 
@@ -13,29 +15,93 @@ class Command(BaseCommand):
             default='Welcome to Swapo! Start trading skills with other users today.',
             help='The message for the system announcement'
         )
+        parser.add_argument(
+            '--per-user',
+            action='store_true',
+            help='Write one notification row per user instead of a single broadcast'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of notifications inserted per batch'
+        )
+        parser.add_argument(
+            '--start-after',
+            type=int,
+            default=0,
+            help='Resume after this user_id (the last one reported by an interrupted run)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many users would receive the announcement'
+        )
 
     def handle(self, *args, **options):
+        if options['per_user']:
+            self.create_per_user(options)
+        else:
+            self.create_broadcast(options)
+
+    def create_broadcast(self, options):
+        """One row shown to every user; read/dismiss state is tracked per user on demand."""
+        message = options['message']
+        existing = BroadcastNotification.objects.filter(type='system_alert', message_text=message)
+
+        if options['dry_run']:
+            self.stdout.write(f'Would create {0 if existing.exists() else 1} system announcement broadcasts')
+            return
+
+        _, created = BroadcastNotification.objects.get_or_create(type='system_alert', message_text=message)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully created {int(created)} system announcement broadcasts')
+        )
+
+    def create_per_user(self, options):
         message = options['message']
-        users = User.objects.all()
-        
+        batch_size = options['batch_size']
+
+        # Anti-join: users who do not have this system announcement yet.
+        already_announced = Notification.objects.filter(
+            user=OuterRef('pk'),
+            type='system_alert',
+            message_text=message
+        )
+        recipients = User.objects.filter(
+            user_id__gt=options['start_after']
+        ).exclude(Exists(already_announced)).order_by('user_id')
+
+        if options['dry_run']:
+            self.stdout.write(f'Would create {recipients.count()} system announcement notifications')
+            return
+
         created_count = 0
-        for user in users:
-            # Check if user already has this system announcement
-            existing = Notification.objects.filter(
-                user=user,
-                type='system_alert',
-                message_text=message
-            ).exists()
-            
-            if not existing:
-                Notification.objects.create(
-                    user=user,
+        last_user_id = options['start_after']
+        while True:
+            # Seek past the last user each batch so a batch is one indexed range
+            # scan and an interrupted run can resume with --start-after.
+            user_ids = list(
+                recipients.filter(user_id__gt=last_user_id).values_list('user_id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id,
                     type='system_alert',
                     message_text=message,
                     is_read=False
                 )
-                created_count += 1
-        
+                for user_id in user_ids
+            ])
+            notifications_created.send(sender=Notification, notifications=notifications)
+
+            created_count += len(notifications)
+            last_user_id = user_ids[-1]
+            self.stdout.write(f'  {created_count} created, last user_id {last_user_id}')
+
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {created_count} system announcement notifications')
         )
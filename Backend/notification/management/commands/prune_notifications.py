@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from notification.retention import run_retention
+
+
+class Command(BaseCommand):
+    help = 'Compact repeated message notifications and prune expired read notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rows touched per transaction (defaults to NOTIFICATION_RETENTION_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            default=None,
+            help='Copy pruned rows to the archive table before deleting them'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between prune batches'
+        )
+
+    def handle(self, *args, **options):
+        stats = run_retention(
+            batch_size=options['batch_size'],
+            archive=options['archive'],
+            pause=options['pause'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compacted {stats['compacted']} and pruned {stats['pruned']} notifications "
+                f"({stats['archived']} archived)"
+            )
+        )
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0003_hot_path_indexes'),
+        ('notification', '0002_alter_notification_type'),
+        ('trade', '0002_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-timestamp', '-notification_id'], name='notification_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', '-timestamp'], name='notification_unread_idx'),
+        ),
+    ]
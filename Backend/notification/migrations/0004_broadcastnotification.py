@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('broadcast_id', models.AutoField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('new_message', 'New Message'), ('trade_proposal', 'Trade Proposal'), ('trade_accepted', 'Trade Accepted'), ('trade_active', 'Active Trade'), ('trade_completed', 'Trade Completed'), ('system_alert', 'System Alert')], default='system_alert', max_length=50)),
+                ('message_text', models.TextField()),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('link_url', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_dismissed', models.BooleanField(default=False)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='notification.broadcastnotification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_receipts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'broadcast'), name='unique_broadcast_receipt')],
+            },
+        ),
+    ]
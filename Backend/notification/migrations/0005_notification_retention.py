@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_senders(apps, schema_editor):
+    Notification = apps.get_model('notification', 'Notification')
+    Message = apps.get_model('message', 'Message')
+    Notification.objects.filter(message__isnull=False, sender__isnull=True).update(
+        sender=models.Subquery(
+            Message.objects.filter(message_id=models.OuterRef('message_id')).values('sender_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0003_hot_path_indexes'),
+        ('notification', '0004_broadcastnotification'),
+        ('trade', '0002_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('notification_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField(db_index=True)),
+                ('type', models.CharField(choices=[('new_message', 'New Message'), ('trade_proposal', 'Trade Proposal'), ('trade_accepted', 'Trade Accepted'), ('trade_active', 'Active Trade'), ('trade_completed', 'Trade Completed'), ('system_alert', 'System Alert')], max_length=50)),
+                ('message_text', models.TextField()),
+                ('timestamp', models.DateTimeField()),
+                ('link_url', models.CharField(blank=True, max_length=255, null=True)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['type', 'timestamp'], name='notification_retention_idx'),
+        ),
+        migrations.RunPython(backfill_senders, migrations.RunPython.noop),
+    ]
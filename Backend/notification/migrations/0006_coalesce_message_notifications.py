@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def collapse_pending_message_notifications(apps, schema_editor):
+    """Fold existing duplicates into the newest row so the constraint can be added."""
+    Notification = apps.get_model('notification', 'Notification')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    pending = Notification.objects.filter(type='new_message', is_read=False, sender__isnull=False)
+    groups = (
+        pending.values('user_id', 'sender_id')
+        .annotate(rows=models.Count('notification_id'), keep=models.Max('notification_id'), total=models.Sum('count'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in list(groups):
+        sender = User.objects.get(pk=group['sender_id'])
+        Notification.objects.filter(notification_id=group['keep']).update(
+            count=group['total'], message_text=f"{group['total']} new messages from {sender.username}"
+        )
+        pending.filter(
+            user_id=group['user_id'], sender_id=group['sender_id'], notification_id__lt=group['keep']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0003_hot_path_indexes'),
+        ('notification', '0005_notification_retention'),
+        ('trade', '0002_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(collapse_pending_message_notifications, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False), ('type', 'new_message')), fields=('user', 'sender'), name='notification_coalesce_uniq'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0006_coalesce_message_notifications'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivednotification',
+            name='type',
+            field=models.CharField(choices=[('new_message', 'New Message'), ('trade_proposal', 'Trade Proposal'), ('trade_accepted', 'Trade Accepted'), ('trade_active', 'Active Trade'), ('trade_completed', 'Trade Completed'), ('trade_cancelled', 'Trade Cancelled'), ('system_alert', 'System Alert')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='broadcastnotification',
+            name='type',
+            field=models.CharField(choices=[('new_message', 'New Message'), ('trade_proposal', 'Trade Proposal'), ('trade_accepted', 'Trade Accepted'), ('trade_active', 'Active Trade'), ('trade_completed', 'Trade Completed'), ('trade_cancelled', 'Trade Cancelled'), ('system_alert', 'System Alert')], default='system_alert', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(choices=[('new_message', 'New Message'), ('trade_proposal', 'Trade Proposal'), ('trade_accepted', 'Trade Accepted'), ('trade_active', 'Active Trade'), ('trade_completed', 'Trade Completed'), ('trade_cancelled', 'Trade Cancelled'), ('system_alert', 'System Alert')], max_length=50),
+        ),
+    ]
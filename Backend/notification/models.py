@@ -1,5 +1,5 @@
 from django.db import models
-from django.db import models
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from accounts.models import User
 from trade.models import Trade, TradeProposal
@@ -13,6 +13,7 @@ class Notification(models.Model):
         ("trade_accepted", "Trade Accepted"),
         ("trade_active", "Active Trade"),
         ("trade_completed", "Trade Completed"),
+        ("trade_cancelled", "Trade Cancelled"),
         ("system_alert", "System Alert"),
     ]
 
@@ -22,12 +23,106 @@ class Notification(models.Model):
     message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name="notifications")
     proposal = models.ForeignKey(TradeProposal, on_delete=models.SET_NULL, null=True, blank=True, related_name="notifications")
     trade = models.ForeignKey(Trade, on_delete=models.SET_NULL, null=True, blank=True, related_name="notifications")
+    # Who triggered a new_message notification; kept when the message itself is deleted.
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
 
     type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
     message_text = models.TextField()
     timestamp = models.DateTimeField(default=timezone.now)
     is_read = models.BooleanField(default=False)
     link_url = models.CharField(max_length=255, blank=True, null=True)
+    # Number of events folded into this row, e.g. several messages from one sender.
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Notification list: a user's notifications, newest first.
+            models.Index(fields=["user", "-timestamp", "-notification_id"], name="notification_user_time_idx"),
+            # Unread count and mark_all_read; only unread rows are indexed.
+            models.Index(
+                fields=["user", "-timestamp"], condition=models.Q(is_read=False), name="notification_unread_idx"
+            ),
+            # Retention: old read rows of a type; unread rows are never pruned.
+            models.Index(
+                fields=["type", "timestamp"], condition=models.Q(is_read=True), name="notification_retention_idx"
+            ),
+        ]
+        constraints = [
+            # At most one pending message notification per sender; new messages are folded into it.
+            models.UniqueConstraint(
+                fields=["user", "sender"],
+                condition=models.Q(type="new_message", is_read=False),
+                name="notification_coalesce_uniq",
+            ),
+        ]
 
     def __str__(self):
         return f"Notification {self.notification_id} for {self.user} - {self.type}"
+
+
+class ArchivedNotification(models.Model):
+    """Read notifications moved out of the live table by the retention job."""
+    notification_id = models.IntegerField(primary_key=True)
+    user_id = models.IntegerField(db_index=True)
+    type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES)
+    message_text = models.TextField()
+    timestamp = models.DateTimeField()
+    link_url = models.CharField(max_length=255, blank=True, null=True)
+    count = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived notification {self.notification_id} for user {self.user_id}"
+
+
+class BroadcastNotificationManager(models.Manager):
+    def for_user(self, user):
+        """Broadcasts the user has not dismissed, annotated with their own `is_read`."""
+        receipts = BroadcastReceipt.objects.filter(broadcast=OuterRef("pk"), user=user)
+        return self.exclude(
+            Exists(receipts.filter(is_dismissed=True))
+        ).annotate(
+            is_read=Exists(receipts.filter(is_read=True))
+        ).order_by("-timestamp", "-broadcast_id")
+
+
+class BroadcastNotification(models.Model):
+    """
+    A notification addressed to every user, stored once. Per-user state lives
+    in BroadcastReceipt rows that only exist once a user reads or dismisses it.
+    """
+    broadcast_id = models.AutoField(primary_key=True)
+    type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES, default="system_alert")
+    message_text = models.TextField()
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    link_url = models.CharField(max_length=255, blank=True, null=True)
+
+    objects = BroadcastNotificationManager()
+
+    def __str__(self):
+        return f"Broadcast {self.broadcast_id} - {self.type}"
+
+
+class BroadcastReceipt(models.Model):
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name="receipts")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="broadcast_receipts")
+    is_read = models.BooleanField(default=False)
+    is_dismissed = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "broadcast"], name="unique_broadcast_receipt"),
+        ]
+
+    @classmethod
+    def mark(cls, user, broadcast_ids, **state):
+        """Upsert the user's receipts for the given broadcasts in one statement."""
+        return cls.objects.bulk_create(
+            [cls(user=user, broadcast_id=broadcast_id, **state) for broadcast_id in broadcast_ids],
+            update_conflicts=True,
+            unique_fields=["user", "broadcast"],
+            update_fields=list(state),
+        )
+
+    def __str__(self):
+        return f"Receipt of broadcast {self.broadcast_id} for {self.user}"
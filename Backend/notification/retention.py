@@ -0,0 +1,107 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from accounts.models import User
+from .counters import notification_unread
+from .dispatcher import message_notification_text
+from .models import Notification, ArchivedNotification
+
+logger = logging.getLogger(__name__)
+
+
+def retention_cutoffs(now):
+    """Per-type cutoff: read notifications older than this are pruned."""
+    days = settings.NOTIFICATION_RETENTION_DAYS
+    default = settings.NOTIFICATION_RETENTION_DEFAULT_DAYS
+    return {
+        notification_type: now - timedelta(days=days.get(notification_type, default))
+        for notification_type, _ in Notification.NOTIFICATION_TYPES
+    }
+
+
+def compact_message_notifications(batch_size):
+    """
+    Collapse every user's new_message notifications from the same sender (and
+    with the same read state) into the newest one, carrying the summed count.
+    Returns the number of rows removed.
+    """
+    removed = 0
+    while True:
+        groups = list(
+            Notification.objects.filter(type="new_message", sender__isnull=False)
+            .values("user_id", "sender_id", "is_read")
+            .annotate(rows=Count("notification_id"), keep=Max("notification_id"), total=Sum("count"))
+            .filter(rows__gt=1)
+            .order_by()[:batch_size]
+        )
+        if not groups:
+            return removed
+
+        senders = User.objects.in_bulk({group["sender_id"] for group in groups})
+        with transaction.atomic():
+            for group in groups:
+                sender = senders[group["sender_id"]]
+                Notification.objects.filter(notification_id=group["keep"]).update(
+                    count=group["total"],
+                    message_text=message_notification_text(sender, group["total"]),
+                )
+                removed += Notification.objects.filter(
+                    user_id=group["user_id"],
+                    sender_id=group["sender_id"],
+                    is_read=group["is_read"],
+                    type="new_message",
+                    notification_id__lt=group["keep"],
+                ).delete()[0]
+                if not group["is_read"]:
+                    notification_unread.reset(group["user_id"])
+
+
+def prune_read_notifications(now, batch_size, archive, pause):
+    """Delete (or archive, then delete) read notifications past their type's TTL, a batch at a time."""
+    pruned = 0
+    for notification_type, cutoff in retention_cutoffs(now).items():
+        expired = Notification.objects.filter(type=notification_type, is_read=True, timestamp__lt=cutoff)
+        while True:
+            rows = list(
+                expired.values(
+                    "notification_id", "user_id", "type", "message_text", "timestamp", "link_url", "count"
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            with transaction.atomic():
+                if archive:
+                    ArchivedNotification.objects.bulk_create(
+                        [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+                    )
+                Notification.objects.filter(
+                    notification_id__in=[row["notification_id"] for row in rows]
+                ).delete()
+            pruned += len(rows)
+            if pause:
+                # Give replicas and concurrent writers room between batches.
+                time.sleep(pause)
+    return pruned
+
+
+def run_retention(batch_size=None, archive=None, pause=0, now=None):
+    """
+    Entry point for schedulers (cron, Celery beat, ...): compacts message
+    notifications, then prunes expired read notifications. Safe to run
+    repeatedly or concurrently with normal traffic; each batch is its own
+    short transaction.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_RETENTION_BATCH_SIZE
+    archive = settings.NOTIFICATION_RETENTION_ARCHIVE if archive is None else archive
+    now = now or timezone.now()
+
+    compacted = compact_message_notifications(batch_size)
+    pruned = prune_read_notifications(now, batch_size, archive, pause)
+    logger.info("Notification retention: %d compacted, %d pruned", compacted, pruned)
+    return {"compacted": compacted, "pruned": pruned, "archived": pruned if archive else 0}
@@ -1,5 +1,15 @@
 from rest_framework import serializers
-from .models import Notification
+from .models import Notification, BroadcastNotification
+
+
+def user_details(user):
+    return {
+        "user_id": user.user_id,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "profile_picture_url": user.profile_picture_url,
+    }
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -13,29 +23,23 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["notification_id", "timestamp"]
 
+    # Every field below reads relations NotificationViewSet.get_queryset joins
+    # in with select_related; `*_id` checks avoid touching absent relations.
+
     def get_sender_details(self, obj):
         # Get sender from message if it's a message notification
-        if obj.message and obj.message.sender:
-            return {
-                "user_id": obj.message.sender.user_id,
-                "username": obj.message.sender.username,
-                "first_name": obj.message.sender.first_name,
-                "last_name": obj.message.sender.last_name,
-                "profile_picture_url": obj.message.sender.profile_picture_url,
-            }
+        if obj.message_id and obj.message.sender_id:
+            return user_details(obj.message.sender)
         # Get proposer from trade proposal if it's a trade notification
-        elif obj.proposal and obj.proposal.proposer:
-            return {
-                "user_id": obj.proposal.proposer.user_id,
-                "username": obj.proposal.proposer.username,
-                "first_name": obj.proposal.proposer.first_name,
-                "last_name": obj.proposal.proposer.last_name,
-                "profile_picture_url": obj.proposal.proposer.profile_picture_url,
-            }
+        elif obj.proposal_id and obj.proposal.proposer_id:
+            return user_details(obj.proposal.proposer)
+        # Coalesced or compacted rows whose message is gone keep the sender itself
+        elif obj.sender_id:
+            return user_details(obj.sender)
         return None
 
     def get_message_details(self, obj):
-        if obj.message:
+        if obj.message_id:
             return {
                 "message_id": obj.message.message_id,
                 "content": obj.message.content,
@@ -44,7 +48,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         return None
 
     def get_proposal_details(self, obj):
-        if obj.proposal:
+        if obj.proposal_id:
             return {
                 "proposal_id": obj.proposal.proposal_id,
                 "status": obj.proposal.status,
@@ -52,9 +56,28 @@ class NotificationSerializer(serializers.ModelSerializer):
         return None
 
     def get_trade_details(self, obj):
-        if obj.trade:
+        if obj.trade_id:
             return {
                 "trade_id": obj.trade.trade_id,
                 "status": obj.trade.status,
             }
         return None
+
+
+class BroadcastNotificationSerializer(serializers.ModelSerializer):
+    is_read = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = BroadcastNotification
+        fields = ["broadcast_id", "type", "message_text", "timestamp", "is_read", "link_url"]
+
+    def to_representation(self, obj):
+        # Same keys as a personal notification so clients can render both alike;
+        # `broadcast_id` tells them apart.
+        data = dict.fromkeys([
+            "notification_id", "user", "message", "proposal", "trade", "sender",
+            "sender_details", "message_details", "proposal_details", "trade_details",
+        ])
+        data["count"] = 1
+        data.update(super().to_representation(obj))
+        return data
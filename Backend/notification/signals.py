@@ -1,106 +1,52 @@
+from collections import Counter
+
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from message.models import Message
-from trade.models import TradeProposal, Trade
-from .models import Notification
+from trade.models import TradeProposal
+from .dispatcher import dispatcher, notifications_created
+from .models import Notification, BroadcastNotification
+from .counters import notification_unread
+
+
+def dispatch_on_commit(kind, object_id):
+    """Hand the event to the dispatcher once the triggering write is committed"""
+    transaction.on_commit(lambda: dispatcher.dispatch(kind, object_id))
 
 
 @receiver(post_save, sender=Message)
 def create_message_notification(sender, instance, created, **kwargs):
     """Create notification when a new message is sent"""
     if created:
-        Notification.objects.create(
-            user=instance.receiver,
-            message=instance,
-            type="new_message",
-            message_text=f"New message from {instance.sender.username}",
-            link_url=f"/app/dashboard/messages"
-        )
+        dispatch_on_commit("new_message", instance.message_id)
 
 
 @receiver(post_save, sender=TradeProposal)
 def create_trade_proposal_notification(sender, instance, created, **kwargs):
     """Create notification when a new trade proposal is made"""
+    # Status changes go through trade.workflow, which dispatches its own events.
     if created:
-        proposer_name = f"{instance.proposer.first_name} {instance.proposer.last_name}" if instance.proposer.first_name else instance.proposer.username
-        Notification.objects.create(
-            user=instance.recipient,
-            proposal=instance,
-            type="trade_proposal",
-            message_text=f"{proposer_name} proposed a trade: {instance.skill_offered_by_proposer.skill_name} for {instance.skill_desired_by_proposer.skill_name}",
-            link_url=f"/app/dashboard/proposal/{instance.proposal_id}"
-        )
-    elif not created and instance.status == "accepted":
-        # Notify the proposer when their proposal is accepted
-        recipient_name = (
-            f"{instance.recipient.first_name} {instance.recipient.last_name}"
-            if instance.recipient.first_name
-            else instance.recipient.username
-        ).title()
+        dispatch_on_commit("trade_proposal", instance.proposal_id)
+
 
-        Notification.objects.create(
-            user=instance.proposer,
-            proposal=instance,
-            type="trade_accepted",
-            message_text=f"{recipient_name} accepted your trade proposal!",
-            link_url=f"/app/dashboard/proposal/{instance.proposal_id}"
-        )
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    """Keep the cached unread count in step with notifications saved one at a time"""
+    if created and not instance.is_read:
+        notification_unread.add(instance.user_id, 1)
 
-@receiver(post_save, sender=Trade)
-def create_trade_notification(sender, instance, created, **kwargs):
-    """Create notification when a trade is created or status changes"""
-    user1_name = f"{instance.user1.first_name} {instance.user1.last_name}" if instance.user1.first_name else instance.user1.username
-    user2_name = f"{instance.user2.first_name} {instance.user2.last_name}" if instance.user2.first_name else instance.user2.username
-    
-    if created and instance.proposal:
-        # Notify both users that a trade has been created
-        # Notify user2
-        Notification.objects.create(
-            user=instance.user2,
-            trade=instance,
-            type="trade_accepted",
-            message_text=f"Trade started with {user1_name}: {instance.skill1.skill_name} ↔ {instance.skill2.skill_name}",
-            link_url=f"/app/dashboard/trade/{instance.trade_id}"
-        )
-        
-        # Notify user1
-        Notification.objects.create(
-            user=instance.user1,
-            trade=instance,
-            type="trade_accepted",
-            message_text=f"Trade started with {user2_name}: {instance.skill1.skill_name} ↔ {instance.skill2.skill_name}",
-            link_url=f"/app/dashboard/trade/{instance.trade_id}"
-        )
-    
-    elif not created and instance.status in ['active', 'in_progress']:
-        # Notify both users when trade becomes active or in progress
-        # Check if notification already exists to avoid duplicates
-        existing_active_notif_user1 = Notification.objects.filter(
-            user=instance.user1,
-            trade=instance,
-            type="trade_active"
-        ).exists()
-        
-        existing_active_notif_user2 = Notification.objects.filter(
-            user=instance.user2,
-            trade=instance,
-            type="trade_active"
-        ).exists()
-        
-        if not existing_active_notif_user2:
-            Notification.objects.create(
-                user=instance.user2,
-                trade=instance,
-                type="trade_active",
-                message_text=f"Trade with {user1_name} is now {instance.status}: {instance.skill1.skill_name} ↔ {instance.skill2.skill_name}",
-                link_url=f"/app/dashboard/trade/{instance.trade_id}"
-            )
-        
-        if not existing_active_notif_user1:
-            Notification.objects.create(
-                user=instance.user1,
-                trade=instance,
-                type="trade_active",
-                message_text=f"Trade with {user2_name} is now {instance.status}: {instance.skill1.skill_name} ↔ {instance.skill2.skill_name}",
-                link_url=f"/app/dashboard/trade/{instance.trade_id}"
-            )
+
+@receiver(notifications_created)
+def count_new_notifications(sender, notifications, **kwargs):
+    """Keep the cached unread count in step with notifications written in bulk"""
+    per_user = Counter(n.user_id for n in notifications if not n.is_read)
+    for user_id, count in per_user.items():
+        notification_unread.add(user_id, count)
+
+
+@receiver(post_save, sender=BroadcastNotification)
+def count_new_broadcast(sender, instance, created, **kwargs):
+    """A broadcast is unread for everyone; invalidate all cached counts at once"""
+    if created:
+        notification_unread.broadcast_created()
@@ -1,3 +1,434 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from listings.models import SkillListing
+from message.models import Message
+from skills.models import Skill
+from swapo.testing import QueryPlanMixin
+from trade.models import Trade, TradeProposal
+from trade.workflow import complete_trade, start_trade
+from .counters import notification_unread
+from .dispatcher import NotificationDispatcher
+from .models import Notification, BroadcastNotification, ArchivedNotification
+from .retention import run_retention
+
+
+class NotificationIndexTests(QueryPlanMixin, TestCase):
+    def test_list_uses_user_time_index(self):
+        listing = Notification.objects.filter(user_id=1).order_by("-timestamp", "-notification_id")
+        self.assertUsesIndex(listing, "notification_user_time_idx")
+
+    def test_unread_uses_partial_index(self):
+        unread = Notification.objects.filter(user_id=1, is_read=False)
+        self.assertUsesIndex(unread, "notification_unread_idx")
+
+
+class NotificationTestData:
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com", first_name="Alice")
+        self.bob = User.objects.create_user(email="bob@example.com")
+        self.guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+        self.python = Skill.objects.create(skill_name="Python", category="Programming")
+        self.listing = SkillListing.objects.create(
+            user=self.bob, skill_offered=self.python, skill_desired=self.guitar, title="t", description="d"
+        )
+
+    def make_trade(self):
+        proposal = TradeProposal.objects.create(
+            listing=self.listing, proposer=self.alice, recipient=self.bob,
+            skill_offered_by_proposer=self.guitar, skill_desired_by_proposer=self.python, message="hi",
+        )
+        return Trade.objects.create(
+            proposal=proposal, user1=self.alice, user2=self.bob,
+            skill1=self.guitar, skill2=self.python, terms_agreed="hi",
+        )
+
+
+@override_settings(NOTIFICATION_DISPATCH_MODE="sync")
+class NotificationSignalTests(NotificationTestData, TestCase):
+    def test_message_notification_is_written_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            message = Message.objects.create(sender=self.alice, receiver=self.bob, content="hi")
+            self.assertFalse(Notification.objects.exists())
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.user, notification.message, notification.type), (self.bob, message, "new_message"))
+
+    def send(self, sender, content="hi"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=sender, receiver=self.bob, content=content)
+
+    def test_messages_from_one_sender_fold_into_the_pending_notification(self):
+        for i in range(3):
+            latest = self.send(self.alice, content=f"m{i}")
+        self.send(User.objects.create_user(email="carol@example.com"))
+
+        notification = Notification.objects.get(sender=self.alice)
+        self.assertEqual(notification.count, 3)
+        self.assertEqual(notification.message, latest)
+        self.assertEqual(notification.timestamp, latest.timestamp)
+        self.assertEqual(notification.message_text, f"3 new messages from {self.alice.username}")
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_new_row_once_the_pending_one_is_read(self):
+        self.send(self.alice)
+        Notification.objects.update(is_read=True)
+        self.send(self.alice)
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list("is_read", "count")), [(False, 1), (True, 1)]
+        )
+
+    def test_second_pending_row_per_sender_is_rejected(self):
+        self.send(self.alice)
+        with self.assertRaises(IntegrityError):
+            Notification.objects.create(user=self.bob, sender=self.alice, type="new_message", message_text="m")
+
+
+class NotificationDispatcherTests(NotificationTestData, TestCase):
+    def test_batch_cost_does_not_grow_with_events(self):
+        dispatcher = NotificationDispatcher()
+
+        def dispatch_messages(count):
+            ids = [Message.objects.create(sender=self.alice, receiver=self.bob, content="hi").pk for _ in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                dispatcher.process([("new_message", pk) for pk in ids])
+            return len(ctx.captured_queries)
+
+        self.assertEqual(dispatch_messages(2), dispatch_messages(20))
+
+    def test_duplicate_events_are_coalesced(self):
+        trade = self.make_trade()
+        Trade.objects.filter(pk=trade.pk).update(status="completed")
+        NotificationDispatcher().process([("trade_status", (trade.pk, "completed"))] * 5)
+        self.assertEqual(Notification.objects.filter(type="trade_completed", trade=trade).count(), 2)
+
+    def test_quick_transitions_each_notify_their_own_status(self):
+        trade = self.make_trade()
+        Notification.objects.all().delete()
+        with self.captureOnCommitCallbacks() as callbacks:
+            start_trade(trade.pk, self.alice)
+            complete_trade(trade.pk, self.bob)
+        # Both events are handled after the trade already reads "completed".
+        with self.settings(NOTIFICATION_DISPATCH_MODE="sync"):
+            for callback in callbacks:
+                callback()
+
+        notifications = Notification.objects.filter(trade=trade, user=self.bob).order_by("notification_id")
+        self.assertEqual([n.type for n in notifications], ["trade_active", "trade_completed"])
+        self.assertIn("is now in progress", notifications[0].message_text)
+
+    def test_transitions_in_one_batch_are_not_coalesced(self):
+        trade = self.make_trade()
+        Trade.objects.filter(pk=trade.pk).update(status="completed")
+        NotificationDispatcher().process([("trade_status", (trade.pk, "completed")), ("trade_status", (trade.pk, "in_progress"))])
+        notifications = Notification.objects.filter(trade=trade, user=self.bob, type__startswith="trade_")
+        self.assertEqual(
+            [n.type for n in notifications.order_by("notification_id")], ["trade_active", "trade_completed"]
+        )
+
+
+class NotificationDispatcherFailureTests(NotificationTestData, TransactionTestCase):
+    # Foreign keys are only checked when a transaction commits, which TestCase never lets happen.
+    def test_failing_burst_does_not_drop_the_rest_of_the_batch(self):
+        proposal = TradeProposal.objects.create(
+            listing=self.listing, proposer=self.alice, recipient=self.bob,
+            skill_offered_by_proposer=self.guitar, skill_desired_by_proposer=self.python, message="hi",
+        )
+        Notification.objects.all().delete()
+        with connection.constraint_checks_disabled():
+            orphan, message = Message.objects.bulk_create([
+                Message(sender=self.alice, receiver_id=self.bob.pk + 100, content="lost"),
+                Message(sender=self.alice, receiver=self.bob, content="hi"),
+            ])
+
+        with self.assertLogs("notification.dispatcher", "ERROR"):
+            NotificationDispatcher().process([
+                ("new_message", orphan.pk), ("new_message", message.pk), ("trade_proposal", proposal.pk),
+            ])
+
+        self.assertTrue(Notification.objects.filter(user=self.bob, type="new_message", message=message).exists())
+        self.assertTrue(Notification.objects.filter(user=self.bob, type="trade_proposal", proposal=proposal).exists())
+
+
+class SystemAnnouncementCommandTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(email=f"user{i}@example.com") for i in range(7)]
+
+    def announce(self, **options):
+        out = StringIO()
+        call_command("create_system_announcement", message="Hello", per_user=True, stdout=out, **options)
+        return out.getvalue()
+
+    def test_batches_skip_users_who_already_have_it(self):
+        Notification.objects.create(user=self.users[2], type="system_alert", message_text="Hello")
+
+        self.announce(batch_size=2)
+        self.announce(batch_size=2)
+
+        counts = Notification.objects.filter(type="system_alert").values_list("user_id", flat=True)
+        self.assertEqual(sorted(counts), sorted(u.pk for u in self.users))
+
+    def test_query_count_depends_on_batches_not_users(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.announce(batch_size=100)
+        # One select and one insert for the only batch, one select to find the end.
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_dry_run_and_resume(self):
+        self.assertIn("Would create 7", self.announce(dry_run=True))
+        self.assertFalse(Notification.objects.exists())
+
+        self.announce(start_after=self.users[3].pk)
+        self.assertEqual(Notification.objects.count(), 3)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BroadcastNotificationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="reader@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.personal = Notification.objects.create(user=self.user, type="new_message", message_text="hi")
+        cache.clear()
+
+    def post(self, url):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url)
+
+    def unread_count(self):
+        return self.client.get("/api/v1/notifications/unread_count/").json()["unread_count"]
+
+    def test_announcement_is_a_single_row(self):
+        call_command("create_system_announcement", message="Hello", stdout=StringIO())
+        call_command("create_system_announcement", message="Hello", stdout=StringIO())
+        self.assertEqual(BroadcastNotification.objects.count(), 1)
+        self.assertEqual(Notification.objects.filter(type="system_alert").count(), 0)
+
+    def test_list_merges_broadcasts_newest_first(self):
+        broadcast = BroadcastNotification.objects.create(message_text="Maintenance tonight")
+
+        body = self.client.get("/api/v1/notifications/").json()["results"]
+
+        self.assertEqual([n["broadcast_id"] for n in body[:1]], [broadcast.broadcast_id])
+        self.assertEqual(body[1]["notification_id"], self.personal.notification_id)
+        self.assertEqual(set(body[0]), set(body[1]) | {"broadcast_id"})
+        self.assertEqual(self.unread_count(), 2)
+
+    def test_read_and_dismiss_are_per_user(self):
+        broadcast = BroadcastNotification.objects.create(message_text="Maintenance tonight")
+        other = User.objects.create_user(email="other@example.com")
+
+        self.post(f"/api/v1/notifications/broadcasts/{broadcast.broadcast_id}/read/")
+        self.assertEqual(self.unread_count(), 1)
+        self.assertEqual(BroadcastNotification.objects.for_user(other).get().is_read, False)
+
+        self.post(f"/api/v1/notifications/broadcasts/{broadcast.broadcast_id}/dismiss/")
+        body = self.client.get("/api/v1/notifications/").json()["results"]
+        self.assertEqual([n["notification_id"] for n in body], [self.personal.notification_id])
+
+    def test_mark_all_read_covers_broadcasts(self):
+        BroadcastNotification.objects.create(message_text="one")
+        BroadcastNotification.objects.create(message_text="two")
+        self.post("/api/v1/notifications/mark_all_read/")
+        self.assertEqual(self.unread_count(), 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATION_DISPATCH_MODE="sync")
+class UnreadCounterTests(NotificationTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def badges(self):
+        with CaptureQueriesContext(connection) as ctx:
+            body = self.client.get("/api/v1/notifications/badges/").json()
+        return body, len(ctx.captured_queries)
+
+    def send(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                Message.objects.create(sender=self.alice, receiver=self.bob, content="hi")
+
+    def test_counters_follow_creates_and_reads_without_recounting(self):
+        self.assertEqual(self.badges()[0], {"notifications": 0, "messages": 0})
+
+        self.send(3)
+        body, queries = self.badges()
+        # Three messages from one sender share one coalesced notification.
+        self.assertEqual(body, {"notifications": 1, "messages": 3})
+        self.assertEqual(queries, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(f"/api/v1/messages/conversation/{self.alice.pk}/")
+            self.client.post("/api/v1/notifications/mark_all_read/")
+        self.assertEqual(self.badges()[0], {"notifications": 0, "messages": 0})
+
+    def test_new_broadcast_invalidates_every_cached_count(self):
+        self.badges()
+        with self.captureOnCommitCallbacks(execute=True):
+            BroadcastNotification.objects.create(message_text="Hello all")
+        self.assertEqual(self.badges()[0]["notifications"], 1)
+
+    def test_missing_counter_is_recounted_from_the_database(self):
+        self.badges()
+        Notification.objects.create(user=self.bob, type="system_alert", message_text="no commit hook ran")
+        cache.delete(notification_unread.key(self.bob.pk))
+        self.assertEqual(self.badges()[0]["notifications"], 1)
+
+    def test_drifted_counter_heals_once_it_expires(self):
+        self.assertEqual(self.badges()[0]["notifications"], 0)
+        # An increment applied twice, or a decrement lost: the cached count is off.
+        key = notification_unread.key(self.bob.pk)
+        cache.incr(key, 5)
+        self.assertEqual(self.badges()[0]["notifications"], 5)
+        # Let UNREAD_COUNTER_TIMEOUT run out without waiting for it.
+        self.assertTrue(cache.touch(key, 0))
+        self.assertEqual(self.badges()[0]["notifications"], 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NotificationListTests(NotificationTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+        self.start = timezone.now() - timedelta(days=1)
+
+    def notify(self, minutes, **kwargs):
+        return Notification.objects.create(
+            user=self.bob, message_text="n", timestamp=self.start + timedelta(minutes=minutes), **kwargs
+        )
+
+    def notify_all_kinds(self, minutes):
+        message = Message.objects.create(sender=self.alice, receiver=self.bob, content="hi")
+        trade = self.make_trade()
+        self.notify(minutes, type="new_message", message=message)
+        self.notify(minutes, type="trade_proposal", proposal=trade.proposal)
+        self.notify(minutes, type="trade_active", trade=trade)
+        self.notify(minutes, type="new_message", sender=self.alice, is_read=True)
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/v1/notifications/", {"page_size": 100})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_per_page_is_pinned(self):
+        self.notify_all_kinds(0)
+        # One joined query for the personal notifications, one for the broadcasts.
+        self.assertEqual(self.list_queries(), 2)
+        for minutes in range(1, 10):
+            self.notify_all_kinds(minutes)
+        self.assertEqual(self.list_queries(), 2)
+
+    def test_sender_details_fall_back_to_the_sender(self):
+        self.notify(0, type="new_message", sender=self.alice)
+        notification = self.client.get("/api/v1/notifications/").json()["results"][0]
+        self.assertEqual(notification["sender_details"]["user_id"], self.alice.user_id)
+
+    def test_pages_interleave_broadcasts_exactly_once(self):
+        for minutes in range(0, 50, 10):
+            self.notify(minutes, type="system_alert")
+        for minutes in (5, 25, 45, 60):
+            BroadcastNotification.objects.create(message_text="b", timestamp=self.start + timedelta(minutes=minutes))
+
+        timestamps, url = [], "/api/v1/notifications/?page_size=2"
+        while url:
+            body = self.client.get(url).json()
+            timestamps += [n["timestamp"] for n in body["results"]]
+            url = body["next"]
+
+        self.assertEqual(len(timestamps), 9)
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_page_size_holds_when_broadcasts_outnumber_notifications(self):
+        self.notify(30, type="system_alert")
+        tie = self.notify(20, type="system_alert")
+        for minutes in (20, 20, 10, 8, 6, 4, 2):
+            BroadcastNotification.objects.create(message_text="b", timestamp=self.start + timedelta(minutes=minutes))
+
+        seen, url = [], "/api/v1/notifications/?page_size=3"
+        while url:
+            body = self.client.get(url).json()
+            self.assertLessEqual(len(body["results"]), 3)
+            seen += [(n["timestamp"], n["notification_id"], n.get("broadcast_id")) for n in body["results"]]
+            url = body["next"]
+
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(len(set(seen)), 9)
+        self.assertEqual([ts for ts, _, _ in seen], sorted((ts for ts, _, _ in seen), reverse=True))
+        # At equal timestamps personal notifications come first.
+        self.assertEqual(seen[1][1], tie.notification_id)
+        self.assertEqual(self.client.get("/api/v1/notifications/", {"cursor": "bad"}).status_code, 404)
+
+    def test_unread_filter(self):
+        unread = self.notify(0, type="system_alert")
+        self.notify(1, type="system_alert", is_read=True)
+        BroadcastNotification.objects.create(message_text="b", timestamp=self.start - timedelta(minutes=1))
+
+        body = self.client.get("/api/v1/notifications/", {"unread": "true"}).json()
+
+        self.assertEqual([n["notification_id"] for n in body["results"]], [unread.notification_id, None])
+
+
+class RetentionTests(NotificationTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.carol = User.objects.create_user(email="carol@example.com")
+        self.now = timezone.now()
+
+    def message_notification(self, sender, **kwargs):
+        message = Message.objects.create(sender=sender, receiver=self.bob, content="hi")
+        return Notification.objects.create(
+            user=self.bob, sender=sender, message=message, type="new_message", message_text="m", **kwargs
+        )
+
+    def test_collapses_message_notifications_per_sender(self):
+        for _ in range(3):
+            self.message_notification(self.alice, is_read=True)
+        newest = self.message_notification(self.alice, is_read=True)
+        other = self.message_notification(self.carol, is_read=True)
+        unread = self.message_notification(self.alice)
+
+        stats = run_retention(now=self.now)
+
+        self.assertEqual(stats["compacted"], 3)
+        self.assertEqual(
+            set(Notification.objects.values_list("notification_id", flat=True)),
+            {newest.pk, other.pk, unread.pk},
+        )
+        newest.refresh_from_db()
+        self.assertEqual(newest.count, 4)
+        self.assertEqual(newest.message_text, f"4 new messages from {self.alice.username}")
+
+    @override_settings(NOTIFICATION_RETENTION_DAYS={"system_alert": 10}, NOTIFICATION_RETENTION_DEFAULT_DAYS=100)
+    def test_prunes_only_expired_read_rows_in_batches(self):
+        old = self.now - timedelta(days=20)
+        expired = [Notification.objects.create(user=self.bob, type="system_alert", message_text="x", timestamp=old, is_read=True) for _ in range(5)]
+        kept_unread = Notification.objects.create(user=self.bob, type="system_alert", message_text="x", timestamp=old)
+        kept_type = Notification.objects.create(user=self.bob, type="trade_active", message_text="x", timestamp=old, is_read=True)
+
+        stats = run_retention(batch_size=2, archive=True, now=self.now)
+
+        self.assertEqual(stats["pruned"], 5)
+        self.assertEqual(set(Notification.objects.values_list("pk", flat=True)), {kept_unread.pk, kept_type.pk})
+        self.assertEqual(
+            set(ArchivedNotification.objects.values_list("notification_id", flat=True)), {n.pk for n in expired}
+        )
+
+    def test_command_reports_totals(self):
+        out = StringIO()
+        call_command("prune_notifications", stdout=out)
+        self.assertIn("Compacted 0 and pruned 0", out.getvalue())
@@ -1,8 +1,80 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, permissions, status
+from rest_framework.exceptions import NotFound
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Notification
-from .serializers import NotificationSerializer
+from django.shortcuts import get_object_or_404
+from .models import Notification, BroadcastNotification, BroadcastReceipt
+from .serializers import NotificationSerializer, BroadcastNotificationSerializer
+from .counters import notification_unread
+from message.counters import message_unread
+from swapo.pagination import KeysetCursorPagination
+
+
+class NotificationPagination(KeysetCursorPagination):
+    ordering = ("-timestamp", "-notification_id")
+    page_size = 50
+    max_page_size = 100
+
+
+class NotificationFeedPagination(NotificationPagination):
+    """
+    Pages through personal notifications and broadcasts as one feed, newest
+    first. The cursor is (timestamp, source, id) of the last entry shown,
+    where a personal notification sorts before a broadcast with the same
+    timestamp; each page reads at most page_size + 1 rows of either kind.
+    """
+    PERSONAL, BROADCAST = 1, 0
+
+    def paginate_feed(self, personal, broadcasts, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        encoded = request.query_params.get(self.cursor_query_param)
+        self.position = self.decode_cursor(encoded) if encoded else None
+        if self.position is not None:
+            personal = personal.filter(self.get_feed_seek_filter(self.PERSONAL, "notification_id"))
+            broadcasts = broadcasts.filter(self.get_feed_seek_filter(self.BROADCAST, "broadcast_id"))
+
+        limit = self.page_size + 1
+        rows = [n for n in personal.order_by("-timestamp", "-notification_id")[:limit]]
+        rows += [b for b in broadcasts.order_by("-timestamp", "-broadcast_id")[:limit]]
+        rows.sort(key=self.sort_key, reverse=True)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def sort_key(self, obj):
+        if isinstance(obj, BroadcastNotification):
+            return (obj.timestamp, self.BROADCAST, obj.broadcast_id)
+        return (obj.timestamp, self.PERSONAL, obj.notification_id)
+
+    def get_feed_seek_filter(self, source, id_field):
+        """Rows of one source that sort after the cursor position"""
+        timestamp, cursor_source, last_id = self.position
+        if source < cursor_source:
+            # Every row of this source at the cursor's timestamp comes after it.
+            return Q(timestamp__lte=timestamp)
+        if source > cursor_source:
+            return Q(timestamp__lt=timestamp)
+        return Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, **{f"{id_field}__lt": last_id})
+
+    def get_position(self, obj):
+        timestamp, source, pk = self.sort_key(obj)
+        return [timestamp.isoformat(), source, pk]
+
+    def decode_cursor(self, encoded):
+        try:
+            timestamp, source, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None or source not in (self.PERSONAL, self.BROADCAST):
+                raise ValueError
+            return [timestamp, source, int(pk)]
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -10,10 +82,44 @@ class NotificationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by("-timestamp")
+        # Joins everything NotificationSerializer reads, so a page costs one query.
+        return Notification.objects.filter(user=self.request.user).select_related(
+            "message__sender", "proposal__proposer", "trade", "sender"
+        ).order_by("-timestamp", "-notification_id")
+
+    def unread_only(self):
+        return self.request.query_params.get("unread") in ("1", "true")
 
     def perform_update(self, serializer):
-        serializer.save(is_read=True)
+        was_read = serializer.instance.is_read
+        notification = serializer.save(is_read=True)
+        if not was_read:
+            notification_unread.add(notification.user_id, -1)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        if not instance.is_read:
+            notification_unread.add(instance.user_id, -1)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Personal notifications merged with broadcasts, newest first, one cursor
+        page at a time. `?unread=true` limits both to unread ones.
+        """
+        personal = self.get_queryset()
+        broadcasts = BroadcastNotification.objects.for_user(request.user)
+        if self.unread_only():
+            personal = personal.filter(is_read=False)
+            broadcasts = broadcasts.filter(is_read=False)
+
+        paginator = NotificationFeedPagination()
+        page = paginator.paginate_feed(personal, broadcasts, request)
+
+        return paginator.get_paginated_response([
+            BroadcastNotificationSerializer(n).data if isinstance(n, BroadcastNotification)
+            else self.get_serializer(n).data
+            for n in page
+        ])
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
@@ -22,7 +128,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
             user=request.user,
             is_read=False
         ).update(is_read=True)
-        
+
+        unread_broadcasts = BroadcastNotification.objects.for_user(request.user).filter(
+            is_read=False
+        ).values_list("broadcast_id", flat=True)
+        updated_count += len(BroadcastReceipt.mark(request.user, unread_broadcasts, is_read=True))
+        notification_unread.reset(request.user.user_id)
+
         return Response({
             'status': 'success',
             'message': f'{updated_count} notifications marked as read'
@@ -31,11 +143,30 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications for the current user"""
-        count = Notification.objects.filter(
-            user=request.user,
-            is_read=False
-        ).count()
-        
         return Response({
-            'unread_count': count
+            'unread_count': notification_unread.get(request.user.user_id)
         }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def badges(self, request):
+        """Unread notification and message counts in one call, served from the counter cache"""
+        return Response({
+            'notifications': notification_unread.get(request.user.user_id),
+            'messages': message_unread.get(request.user.user_id),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path=r'broadcasts/(?P<broadcast_id>\d+)/read')
+    def read_broadcast(self, request, broadcast_id=None):
+        """Mark a broadcast notification as read for the current user"""
+        broadcast = get_object_or_404(BroadcastNotification, broadcast_id=broadcast_id)
+        BroadcastReceipt.mark(request.user, [broadcast.broadcast_id], is_read=True)
+        notification_unread.reset(request.user.user_id)
+        return Response({'status': 'success'}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path=r'broadcasts/(?P<broadcast_id>\d+)/dismiss')
+    def dismiss_broadcast(self, request, broadcast_id=None):
+        """Hide a broadcast notification from the current user's list"""
+        broadcast = get_object_or_404(BroadcastNotification, broadcast_id=broadcast_id)
+        BroadcastReceipt.mark(request.user, [broadcast.broadcast_id], is_read=True, is_dismissed=True)
+        notification_unread.reset(request.user.user_id)
+        return Response({'status': 'success'}, status=status.HTTP_200_OK)
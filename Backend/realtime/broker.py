@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """A single connection's queue of pending events for one user."""
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def put(self, event):
+        # Called from any thread; hand the event to the connection's event loop.
+        self.loop.call_soon_threadsafe(self._put_nowait, event)
+
+    def _put_nowait(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client that stopped reading loses events rather than memory;
+            # it can resync over the REST endpoints.
+            pass
+
+
+class BaseBroker:
+    """
+    Routes events to the connections of a user.
+
+    A multi-node broker (Redis pub/sub, NATS, ...) overrides `publish` to send
+    the event over the wire, and calls `deliver` on every node when it arrives
+    so that node's local connections receive it.
+    """
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish(self, user_id, event):
+        raise NotImplementedError
+
+    def has_subscribers(self, user_id):
+        """Whether publishing to this user can reach anyone; lets callers skip serializing."""
+        return True
+
+    def subscribe(self, user_id):
+        """Must be called from the connection's event loop."""
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def deliver(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+
+class InProcessBroker(BaseBroker):
+    """Single-node broker: events only reach connections served by this process."""
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscriptions
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.REALTIME_BROKER)()
+    return _broker
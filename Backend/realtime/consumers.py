@@ -0,0 +1,86 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .broker import get_broker
+
+# Close codes in the 4000-4999 range are reserved for applications.
+CLOSE_UNAUTHORIZED = 4401
+
+
+def authenticate(scope):
+    """
+    Resolve the SimpleJWT access token passed as `?token=` (browsers cannot set
+    headers on a WebSocket handshake) to an active user, or None.
+    """
+    close_old_connections()
+    token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+    if not token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        user = auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    finally:
+        close_old_connections()
+    return user
+
+
+async def events_consumer(scope, receive, send):
+    """
+    WebSocket endpoint streaming the user's events as JSON text frames:
+    {"type": "message.created" | "message.read" | "notification.created"
+             | "notification.updated", "data": {...}}
+    "notification.updated" carries a pending message notification that folded
+    in more messages, replacing the copy the client already has.
+    """
+    if (await receive())["type"] != "websocket.connect":
+        return
+
+    user = await sync_to_async(authenticate)(scope)
+    if user is None:
+        await send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+        return
+    await send({"type": "websocket.accept"})
+
+    broker = get_broker()
+    subscription = broker.subscribe(user.user_id)
+    incoming = asyncio.ensure_future(receive())
+    outgoing = asyncio.ensure_future(subscription.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({incoming, outgoing}, return_when=asyncio.FIRST_COMPLETED)
+            if outgoing in done:
+                text = json.dumps(outgoing.result(), cls=DjangoJSONEncoder)
+                await send({"type": "websocket.send", "text": text})
+                outgoing = asyncio.ensure_future(subscription.get())
+            if incoming in done:
+                # Client frames (e.g. keep-alive pings) are ignored; only a disconnect matters.
+                if incoming.result()["type"] == "websocket.disconnect":
+                    break
+                incoming = asyncio.ensure_future(receive())
+    finally:
+        incoming.cancel()
+        outgoing.cancel()
+        broker.unsubscribe(subscription)
+
+
+websocket_routes = {
+    "/ws/v1/events/": events_consumer,
+}
+
+
+async def websocket_application(scope, receive, send):
+    consumer = websocket_routes.get(scope["path"])
+    if consumer is None:
+        await receive()
+        await send({"type": "websocket.close"})
+        return
+    await consumer(scope, receive, send)
@@ -0,0 +1,22 @@
+from django.db import transaction
+
+from .broker import get_broker
+
+
+def publish(user_ids, event_type, build_payload):
+    """
+    Push an event to the given users once the current transaction commits.
+
+    `build_payload` is only called if at least one of the users can be
+    reached, so callers can pass a serializer call without paying for it.
+    """
+    def send():
+        broker = get_broker()
+        recipients = [user_id for user_id in set(user_ids) if broker.has_subscribers(user_id)]
+        if not recipients:
+            return
+        event = {"type": event_type, "data": build_payload()}
+        for user_id in recipients:
+            broker.publish(user_id, event)
+
+    transaction.on_commit(send)
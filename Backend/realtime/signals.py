@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from message.models import Message
+from message.serializers import MessageSerializer
+from notification.dispatcher import notifications_created
+from notification.models import Notification
+from notification.serializers import NotificationSerializer
+from .events import publish
+
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, **kwargs):
+    """Push a new message to both participants' open connections"""
+    if created:
+        publish(
+            [instance.sender_id, instance.receiver_id],
+            "message.created",
+            lambda: MessageSerializer(instance).data,
+        )
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    """Push a new notification, or one a new message was folded into, to its user's open connections"""
+    if created:
+        publish([instance.user_id], "notification.created", lambda: NotificationSerializer(instance).data)
+    elif kwargs.get("update_fields") and "count" in kwargs["update_fields"]:
+        publish([instance.user_id], "notification.updated", lambda: NotificationSerializer(instance).data)
+
+
+@receiver(notifications_created)
+def push_new_notifications(sender, notifications, **kwargs):
+    """Push notifications written in bulk by the dispatcher"""
+    for notification in notifications:
+        publish(
+            [notification.user_id],
+            "notification.created",
+            lambda notification=notification: NotificationSerializer(notification).data,
+        )
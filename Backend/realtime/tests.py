@@ -0,0 +1,73 @@
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from message.models import Message
+from .broker import InProcessBroker, get_broker
+from .consumers import CLOSE_UNAUTHORIZED, websocket_application
+
+
+@override_settings(NOTIFICATION_DISPATCH_MODE="sync")
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com")
+        self.bob = User.objects.create_user(email="bob@example.com")
+
+    def connect(self, token):
+        scope = {
+            "type": "websocket",
+            "path": "/ws/v1/events/",
+            "query_string": f"token={token}".encode(),
+        }
+        return ApplicationCommunicator(websocket_application, scope)
+
+    async def open(self, user):
+        communicator = self.connect(AccessToken.for_user(user))
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.accept")
+        return communicator
+
+    def send_message(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(sender=self.alice, receiver=self.bob, content="hi")
+
+    async def test_rejects_invalid_token(self):
+        communicator = self.connect("not-a-jwt")
+        await communicator.send_input({"type": "websocket.connect"})
+        closed = await communicator.receive_output()
+        self.assertEqual(closed, {"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+
+    async def test_pushes_messages_and_notifications_to_the_receiver(self):
+        communicator = await self.open(self.bob)
+
+        message = await sync_to_async(self.send_message)()
+
+        events = [await communicator.receive_output() for _ in range(2)]
+        texts = sorted(event["text"] for event in events)
+        self.assertTrue(any('"type": "message.created"' in text for text in texts))
+        self.assertTrue(any('"type": "notification.created"' in text for text in texts))
+        self.assertTrue(any(f'"message_id": {message.message_id}' in text for text in texts))
+
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait()
+        self.assertFalse(get_broker().has_subscribers(self.bob.user_id))
+
+    async def test_unknown_path_is_closed(self):
+        communicator = ApplicationCommunicator(websocket_application, {"type": "websocket", "path": "/ws/nope/"})
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output())["type"], "websocket.close")
+
+
+class InProcessBrokerTests(TestCase):
+    async def test_only_the_addressed_user_receives_events(self):
+        broker = InProcessBroker()
+        mine, theirs = broker.subscribe(1), broker.subscribe(2)
+
+        broker.publish(1, {"type": "ping"})
+
+        self.assertEqual(await mine.get(), {"type": "ping"})
+        self.assertTrue(theirs.queue.empty())
+        broker.unsubscribe(mine)
+        self.assertFalse(broker.has_subscribers(1))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from reviews.reputation import rebuild_reputations
+
+
+class Command(BaseCommand):
+    help = 'Recompute user reputation aggregates from the reviews table, in batches, to repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users recomputed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        users = User.objects.order_by('user_id').values_list('user_id', flat=True)
+        last_id = 0
+        processed = reviewed = 0
+        while True:
+            # Seek past the previous batch instead of OFFSET, so every batch is an index range scan.
+            user_ids = list(users.filter(user_id__gt=last_id)[:batch_size])
+            if not user_ids:
+                break
+            reviewed += rebuild_reputations(user_ids)
+            processed += len(user_ids)
+            last_id = user_ids[-1]
+            self.stdout.write(f'  {processed} users recomputed')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt reputation for {processed} users ({reviewed} with reviews)')
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:09
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def build_reputations(apps, schema_editor):
+    """Reviews written before the aggregates existed; rebuild_reputation covers anything later."""
+    Review = apps.get_model('reviews', 'Review')
+    UserReputation = apps.get_model('reviews', 'UserReputation')
+    totals = Review.objects.values('reviewed_user_id').annotate(
+        rating_sum=models.Sum('rating'),
+        rating_count=models.Count('review_id'),
+        criteria1_sum=Coalesce(models.Sum('criteria1_rating'), 0),
+        criteria1_count=models.Count('criteria1_rating'),
+        criteria2_sum=Coalesce(models.Sum('criteria2_rating'), 0),
+        criteria2_count=models.Count('criteria2_rating'),
+    ).order_by()
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    for row in totals:
+        user_id = row.pop('reviewed_user_id')
+        UserReputation.objects.create(user_id=user_id, **row)
+        User.objects.filter(pk=user_id).update(
+            rating=(Decimal(row['rating_sum']) / row['rating_count']).quantize(Decimal('0.01')),
+            num_reviews=row['rating_count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_alter_user_profile_picture_url'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserReputation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reputation', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('criteria1_sum', models.IntegerField(default=0)),
+                ('criteria1_count', models.IntegerField(default=0)),
+                ('criteria2_sum', models.IntegerField(default=0)),
+                ('criteria2_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_reputations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_histograms(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    UserReputation = apps.get_model('reviews', 'UserReputation')
+    counts = Review.objects.filter(rating__in=range(1, 6)).values('reviewed_user_id', 'rating').annotate(
+        reviews=models.Count('review_id')
+    ).order_by()
+    for row in counts:
+        UserReputation.objects.filter(user_id=row['reviewed_user_id']).update(
+            **{f"stars_{row['rating']}": row['reviews']}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_user_reputation'),
+        ('trade', '0003_counter_chains'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userreputation',
+            name='stars_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userreputation',
+            name='stars_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userreputation',
+            name='stars_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userreputation',
+            name='stars_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userreputation',
+            name='stars_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['reviewed_user', '-review_date', '-review_id'], name='review_reviewed_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['trade', '-review_date', '-review_id'], name='review_trade_date_idx'),
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
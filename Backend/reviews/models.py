@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
 from trade.models import Trade
@@ -24,5 +26,66 @@ class Review(models.Model):
     criteria2_rating = models.IntegerField(blank=True, null=True)
     is_anonymous = models.BooleanField(default=False)
 
+    class Meta:
+      indexes = [
+        # Reviews received by a user / left on a trade, newest first.
+        models.Index(fields=['reviewed_user', '-review_date', '-review_id'], name='review_reviewed_date_idx'),
+        models.Index(fields=['trade', '-review_date', '-review_id'], name='review_trade_date_idx'),
+      ]
+
     def __str__(self):
       return f"Review {self.review_id} by {self.reviewer_user}"
+
+
+class UserReputation(models.Model):
+    """
+    Running totals of the reviews a user has received, kept in step with
+    Review writes by reviews.signals so reads never aggregate the reviews
+    table. `manage.py rebuild_reputation` repairs any drift.
+    """
+    user = models.OneToOneField(
+      settings.AUTH_USER_MODEL,
+      on_delete=models.CASCADE,
+      primary_key=True,
+      related_name='reputation'
+    )
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    # The criteria ratings are optional, so each has its own count.
+    criteria1_sum = models.IntegerField(default=0)
+    criteria1_count = models.IntegerField(default=0)
+    criteria2_sum = models.IntegerField(default=0)
+    criteria2_count = models.IntegerField(default=0)
+    # Rating histogram: how many reviews gave each of 1-5 stars.
+    stars_1 = models.IntegerField(default=0)
+    stars_2 = models.IntegerField(default=0)
+    stars_3 = models.IntegerField(default=0)
+    stars_4 = models.IntegerField(default=0)
+    stars_5 = models.IntegerField(default=0)
+
+    STARS = range(1, 6)
+
+    @staticmethod
+    def average(total, count):
+      if not count:
+        return None
+      return (Decimal(total) / count).quantize(Decimal('0.01'))
+
+    @property
+    def average_rating(self):
+      return self.average(self.rating_sum, self.rating_count)
+
+    @property
+    def criteria1_average(self):
+      return self.average(self.criteria1_sum, self.criteria1_count)
+
+    @property
+    def criteria2_average(self):
+      return self.average(self.criteria2_sum, self.criteria2_count)
+
+    @property
+    def histogram(self):
+      return {str(stars): getattr(self, f"stars_{stars}") for stars in self.STARS}
+
+    def __str__(self):
+      return f"Reputation of {self.user}: {self.average_rating} from {self.rating_count} reviews"
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from accounts.models import User
+from .models import Review, UserReputation
+
+# Review fields that feed the reviewed user's reputation.
+REVIEW_FIELDS = ("reviewed_user_id", "rating", "criteria1_rating", "criteria2_rating")
+TOTAL_FIELDS = (
+  "rating_sum", "rating_count", "criteria1_sum", "criteria1_count", "criteria2_sum", "criteria2_count",
+  *(f"stars_{stars}" for stars in UserReputation.STARS),
+)
+
+
+def review_values(review):
+  return {name: getattr(review, name) for name in REVIEW_FIELDS}
+
+
+def contribution(values):
+  """The amounts one review adds to each running total."""
+  stars = {f"stars_{stars}": int(values["rating"] == stars) for stars in UserReputation.STARS}
+  return {
+    **stars,
+    "rating_sum": values["rating"],
+    "rating_count": 1,
+    "criteria1_sum": values["criteria1_rating"] or 0,
+    "criteria1_count": int(values["criteria1_rating"] is not None),
+    "criteria2_sum": values["criteria2_rating"] or 0,
+    "criteria2_count": int(values["criteria2_rating"] is not None),
+  }
+
+
+def apply_review(values, sign):
+  """
+  Add (sign=1) or take back (sign=-1) one review's contribution with a
+  single relative UPDATE, so concurrent reviews of the same user never
+  overwrite each other. User.rating and User.num_reviews follow in the
+  same transaction.
+  """
+  user_id = values["reviewed_user_id"]
+  with transaction.atomic():
+    if sign > 0:
+      UserReputation.objects.get_or_create(user_id=user_id)
+    UserReputation.objects.filter(user_id=user_id).update(
+      **{name: F(name) + sign * amount for name, amount in contribution(values).items()}
+    )
+    # Our UPDATE holds the row lock, so this read is the committed result.
+    reputation = UserReputation.objects.filter(user_id=user_id).first()
+    if reputation is not None:
+      User.objects.filter(pk=user_id).update(
+        rating=reputation.average_rating, num_reviews=reputation.rating_count
+      )
+
+
+def rebuild_reputations(user_ids):
+  """Recompute the totals of `user_ids` from the reviews table. Returns the number of users with reviews."""
+  totals = {
+    row.pop("reviewed_user_id"): row
+    for row in Review.objects.filter(reviewed_user_id__in=user_ids)
+    .values("reviewed_user_id")
+    .annotate(
+      rating_sum=Sum("rating"),
+      rating_count=Count("review_id"),
+      criteria1_sum=Coalesce(Sum("criteria1_rating"), 0),
+      criteria1_count=Count("criteria1_rating"),
+      criteria2_sum=Coalesce(Sum("criteria2_rating"), 0),
+      criteria2_count=Count("criteria2_rating"),
+      **{f"stars_{stars}": Count("review_id", filter=Q(rating=stars)) for stars in UserReputation.STARS},
+    )
+    .order_by()
+  }
+  reputations = [UserReputation(user_id=user_id, **row) for user_id, row in totals.items()]
+  unreviewed = [user_id for user_id in user_ids if user_id not in totals]
+
+  with transaction.atomic():
+    UserReputation.objects.bulk_create(
+      reputations, update_conflicts=True, unique_fields=["user"], update_fields=TOTAL_FIELDS,
+    )
+    User.objects.bulk_update(
+      [User(pk=r.user_id, rating=r.average_rating, num_reviews=r.rating_count) for r in reputations],
+      ["rating", "num_reviews"],
+    )
+    UserReputation.objects.filter(user_id__in=unreviewed).delete()
+    User.objects.filter(pk__in=unreviewed).exclude(
+      Q(num_reviews=0) & Q(rating__isnull=True)
+    ).update(rating=None, num_reviews=0)
+  return len(reputations)
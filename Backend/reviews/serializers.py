@@ -1,7 +1,44 @@
 from rest_framework import serializers
-from .models import Review
+from accounts.serializers import PublicUserSerializer
+from .models import Review, UserReputation
+
+# Ratings are stars; the reputation aggregates and histogram assume this range.
+RATING_RANGE = {'min_value': 1, 'max_value': 5}
+
 
 class ReviewSerializer(serializers.ModelSerializer):
   class Meta:
     model = Review
     fields = '__all__'
+    extra_kwargs = {
+      'rating': RATING_RANGE,
+      'criteria1_rating': RATING_RANGE,
+      'criteria2_rating': RATING_RANGE,
+    }
+
+
+class ReviewListSerializer(ReviewSerializer):
+  """Reviews as shown on profiles; anonymous reviews do not reveal their reviewer."""
+  reviewer_details = serializers.SerializerMethodField()
+
+  def get_reviewer_details(self, review):
+    if review.is_anonymous:
+      return None
+    return PublicUserSerializer(review.reviewer_user).data
+
+  def to_representation(self, review):
+    data = super().to_representation(review)
+    if review.is_anonymous:
+      data['reviewer_user'] = None
+    return data
+
+
+class UserReputationSerializer(serializers.ModelSerializer):
+  average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+  criteria1_average = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+  criteria2_average = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+  histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+
+  class Meta:
+    model = UserReputation
+    fields = ['user', 'average_rating', 'rating_count', 'criteria1_average', 'criteria2_average', 'histogram']
@@ -0,0 +1,32 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Review
+from .reputation import REVIEW_FIELDS, apply_review, review_values
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_review(sender, instance, raw=False, **kwargs):
+  """Keep the stored values of an edited review so its old contribution can be taken back"""
+  instance._previous_values = None
+  if instance.pk and not raw:
+    instance._previous_values = Review.objects.filter(pk=instance.pk).values(*REVIEW_FIELDS).first()
+
+
+@receiver(post_save, sender=Review)
+def update_reputation_on_save(sender, instance, created, raw=False, **kwargs):
+  """Fold a new or edited review into the reviewed user's reputation"""
+  if raw:
+    return
+  current = review_values(instance)
+  previous = getattr(instance, "_previous_values", None)
+  if previous == current:
+    return
+  if previous is not None:
+    apply_review(previous, -1)
+  apply_review(current, 1)
+
+
+@receiver(post_delete, sender=Review)
+def update_reputation_on_delete(sender, instance, **kwargs):
+  """Take a deleted review back out of the reviewed user's reputation"""
+  apply_review(review_values(instance), -1)
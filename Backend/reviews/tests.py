@@ -1,3 +1,186 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from swapo.testing import QueryPlanMixin
+from listings.models import SkillListing
+from skills.models import Skill
+from trade.models import Trade, TradeProposal
+from .models import Review, UserReputation
+
+
+class ReviewTestData:
+  def setUp(self):
+    self.alice = User.objects.create_user(email="alice@example.com")
+    self.bob = User.objects.create_user(email="bob@example.com")
+    guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+    python = Skill.objects.create(skill_name="Python", category="Programming")
+    listing = SkillListing.objects.create(
+      user=self.bob, skill_offered=python, skill_desired=guitar, title="t", description="d"
+    )
+    proposal = TradeProposal.objects.create(
+      listing=listing, proposer=self.alice, recipient=self.bob,
+      skill_offered_by_proposer=guitar, skill_desired_by_proposer=python, message="hi",
+    )
+    self.trade = Trade.objects.create(
+      proposal=proposal, user1=self.alice, user2=self.bob, skill1=guitar, skill2=python, terms_agreed="hi"
+    )
+
+  def review(self, rating, reviewer=None, **kwargs):
+    return Review.objects.create(
+      trade=self.trade, reviewer_user=reviewer or self.alice, reviewed_user=self.bob, rating=rating, **kwargs
+    )
+
+
+class ReputationTests(ReviewTestData, TestCase):
+  def reputation(self):
+    return UserReputation.objects.get(user=self.bob)
+
+  def test_totals_follow_create_update_and_delete(self):
+    first = self.review(5, criteria1_rating=4)
+    self.review(2, criteria2_rating=3)
+    self.bob.refresh_from_db()
+    self.assertEqual((self.bob.rating, self.bob.num_reviews), (Decimal("3.50"), 2))
+    self.assertEqual(self.reputation().criteria1_average, Decimal("4.00"))
+    self.assertEqual(self.reputation().criteria2_average, Decimal("3.00"))
+
+    first.rating = 3
+    first.criteria1_rating = None
+    first.save()
+    reputation = self.reputation()
+    self.assertEqual((reputation.rating_sum, reputation.rating_count), (5, 2))
+    self.assertIsNone(reputation.criteria1_average)
+
+    first.delete()
+    self.bob.refresh_from_db()
+    self.assertEqual((self.bob.rating, self.bob.num_reviews), (Decimal("2.00"), 1))
+
+  def test_rebuild_repairs_drift(self):
+    self.review(4, criteria1_rating=5)
+    self.review(3)
+    UserReputation.objects.filter(user=self.bob).update(rating_sum=100, criteria1_count=0)
+    User.objects.filter(pk=self.alice.pk).update(num_reviews=7, rating=Decimal("1.00"))
+
+    out = StringIO()
+    call_command("rebuild_reputation", batch_size=1, stdout=out)
+
+    reputation = self.reputation()
+    self.assertEqual((reputation.rating_sum, reputation.rating_count), (7, 2))
+    self.assertEqual(reputation.criteria1_average, Decimal("5.00"))
+    self.alice.refresh_from_db()
+    self.assertEqual((self.alice.rating, self.alice.num_reviews), (None, 0))
+    self.assertIn("2 users (1 with reviews)", out.getvalue())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReviewValidationTests(ReviewTestData, TestCase):
+  def post(self, **fields):
+    client = APIClient()
+    client.force_authenticate(self.alice)
+    return client.post("/api/v1/reviews/", {
+      "trade": self.trade.trade_id, "reviewer_user": self.alice.user_id, "reviewed_user": self.bob.user_id,
+      **fields,
+    })
+
+  def test_ratings_must_be_one_to_five_stars(self):
+    for fields in ({"rating": 0}, {"rating": 10}, {"rating": 4, "criteria1_rating": 6}, {"rating": 4, "criteria2_rating": -1}):
+      response = self.post(**fields)
+      self.assertEqual(response.status_code, 400, fields)
+      self.assertIn(next(iter(fields.keys() - {"rating"}), "rating"), response.json())
+    self.assertFalse(UserReputation.objects.filter(user=self.bob, rating_count__gt=0).exists())
+
+    self.assertEqual(self.post(rating=5, criteria1_rating=1).status_code, 201)
+    self.assertEqual(UserReputation.objects.get(user=self.bob).histogram, {"1": 0, "2": 0, "3": 0, "4": 0, "5": 1})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReputationReadTests(ReviewTestData, TestCase):
+  def setUp(self):
+    super().setUp()
+    self.client = APIClient()
+    self.client.force_authenticate(self.alice)
+
+  def test_summary_never_reads_the_reviews_table(self):
+    for rating in (5, 4, 3):
+      self.review(rating, criteria1_rating=rating)
+
+    with CaptureQueriesContext(connection) as ctx:
+      body = self.client.get(f"/api/v1/reviews/users/{self.bob.pk}/reputation/").json()
+
+    self.assertEqual(body["average_rating"], "4.00")
+    self.assertEqual(body["rating_count"], 3)
+    self.assertEqual(body["criteria1_average"], "4.00")
+    self.assertFalse([q for q in ctx.captured_queries if Review._meta.db_table in q["sql"]])
+
+  def test_unreviewed_and_unknown_users(self):
+    body = self.client.get(f"/api/v1/reviews/users/{self.alice.pk}/reputation/").json()
+    self.assertEqual((body["average_rating"], body["rating_count"]), (None, 0))
+    self.assertEqual(self.client.get("/api/v1/reviews/users/9999/reputation/").status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReviewListTests(ReviewTestData, TestCase):
+  def setUp(self):
+    super().setUp()
+    self.client = APIClient()
+    self.url = f"/api/v1/reviews/users/{self.bob.pk}/"
+
+  def add_reviewers(self, count):
+    for _ in range(count):
+      reviewer = User.objects.create_user(email=f"reviewer{User.objects.count()}@example.com")
+      self.review(4, reviewer=reviewer)
+
+  def get(self, url, **params):
+    with CaptureQueriesContext(connection) as ctx:
+      body = self.client.get(url, params).json()
+    return body, len(ctx.captured_queries)
+
+  def test_query_count_is_flat_and_summary_comes_from_aggregates(self):
+    self.add_reviewers(2)
+    _, small = self.get(self.url, page_size=100)
+    self.add_reviewers(20)
+    self.review(1)
+    body, large = self.get(self.url, page_size=100)
+
+    self.assertEqual(large, small)
+    self.assertEqual(len(body["results"]), 23)
+    self.assertEqual(body["summary"]["histogram"], {"1": 1, "2": 0, "3": 0, "4": 22, "5": 0})
+    self.assertEqual(body["summary"]["rating_count"], 23)
+
+  def test_anonymous_reviews_hide_the_reviewer(self):
+    self.review(5, is_anonymous=True)
+    named = self.review(3)
+
+    results = self.client.get(self.url).json()["results"]
+
+    self.assertEqual(results[0]["review_id"], named.review_id)
+    self.assertEqual(results[0]["reviewer_details"]["user_id"], self.alice.pk)
+    self.assertEqual((results[1]["reviewer_user"], results[1]["reviewer_details"]), (None, None))
+
+  def test_trade_reviews_and_cursor(self):
+    reviews = [self.review(rating) for rating in (1, 2, 3)]
+    seen, url = [], f"/api/v1/reviews/trades/{self.trade.pk}/?page_size=2"
+    while url:
+      body = self.client.get(url).json()
+      seen += [r["review_id"] for r in body["results"]]
+      url = body["next"]
+    self.assertEqual(seen, [r.review_id for r in reversed(reviews)])
+
+  def test_unknown_user_is_404(self):
+    self.assertEqual(self.client.get("/api/v1/reviews/users/9999/").status_code, 404)
+
+
+class ReviewIndexTests(QueryPlanMixin, TestCase):
+  def test_received_reviews_use_reviewed_date_index(self):
+    received = Review.objects.filter(reviewed_user_id=1).order_by("-review_date", "-review_id")
+    self.assertUsesIndex(received, "review_reviewed_date_idx")
+
+  def test_trade_reviews_use_trade_date_index(self):
+    on_trade = Review.objects.filter(trade_id=1).order_by("-review_date", "-review_id")
+    self.assertUsesIndex(on_trade, "review_trade_date_idx")
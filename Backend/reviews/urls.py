@@ -1,7 +1,12 @@
 from django.urls import path
-from .views import ReviewListCreateAPIView, ReviewDetailAPIView
+from .views import (
+  ReviewListCreateAPIView, ReviewDetailAPIView, UserReviewListAPIView, TradeReviewListAPIView, UserReputationAPIView,
+)
 
 urlpatterns = [
   path('', ReviewListCreateAPIView.as_view(), name='review-list-create'),
   path('<int:review_id>/', ReviewDetailAPIView.as_view(), name='review-detail'),
+  path('users/<int:user_id>/', UserReviewListAPIView.as_view(), name='user-review-list'),
+  path('users/<int:user_id>/reputation/', UserReputationAPIView.as_view(), name='user-reputation'),
+  path('trades/<int:trade_id>/', TradeReviewListAPIView.as_view(), name='trade-review-list'),
 ]
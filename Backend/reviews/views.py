@@ -1,6 +1,23 @@
+from django.shortcuts import get_object_or_404
 from rest_framework import generics
-from .models import Review
-from .serializers import ReviewSerializer
+from accounts.models import User
+from swapo.pagination import KeysetCursorPagination
+from .models import Review, UserReputation
+from .serializers import ReviewSerializer, ReviewListSerializer, UserReputationSerializer
+
+
+class ReviewPagination(KeysetCursorPagination):
+  ordering = ('-review_date', '-review_id')
+  page_size = 20
+  max_page_size = 100
+
+
+def get_reputation(user_id):
+  """The user's stored aggregates; empty totals if not reviewed yet, 404 for unknown users."""
+  reputation = UserReputation.objects.filter(user_id=user_id).first()
+  if reputation is None:
+    reputation = UserReputation(user=get_object_or_404(User, pk=user_id))
+  return reputation
 
 # List all reviews or create a new one
 class ReviewListCreateAPIView(generics.ListCreateAPIView):
@@ -12,3 +29,33 @@ class ReviewDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
   queryset = Review.objects.all()
   serializer_class = ReviewSerializer
   lookup_field = 'review_id'
+
+# Reviews received by a user, newest first, with their rating summary
+class UserReviewListAPIView(generics.ListAPIView):
+  serializer_class = ReviewListSerializer
+  pagination_class = ReviewPagination
+
+  def get_queryset(self):
+    return Review.objects.filter(reviewed_user_id=self.kwargs['user_id']).select_related('reviewer_user')
+
+  def list(self, request, *args, **kwargs):
+    # Resolve the user first so unknown users are a 404, not an empty page.
+    reputation = get_reputation(self.kwargs['user_id'])
+    response = super().list(request, *args, **kwargs)
+    response.data['summary'] = UserReputationSerializer(reputation).data
+    return response
+
+# Reviews left on a trade, newest first
+class TradeReviewListAPIView(generics.ListAPIView):
+  serializer_class = ReviewListSerializer
+  pagination_class = ReviewPagination
+
+  def get_queryset(self):
+    return Review.objects.filter(trade_id=self.kwargs['trade_id']).select_related('reviewer_user')
+
+# A user's rating summary, read from the maintained aggregates, never from the reviews table
+class UserReputationAPIView(generics.RetrieveAPIView):
+  serializer_class = UserReputationSerializer
+
+  def get_object(self):
+    return get_reputation(self.kwargs['user_id'])
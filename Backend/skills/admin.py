@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Skill
+from .models import Skill, SkillAlias, SkillCategory
 # Register your models here.
 
-admin.site.register(Skill)
\ No newline at end of file
+admin.site.register([Skill, SkillAlias, SkillCategory])
\ No newline at end of file
@@ -0,0 +1,267 @@
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+from .models import Skill, SkillAlias
+
+# Most suggestions a lookup can return.
+MAX_SUGGESTIONS = 20
+# Prefixes matching more keys than this get their suggestions precomputed; the
+# rest are ranked at lookup time, which stays cheap for ranges this small.
+PRECOMPUTE_ABOVE = 128
+# Sorts after every character, so `prefix + END` bounds a prefix's range.
+END = '\U0010ffff'
+
+
+def normalise_name(name):
+  """Case-folded, accent-free, single-spaced: 'Café  Barista' -> 'cafe barista'"""
+  decomposed = unicodedata.normalize('NFKD', name.casefold())
+  return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def name_keys(name):
+  """A key per word start, so 'guit' also finds 'Electric Guitar'"""
+  words = normalise_name(name).split(' ')
+  return {' '.join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+def skill_popularity():
+  """skill_id -> number of UserSkill rows and listings (either side) referring to it"""
+  from listings.models import SkillListing
+  from userSkills.models import UserSkill
+
+  popularity = Counter()
+  for queryset, field in [
+    (UserSkill.objects, 'skill_id'),
+    (SkillListing.objects, 'skill_offered_id'),
+    (SkillListing.objects, 'skill_desired_id'),
+  ]:
+    popularity.update(dict(queryset.order_by().values_list(field).annotate(n=Count('pk'))))
+  return popularity
+
+
+class SkillAutocomplete:
+  """
+  Type-ahead over skill names and aliases: a sorted array of normalised name
+  keys searched with bisect, ranked by popularity (then name).
+
+  A prefix's matches are one contiguous slice of the array. Short prefixes
+  match large slices, so the best MAX_SUGGESTIONS of every prefix matching
+  more than PRECOMPUTE_ABOVE keys are computed at build time; a lookup is
+  then either a dict hit or a ranking of at most PRECOMPUTE_ABOVE keys,
+  whatever the size of the catalogue.
+
+  Like the match index (userSkills.matching), it is per process: new and
+  renamed skills are applied incrementally (see skills.signals), and the
+  whole index, popularity included, is rebuilt once older than
+  SKILL_AUTOCOMPLETE_MAX_AGE.
+  """
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.rebuild_lock = threading.Lock()  # held while a request rebuilds the index
+    self.built_at = None
+    self.keys = []        # sorted normalised keys
+    self.key_ids = []     # skill_id of each key
+    self.skills = {}      # skill_id -> (skill_name, category)
+    self.aliases = defaultdict(set)  # skill_id -> {alias name}
+    self.popularity = {}  # skill_id -> references
+    self.top = {}         # precomputed prefix -> [skill_id, ...] best first
+
+  @property
+  def is_built(self):
+    return self.built_at is not None
+
+  @property
+  def is_stale(self):
+    return not self.is_built or time.monotonic() - self.built_at > settings.SKILL_AUTOCOMPLETE_MAX_AGE
+
+  def ensure_fresh(self):
+    """
+    Rebuild once stale, one request at a time: while one rebuilds, the others
+    keep using the old index (before the very first build, they wait for it).
+    """
+    if not self.is_stale:
+      return
+    if not self.rebuild_lock.acquire(blocking=not self.is_built):
+      return
+    try:
+      # Another request may have finished a build while this one waited.
+      if self.is_stale:
+        self.build()
+    finally:
+      self.rebuild_lock.release()
+
+  def rank(self, skill_id):
+    return (-self.popularity.get(skill_id, 0), self.skills[skill_id][0].casefold(), skill_id)
+
+  def best(self, skill_ids):
+    return heapq.nsmallest(MAX_SUGGESTIONS, set(skill_ids), key=self.rank)
+
+  def build(self, skills=None, popularity=None, aliases=None):
+    """
+    (Re)build from `skills` of (skill_id, skill_name, category), a
+    `popularity` mapping and `aliases` of (skill_id, name), read from the
+    database by default. Assembled aside and swapped in, so lookups keep
+    being served meanwhile.
+    """
+    if skills is None:
+      skills = Skill.objects.values_list('skill_id', 'skill_name', 'category').iterator(chunk_size=10000)
+    if popularity is None:
+      popularity = skill_popularity()
+    if aliases is None:
+      aliases = SkillAlias.objects.values_list('skill_id', 'name').iterator(chunk_size=10000)
+
+    fresh = SkillAutocomplete()
+    fresh.popularity = dict(popularity)
+    entries = []
+    for skill_id, name, category in skills:
+      fresh.skills[skill_id] = (name, category)
+      entries.extend((key, skill_id) for key in name_keys(name))
+    for skill_id, name in aliases:
+      if skill_id in fresh.skills:
+        fresh.aliases[skill_id].add(name)
+        entries.extend((key, skill_id) for key in name_keys(name))
+    entries.sort()
+    fresh.keys = [key for key, _ in entries]
+    fresh.key_ids = [skill_id for _, skill_id in entries]
+    fresh.precompute('', 0, len(entries))
+
+    with self.lock:
+      self.keys, self.key_ids = fresh.keys, fresh.key_ids
+      self.skills, self.aliases, self.popularity, self.top = fresh.skills, fresh.aliases, fresh.popularity, fresh.top
+      self.built_at = time.monotonic()
+
+  def precompute(self, prefix, lo, hi):
+    """
+    Best skills among keys[lo:hi] (all starting with `prefix`), stored for
+    ranges above PRECOMPUTE_ABOVE. Built bottom-up: a range's best are the
+    best of its children's, so every key is ranked only once.
+    """
+    if hi - lo <= PRECOMPUTE_ABOVE:
+      return self.best(self.key_ids[lo:hi])
+    candidates = []
+    depth = len(prefix)
+    i = lo
+    while i < hi:
+      if len(self.keys[i]) == depth:
+        # The key is the prefix itself.
+        candidates.append(self.key_ids[i])
+        i += 1
+        continue
+      child = prefix + self.keys[i][depth]
+      j = bisect_left(self.keys, child + END, i, hi)
+      candidates.extend(self.precompute(child, i, j))
+      i = j
+    self.top[prefix] = self.best(candidates)
+    return self.top[prefix]
+
+  def matching(self, prefix):
+    lo = bisect_left(self.keys, prefix)
+    return self.key_ids[lo:bisect_left(self.keys, prefix + END, lo)]
+
+  def insert_keys(self, skill_id, name):
+    for key in name_keys(name):
+      position = bisect_left(self.keys, key)
+      self.keys.insert(position, key)
+      self.key_ids.insert(position, skill_id)
+      for length in range(len(key) + 1):
+        best = self.top.get(key[:length])
+        if best is not None:
+          self.top[key[:length]] = self.best(best + [skill_id])
+
+  def delete_keys(self, skill_id, names):
+    """
+    Drop the keys of `names`, then re-rank the precomputed prefixes the skill
+    was among. All keys go first: re-ranking while some were left would still
+    find the skill, which may no longer be in `skills`.
+    """
+    keys = [key for name in names for key in name_keys(name)]
+    for key in keys:
+      position = bisect_left(self.keys, key)
+      while position < len(self.keys) and self.keys[position] == key:
+        if self.key_ids[position] == skill_id:
+          del self.keys[position], self.key_ids[position]
+          break
+        position += 1
+    for key in set(keys):
+      for length in range(len(key) + 1):
+        prefix = key[:length]
+        if skill_id in self.top.get(prefix, ()):
+          self.top[prefix] = self.best(self.matching(prefix))
+
+  def add(self, skill_id, name, category):
+    """Index a new or renamed skill"""
+    with self.lock:
+      aliases = self.aliases.get(skill_id, set())
+      self.discard(skill_id)
+      self.skills[skill_id] = (name, category)
+      self.insert_keys(skill_id, name)
+      for alias in aliases:
+        self.aliases[skill_id].add(alias)
+        self.insert_keys(skill_id, alias)
+
+  def remove(self, skill_id):
+    with self.lock:
+      self.discard(skill_id)
+
+  def discard(self, skill_id):
+    if skill_id not in self.skills:
+      return
+    name, _ = self.skills[skill_id]
+    self.delete_keys(skill_id, [name, *self.aliases.pop(skill_id, ())])
+    del self.skills[skill_id]
+
+  def add_alias(self, skill_id, name):
+    with self.lock:
+      if skill_id in self.skills and name not in self.aliases[skill_id]:
+        self.aliases[skill_id].add(name)
+        self.insert_keys(skill_id, name)
+
+  def remove_alias(self, skill_id, name):
+    with self.lock:
+      if name in self.aliases.get(skill_id, ()):
+        self.aliases[skill_id].discard(name)
+        self.delete_keys(skill_id, [name])
+
+  def suggest(self, query, limit=10, within=None):
+    """
+    Up to `limit` (skill_id, skill_name, category, popularity) for skills with a
+    word (of their name or an alias) starting with `query`. `within`: a set of
+    skill ids to keep to, e.g. taxonomy.skills_under(...).
+    """
+    prefix = normalise_name(query)
+    with self.lock:
+      if within is not None:
+        best = self.best_within(prefix, within)
+      else:
+        best = self.top.get(prefix)
+        if best is None:
+          best = self.best(self.matching(prefix))
+      return [
+        (skill_id, *self.skills[skill_id], self.popularity.get(skill_id, 0))
+        for skill_id in best[:limit]
+      ]
+
+  def best_within(self, prefix, within):
+    """Walk whichever is smaller: the prefix's keys, or the allowed skills' own keys."""
+    lo = bisect_left(self.keys, prefix)
+    hi = bisect_left(self.keys, prefix + END, lo)
+    if hi - lo <= len(within):
+      return self.best(skill_id for skill_id in self.key_ids[lo:hi] if skill_id in within)
+    return self.best(
+      skill_id for skill_id in within
+      if skill_id in self.skills and any(
+        key.startswith(prefix)
+        for name in (self.skills[skill_id][0], *self.aliases.get(skill_id, ()))
+        for key in name_keys(name)
+      )
+    )
+
+
+skill_autocomplete = SkillAutocomplete()
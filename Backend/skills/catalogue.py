@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models.functions import Lower
+from swapo.response_cache import response_cache
+from .autocomplete import skill_autocomplete
+from .models import Skill, SkillAlias
+from .taxonomy import ensure_categories
+
+# Common abbreviations, keyed by lower-cased name, mapped to the catalogue's spelling.
+SKILL_ALIASES = {
+  'js': 'JavaScript',
+  'ts': 'TypeScript',
+  'py': 'Python',
+  'ml': 'Machine Learning',
+  'ai': 'Artificial Intelligence',
+  'ux': 'UX Design',
+  'ui': 'UI Design',
+}
+# Forms offer "Other" as a choice; it is never a skill of its own.
+PLACEHOLDER_NAMES = {'other'}
+
+
+def canonical_name(name):
+  """'  js ' -> 'JavaScript', '  Graphic   design' -> 'Graphic design'"""
+  name = ' '.join((name or '').split())
+  return SKILL_ALIASES.get(name.lower(), name)
+
+
+def name_key(name):
+  """The case-insensitive key resolve_skills matches names on"""
+  return canonical_name(name).lower()
+
+
+def resolve_skills(entries, default_category='General'):
+  """
+  Map skill names to Skill rows, creating the missing ones, in a constant
+  number of queries however many names there are: one IN query over the
+  alias keys and one over the lower-cased skill names, then for any missing
+  ones their categories (taxonomy.ensure_categories), a bulk insert and a re-read.
+
+  `entries`: dicts with a `skill_name` and optionally `category` and
+  `description` (used when the skill gets created). Names are matched after
+  canonical_name(), ignoring case, against skill names and SkillAlias rows.
+  Returns ({name key: Skill}, [created Skill]).
+  Concurrent requests inserting the same name, in any case, are absorbed by
+  the case-insensitive unique constraint (ignore_conflicts) and read back by
+  key like existing skills. A row spelt differently from ours is someone
+  else's and is not reported as created; one spelt the same at the same
+  moment cannot be told apart and is reported by both requests.
+  """
+  wanted = {}
+  for entry in entries:
+    name = canonical_name(entry.get('skill_name'))
+    key = name.lower()
+    if key and key not in PLACEHOLDER_NAMES:
+      wanted.setdefault(key, (name, entry))
+  if not wanted:
+    return {}, []
+
+  found = {alias.name_key: alias.skill for alias in SkillAlias.objects.filter(name_key__in=wanted).select_related('skill')}
+  unaliased = wanted.keys() - found.keys()
+  if unaliased:
+    existing = Skill.objects.annotate(name_key=Lower('skill_name')).filter(name_key__in=unaliased).order_by('skill_id')
+    for skill in existing:
+      found.setdefault(skill.name_key, skill)
+
+  missing = [(key, name, entry) for key, (name, entry) in wanted.items() if key not in found]
+  created = []
+  if missing:
+    categories = ensure_categories({entry.get('category') or default_category for _, _, entry in missing})
+    Skill.objects.bulk_create(
+      [
+        Skill(
+          skill_name=name,
+          category=entry.get('category') or default_category,
+          # bulk_create skips the pre_save that places a skill in the category tree.
+          category_node=categories[entry.get('category') or default_category],
+          description=entry.get('description', ''),
+        )
+        for _, name, entry in missing
+      ],
+      ignore_conflicts=True,
+    )
+    # ignore_conflicts leaves the primary keys unset, so read the rows back.
+    names = {key: name for key, name, _ in missing}
+    for skill in Skill.objects.annotate(name_key=Lower('skill_name')).filter(name_key__in=names):
+      found[skill.name_key] = skill
+      if skill.skill_name == names[skill.name_key]:
+        created.append(skill)
+
+    # bulk_create sends no post_save, so invalidate cached skill lists and tell
+    # the autocomplete index directly.
+    response_cache.invalidate('skills')
+    if skill_autocomplete.is_built:
+      values = [(skill.skill_id, skill.skill_name, skill.category) for skill in created]
+      transaction.on_commit(lambda: index_new_skills(values))
+
+  return found, created
+
+
+def index_new_skills(values):
+  for skill_id, name, category in values:
+    skill_autocomplete.add(skill_id, name, category)
@@ -0,0 +1,63 @@
+import random
+import resource
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from skills.autocomplete import SkillAutocomplete
+
+
+class Command(BaseCommand):
+    help = 'Benchmark skill autocomplete on a synthetic catalogue (nothing is written to the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skills', type=int, default=1_000_000, help='Number of skills in the catalogue')
+        parser.add_argument('--queries', type=int, default=10_000, help='Number of lookups to time')
+        parser.add_argument('--adds', type=int, default=1_000, help='Number of incremental additions to time')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+
+        def word():
+            return ''.join(rng.choices(letters, k=rng.randint(3, 9))).capitalize()
+
+        count = options['skills']
+        names = {' '.join(word() for _ in range(rng.randint(1, 3))) for _ in range(count)}
+        skills = [(skill_id, name, f'Category {skill_id % 50}') for skill_id, name in enumerate(names, 1)]
+        # A few skills are used a lot, most hardly at all.
+        popularity = {skill_id: int(1000 / rng.randint(1, 1000)) for skill_id, _, _ in skills}
+
+        index = SkillAutocomplete()
+        started = time.perf_counter()
+        index.build(skills=skills, popularity=popularity)
+        self.stdout.write(
+            f'Built index over {len(skills):,} skills ({len(index.keys):,} keys, '
+            f'{len(index.top):,} precomputed prefixes) in {time.perf_counter() - started:.2f}s '
+            f'(max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB)'
+        )
+
+        # What people type: the first 1-6 letters of a word of some skill.
+        queries = []
+        for _ in range(options['queries']):
+            _, name, _ = rng.choice(skills)
+            queries.append(rng.choice(name.split())[:rng.randint(1, 6)])
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            index.suggest(query, limit=10)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+
+        adds = []
+        for skill_id in range(len(skills) + 1, len(skills) + options['adds'] + 1):
+            started = time.perf_counter()
+            index.add(skill_id, f'{word()} {word()}', 'New')
+            adds.append((time.perf_counter() - started) * 1_000_000)
+
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(queries):,} lookups: p50 {statistics.median(timings):.0f} us, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.0f} us, max {timings[-1]:.0f} us; '
+            f'{len(adds):,} additions: p50 {statistics.median(adds):.0f} us, max {max(adds):.0f} us'
+        ))
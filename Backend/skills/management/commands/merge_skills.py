@@ -0,0 +1,43 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from skills.models import Skill
+from skills.taxonomy import merge_skill
+
+
+class Command(BaseCommand):
+    help = (
+        'Merge duplicate skills into one: re-point user skills, listings, proposals and trades '
+        'in batches, keep the old names as aliases and delete the duplicates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', type=int, help='skill_id to keep')
+        parser.add_argument('sources', type=int, nargs='+', help='skill_ids to merge into the target')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows re-pointed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        skills = Skill.objects.in_bulk([options['target'], *options['sources']])
+        missing = {options['target'], *options['sources']} - skills.keys()
+        if missing:
+            raise CommandError(f'Unknown skill ids: {", ".join(map(str, sorted(missing)))}')
+        target = skills[options['target']]
+
+        for source_id in options['sources']:
+            source = skills[source_id]
+            try:
+                moved = merge_skill(source, target, batch_size=options['batch_size'])
+            except ValidationError as error:
+                raise CommandError(error.messages[0])
+            for reference, count in moved.items():
+                if count:
+                    self.stdout.write(f'  {reference}: {count}')
+            self.stdout.write(f'Merged "{source.skill_name}" into "{target.skill_name}"')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully merged {len(options["sources"])} skills into "{target.skill_name}"'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:42
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(django.db.models.functions.text.Lower('skill_name'), name='skill_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_category_tree(apps, schema_editor):
+    """Every category name in use becomes a top-level category; the tree is then curated in the admin."""
+    Skill = apps.get_model('skills', 'Skill')
+    SkillCategory = apps.get_model('skills', 'SkillCategory')
+    SkillCategoryClosure = apps.get_model('skills', 'SkillCategoryClosure')
+    names = Skill.objects.exclude(category='').values_list('category', flat=True).distinct().order_by()
+    for name in names:
+        category = SkillCategory.objects.create(name=name)
+        SkillCategoryClosure.objects.create(ancestor=category, descendant=category, depth=0)
+        Skill.objects.filter(category=name).update(category_node=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0002_skill_name_lower_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillAlias',
+            fields=[
+                ('alias_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('name_key', models.CharField(editable=False, max_length=100, unique=True)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='skills.skill')),
+            ],
+            options={
+                'verbose_name_plural': 'skill aliases',
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillCategory',
+            fields=[
+                ('category_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='skills.skillcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'skill categories',
+            },
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='category_node',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='skills', to='skills.skillcategory'),
+        ),
+        migrations.CreateModel(
+            name='SkillCategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='skills.skillcategory')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='skills.skillcategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='skill_category_ancestors_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='skill_category_closure_uniq')],
+            },
+        ),
+        migrations.RunPython(build_category_tree, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_duplicates(apps, schema_editor):
+    """The constraint cannot be added while two skills differ only in case; merge those first."""
+    Skill = apps.get_model('skills', 'Skill')
+    duplicates = (
+        Skill.objects.annotate(name_key=Lower('skill_name')).order_by()
+        .values('name_key').annotate(n=Count('skill_id')).filter(n__gt=1)
+        .values_list('name_key', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Skills differing only in case: %s. Merge them with `manage.py merge_skills` first.'
+            % ', '.join(sorted(duplicates))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0003_skill_taxonomy'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicates, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='skill',
+            name='skill_name_lower_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='skill',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('skill_name'), name='skill_name_lower_uniq'),
+        ),
+    ]
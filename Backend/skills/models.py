@@ -1,10 +1,76 @@
 from django.db import models
+from django.db.models.functions import Lower
+
+class SkillCategory(models.Model):
+    """
+    A node of the category tree ("Frontend" under "Web Development" under
+    "Programming"). SkillCategoryClosure holds every ancestor/descendant pair,
+    so everything under a category is one indexed join at any depth; it is
+    kept in step with `parent` by skills.signals.
+    """
+    category_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+    parent = models.ForeignKey(
+      'self', on_delete=models.PROTECT, null=True, blank=True, related_name='children'
+    )
+
+    class Meta:
+      verbose_name_plural = 'skill categories'
+
+    def __str__(self):
+      return self.name
+
+
+class SkillCategoryClosure(models.Model):
+    ancestor = models.ForeignKey(SkillCategory, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(SkillCategory, on_delete=models.CASCADE, related_name='ancestor_links')
+    # 0 for a category's row for itself, 1 for its parent, ...
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+      constraints = [
+        # Also the index behind "descendants of X".
+        models.UniqueConstraint(fields=['ancestor', 'descendant'], name='skill_category_closure_uniq'),
+      ]
+      indexes = [
+        models.Index(fields=['descendant', 'depth'], name='skill_category_ancestors_idx'),
+      ]
+
+    def __str__(self):
+      return f"{self.ancestor} > {self.descendant} ({self.depth})"
+
 
 class Skill(models.Model):
     skill_id = models.AutoField(primary_key=True)
     skill_name = models.CharField(max_length=100, unique=True)
     category = models.CharField(max_length=50)
     description = models.TextField(blank=True, null=True)
+    # The tree node named `category`; set from the name by skills.signals.
+    category_node = models.ForeignKey(
+      SkillCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='skills'
+    )
+
+    class Meta:
+      constraints = [
+        # One skill per name whatever its case; also the index behind the
+        # case-insensitive lookups of skills.catalogue.resolve_skills.
+        models.UniqueConstraint(Lower('skill_name'), name='skill_name_lower_uniq'),
+      ]
 
     def __str__(self):
       return self.skill_name
+
+
+class SkillAlias(models.Model):
+    """Another name for a skill ("JS" for "JavaScript"), e.g. left behind by merge_skills."""
+    alias_id = models.AutoField(primary_key=True)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases')
+    name = models.CharField(max_length=100)
+    # skills.catalogue.name_key(name), set by skills.signals; what names are matched on.
+    name_key = models.CharField(max_length=100, unique=True, editable=False)
+
+    class Meta:
+      verbose_name_plural = 'skill aliases'
+
+    def __str__(self):
+      return f"{self.name} -> {self.skill}"
@@ -5,3 +5,13 @@ class SkillSerializer(serializers.ModelSerializer):
   class Meta:
     model = Skill
     fields = ['skill_id', 'skill_name', 'category', 'description']
+
+
+class SkillInputSerializer(serializers.Serializer):
+  """
+  A skill to create, alone or in a list. Unlike SkillSerializer it runs no
+  uniqueness query per item: names are resolved in bulk (skills.catalogue).
+  """
+  skill_name = serializers.CharField(max_length=100)
+  category = serializers.CharField(max_length=50)
+  description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
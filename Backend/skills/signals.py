@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from swapo.response_cache import response_cache
+from .autocomplete import skill_autocomplete
+from .catalogue import name_key
+from .models import Skill, SkillAlias, SkillCategory
+from .taxonomy import check_parent, ensure_categories, link_new_category, move_category
+
+
+@receiver(pre_save, sender=Skill)
+def place_skill_in_category_tree(sender, instance, raw=False, **kwargs):
+  """Point category_node at the category named by `category`, creating a top-level one if needed"""
+  if raw or not instance.category:
+    return
+  if instance.category_node_id is None or instance.category_node.name != instance.category:
+    instance.category_node = ensure_categories([instance.category])[instance.category]
+
+
+@receiver(pre_save, sender=SkillCategory)
+def remember_previous_parent(sender, instance, raw=False, **kwargs):
+  instance._previous_parent_id = None
+  if instance.pk and not raw:
+    check_parent(instance)
+    instance._previous_parent_id = SkillCategory.objects.filter(pk=instance.pk).values_list(
+      'parent_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=SkillCategory)
+def update_category_closure(sender, instance, created, raw=False, **kwargs):
+  """Keep the closure table in step with the tree"""
+  if raw:
+    return
+  if created:
+    link_new_category(instance)
+  elif instance.parent_id != instance._previous_parent_id:
+    move_category(instance)
+
+
+@receiver(pre_save, sender=SkillAlias)
+def set_alias_key(sender, instance, **kwargs):
+  instance.name_key = name_key(instance.name)
+
+
+@receiver(post_save, sender=SkillAlias)
+def index_saved_alias(sender, instance, **kwargs):
+  if skill_autocomplete.is_built:
+    values = (instance.skill_id, instance.name)
+    transaction.on_commit(lambda: skill_autocomplete.add_alias(*values))
+
+
+@receiver(post_delete, sender=SkillAlias)
+def unindex_deleted_alias(sender, instance, **kwargs):
+  if skill_autocomplete.is_built:
+    values = (instance.skill_id, instance.name)
+    transaction.on_commit(lambda: skill_autocomplete.remove_alias(*values))
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_cached_skill(sender, instance, **kwargs):
+  """Skill lists, and every cached response naming this skill"""
+  response_cache.invalidate('skills', f'skill:{instance.skill_id}')
+
+
+@receiver(post_save, sender=Skill)
+def index_saved_skill(sender, instance, **kwargs):
+  """Make a new or renamed skill suggestible in this process once committed"""
+  if skill_autocomplete.is_built:
+    values = (instance.skill_id, instance.skill_name, instance.category)
+    transaction.on_commit(lambda: skill_autocomplete.add(*values))
+
+
+@receiver(post_delete, sender=Skill)
+def unindex_deleted_skill(sender, instance, **kwargs):
+  if skill_autocomplete.is_built:
+    skill_id = instance.skill_id
+    transaction.on_commit(lambda: skill_autocomplete.remove(skill_id))
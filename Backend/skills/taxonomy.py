@@ -0,0 +1,146 @@
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from .models import Skill, SkillAlias, SkillCategory, SkillCategoryClosure
+
+# Every foreign key to Skill, as (model, field); merge_skill re-points them all.
+SKILL_REFERENCES = [
+  ('userSkills.UserSkill', 'skill'),
+  ('listings.SkillListing', 'skill_offered'),
+  ('listings.SkillListing', 'skill_desired'),
+  ('trade.TradeProposal', 'skill_offered_by_proposer'),
+  ('trade.TradeProposal', 'skill_desired_by_proposer'),
+  ('trade.Trade', 'skill1'),
+  ('trade.Trade', 'skill2'),
+  ('trade.TradeCycleMember', 'teaches'),
+]
+
+
+def skills_under(category_names):
+  """
+  Ids of the skills in any of the named categories or anywhere below them,
+  as a values() queryset to use in `__in` (one join on the closure table).
+  """
+  return Skill.objects.filter(
+    category_node__ancestor_links__ancestor__name__in=category_names
+  ).values('skill_id')
+
+
+def ensure_categories(names):
+  """
+  {name: SkillCategory} for `names`, creating the missing ones as top-level
+  categories. A constant number of queries however many names there are.
+  """
+  names = set(filter(None, names))
+  found = {category.name: category for category in SkillCategory.objects.filter(name__in=names)}
+  missing = names - found.keys()
+  if missing:
+    SkillCategory.objects.bulk_create([SkillCategory(name=name) for name in missing], ignore_conflicts=True)
+    # ignore_conflicts leaves the primary keys unset, so read the rows back.
+    created = list(SkillCategory.objects.filter(name__in=missing))
+    # bulk_create sends no post_save: add the closure's row of each category for itself.
+    SkillCategoryClosure.objects.bulk_create(
+      [SkillCategoryClosure(ancestor=category, descendant=category, depth=0) for category in created],
+      ignore_conflicts=True,
+    )
+    found.update((category.name, category) for category in created)
+  return found
+
+
+def check_parent(category):
+  """A category cannot be moved below itself"""
+  if category.pk and category.parent_id and SkillCategoryClosure.objects.filter(
+    ancestor_id=category.pk, descendant_id=category.parent_id
+  ).exists():
+    raise ValidationError(f"{category.name} cannot be placed under one of its own subcategories")
+
+
+def link_new_category(category):
+  """Closure rows of a new category: itself at depth 0, then its parent's ancestors one level further"""
+  rows = [SkillCategoryClosure(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+  if category.parent_id:
+    rows += [
+      SkillCategoryClosure(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1)
+      for ancestor_id, depth in SkillCategoryClosure.objects.filter(
+        descendant_id=category.parent_id
+      ).values_list('ancestor_id', 'depth')
+    ]
+  SkillCategoryClosure.objects.bulk_create(rows)
+
+
+def move_category(category):
+  """
+  Re-link a category's whole subtree after its parent changed: drop the
+  rows tying the subtree to its old ancestors, add every new ancestor x
+  subtree node pair. Rows inside the subtree stay as they are.
+  """
+  subtree = dict(
+    SkillCategoryClosure.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth')
+  )
+  SkillCategoryClosure.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+  if category.parent_id:
+    ancestors = SkillCategoryClosure.objects.filter(
+      descendant_id=category.parent_id
+    ).values_list('ancestor_id', 'depth')
+    SkillCategoryClosure.objects.bulk_create([
+      SkillCategoryClosure(ancestor_id=ancestor_id, descendant_id=node_id, depth=above + 1 + below)
+      for ancestor_id, above in ancestors
+      for node_id, below in subtree.items()
+    ])
+
+
+def repoint(model, field, source_id, target_id, batch_size):
+  """Move `field` of every `model` row from the source skill to the target, one transaction per batch"""
+  column = f'{field}_id'
+  rows = model.objects.filter(**{column: source_id}).order_by('pk').values_list('pk', flat=True)
+  moved = 0
+  while True:
+    with transaction.atomic():
+      # Updated rows no longer match, so each batch is simply the first N left.
+      ids = list(rows[:batch_size])
+      if not ids:
+        return moved
+      model.objects.filter(pk__in=ids).update(**{column: target_id})
+      if model._meta.label == 'listings.SkillListing':
+        from listings.search import refresh_documents
+        refresh_documents(model.objects.filter(pk__in=ids))
+    moved += len(ids)
+
+
+def drop_duplicate_user_skills(source_id, target_id, batch_size):
+  """UserSkill rows of the source skill whose user already has the target with the same type"""
+  UserSkill = apps.get_model('userSkills', 'UserSkill')
+  duplicates = UserSkill.objects.filter(skill_id=source_id).filter(Exists(
+    UserSkill.objects.filter(user_id=OuterRef('user_id'), skill_id=target_id, skill_type=OuterRef('skill_type'))
+  )).order_by('pk').values_list('pk', flat=True)
+  dropped = 0
+  while True:
+    ids = list(duplicates[:batch_size])
+    if not ids:
+      return dropped
+    UserSkill.objects.filter(pk__in=ids).delete()
+    dropped += len(ids)
+
+
+def merge_skill(source, target, batch_size=1000):
+  """
+  Fold `source` into `target`: re-point every reference in batches, keep the
+  source's name (and aliases) as aliases of the target, delete the source.
+  Returns {"model.field": rows moved}.
+  """
+  from .catalogue import name_key
+
+  if source.pk == target.pk:
+    raise ValidationError("A skill cannot be merged into itself")
+  moved = {'userSkills.UserSkill (duplicates dropped)': drop_duplicate_user_skills(source.pk, target.pk, batch_size)}
+  for label, field in SKILL_REFERENCES:
+    moved[f'{label}.{field}'] = repoint(apps.get_model(label), field, source.pk, target.pk, batch_size)
+
+  with transaction.atomic():
+    SkillAlias.objects.filter(skill=source).update(skill=target)
+    key = name_key(source.skill_name)
+    if key != name_key(target.skill_name):
+      SkillAlias.objects.get_or_create(name_key=key, defaults={'skill': target, 'name': source.skill_name})
+    source.delete()
+  return moved
@@ -1,3 +1,313 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from listings.models import SkillListing
+from userSkills.matching import match_index
+from userSkills.models import UserSkill
+from trade.models import Trade
+from .autocomplete import SkillAutocomplete, normalise_name, skill_autocomplete
+from .catalogue import resolve_skills
+from .models import Skill, SkillAlias, SkillCategory, SkillCategoryClosure
+from .taxonomy import skills_under
+
+
+class SkillAutocompleteIndexTests(TestCase):
+  def names(self, index, query, limit=10):
+    return [name for _, name, _, _ in index.suggest(query, limit=limit)]
+
+  def test_matches_word_prefixes_ignoring_case_and_accents(self):
+    index = SkillAutocomplete()
+    index.build(
+      skills=[(1, 'Electric Guitar', 'Music'), (2, 'Guitar', 'Music'), (3, 'Café Barista', 'Food')],
+      popularity={1: 5, 2: 1},
+    )
+    self.assertEqual(self.names(index, 'GUI'), ['Electric Guitar', 'Guitar'])
+    self.assertEqual(self.names(index, 'cafe  b'), ['Café Barista'])
+    self.assertEqual(self.names(index, 'electric g'), ['Electric Guitar'])
+    self.assertEqual(self.names(index, 'x'), [])
+    self.assertEqual(normalise_name('  Café   Barista '), 'cafe barista')
+
+  def test_precomputed_prefixes_agree_with_ranking_at_lookup_time(self):
+    skills = [(n, f'Skill {chr(97 + n % 3)}{n:04}', 'Test') for n in range(1, 400)]
+    popularity = {n: n % 17 for n in range(1, 400)}
+    index = SkillAutocomplete()
+    index.build(skills=skills, popularity=popularity)
+    self.assertIn('s', index.top)
+
+    expected = sorted(range(1, 400), key=lambda n: (-popularity[n], skills[n - 1][1].casefold(), n))
+    self.assertEqual([row[0] for row in index.suggest('sk', limit=20)], expected[:20])
+    # The same prefix ranked directly, without the precomputed list.
+    del index.top['sk']
+    self.assertEqual([row[0] for row in index.suggest('sk', limit=20)], expected[:20])
+
+  def test_additions_renames_and_removals_are_incremental(self):
+    index = SkillAutocomplete()
+    index.build(skills=[(n, f'Piano {n:03}', 'Music') for n in range(1, 300)], popularity={n: 1 for n in range(1, 300)})
+    index.add(1000, 'Pottery', 'Crafts')
+    self.assertEqual(self.names(index, 'pott'), ['Pottery'])
+    self.assertIn('p', index.top)
+    self.assertNotIn(1000, index.top['p'])  # never used, so behind every piano
+
+    index.add(1000, 'Woodwork', 'Crafts')
+    self.assertEqual(self.names(index, 'pott'), [])
+    self.assertEqual(self.names(index, 'wood'), ['Woodwork'])
+
+    index.popularity[1001] = 50
+    index.add(1001, 'Pianola', 'Music')
+    self.assertEqual(self.names(index, 'p', limit=1), ['Pianola'])
+    index.remove(1001)
+    self.assertEqual(self.names(index, 'pianol'), [])
+    self.assertNotIn(1001, index.top['p'])
+    self.assertEqual(len(index.keys), 2 * 299 + 1)  # 'piano 001' and '001', plus 'woodwork'
+
+
+  def test_popular_multi_word_skills_can_be_renamed_and_removed(self):
+    skills = [(n, f'Piano {n:03}', 'Music') for n in range(1, 300)] + [(1000, 'Electric Guitar', 'Music')]
+    index = SkillAutocomplete()
+    index.build(skills=skills, popularity={1000: 50}, aliases=[(1000, 'Axe')])
+    self.assertIn(1000, index.top[''])
+
+    index.add(1000, 'Bass Guitar', 'Music')
+    self.assertEqual(self.names(index, 'bass'), ['Bass Guitar'])
+    self.assertEqual(self.names(index, 'axe'), ['Bass Guitar'])
+    self.assertEqual(self.names(index, 'electric'), [])
+
+    index.remove(1000)
+    self.assertNotIn(1000, index.top[''])
+    self.assertEqual(len(index.suggest('', limit=20)), 20)
+    self.assertEqual(self.names(index, 'guitar') + self.names(index, 'axe'), [])
+    self.assertEqual(len(index.keys), 2 * 299)
+
+  def test_only_one_request_rebuilds_a_stale_index(self):
+    index = SkillAutocomplete()
+    index.build(skills=[(1, 'Guitar', 'Music')], popularity={}, aliases=[])
+    built_at = index.built_at
+    with override_settings(SKILL_AUTOCOMPLETE_MAX_AGE=-1):
+      with index.rebuild_lock:
+        # Another request is rebuilding: keep serving the current index.
+        index.ensure_fresh()
+        self.assertEqual(index.built_at, built_at)
+        self.assertEqual(self.names(index, 'gui'), ['Guitar'])
+      index.ensure_fresh()
+    self.assertGreater(index.built_at, built_at)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SkillAutocompleteEndpointTests(TestCase):
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create_user(email='skills@example.com')
+    cls.python = Skill.objects.create(skill_name='Python', category='Programming')
+    cls.pottery = Skill.objects.create(skill_name='Pottery', category='Crafts')
+    cls.piano = Skill.objects.create(skill_name='Piano', category='Music')
+    UserSkill.objects.create(user=cls.user, skill=cls.pottery, skill_type='offering')
+    UserSkill.objects.create(user=cls.user, skill=cls.piano, skill_type='desiring')
+    SkillListing.objects.create(
+      user=cls.user, skill_offered=cls.pottery, skill_desired=cls.python, title='t', description='d'
+    )
+
+  def setUp(self):
+    self.client = APIClient()
+    skill_autocomplete.build()
+
+  def suggest(self, **params):
+    response = self.client.get('/api/v1/skills/autocomplete/', params)
+    self.assertEqual(response.status_code, 200)
+    return response.json()['results']
+
+  def test_ranked_by_popularity_without_queries(self):
+    with CaptureQueriesContext(connection) as ctx:
+      results = self.suggest(q='p')
+    self.assertEqual(len(ctx.captured_queries), 0)
+    self.assertEqual(
+      [(row['skill_name'], row['popularity']) for row in results],
+      [('Pottery', 2), ('Piano', 1), ('Python', 1)],
+    )
+    self.assertEqual(len(self.suggest(q='p', limit=1)), 1)
+
+  def test_new_skills_are_suggested_once_committed(self):
+    self.client.force_authenticate(self.user)
+    with self.captureOnCommitCallbacks(execute=True):
+      response = self.client.post('/api/v1/skills/', {'skill_name': 'Pilates', 'category': 'Fitness'})
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual([row['skill_name'] for row in self.suggest(q='pil')], ['Pilates'])
+
+  def test_stale_index_is_rebuilt(self):
+    UserSkill.objects.create(user=self.user, skill=self.python, skill_type='offering')
+    UserSkill.objects.create(user=self.user, skill=self.python, skill_type='desiring')
+    self.assertEqual(self.suggest(q='p')[0]['skill_name'], 'Pottery')
+    with override_settings(SKILL_AUTOCOMPLETE_MAX_AGE=-1):
+      self.assertEqual(self.suggest(q='p')[0]['skill_name'], 'Python')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SkillBulkCreateTests(TestCase):
+  def setUp(self):
+    self.client = APIClient()
+    self.client.force_authenticate(User.objects.create_user(email='creator@example.com'))
+
+  def create(self, payload):
+    with CaptureQueriesContext(connection) as ctx:
+      response = self.client.post('/api/v1/skills/', payload, format='json')
+    return response, len(ctx.captured_queries)
+
+  def test_query_count_does_not_depend_on_batch_size(self):
+    # An existing category, so that neither request has to create it.
+    SkillCategory.objects.create(name='Test')
+    _, small = self.create([{'skill_name': 'Small 0', 'category': 'Test'}])
+    response, large = self.create([{'skill_name': f'Large {n}', 'category': 'Test'} for n in range(25)])
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual(len(response.json()), 25)
+    self.assertEqual(large, small)
+
+  def test_existing_names_are_matched_ignoring_case_spacing_and_aliases(self):
+    Skill.objects.create(skill_name='JavaScript', category='Programming')
+    Skill.objects.create(skill_name='Graphic Design', category='Art')
+    response, _ = self.create([
+      {'skill_name': 'js', 'category': 'Programming'},
+      {'skill_name': ' graphic   design ', 'category': 'Art'},
+      {'skill_name': 'Other', 'category': 'Art'},
+    ])
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(Skill.objects.count(), 2)
+
+    response, _ = self.create({'skill_name': ' Wood   carving', 'category': 'Crafts'})
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual(response.json()[0]['skill_name'], 'Wood carving')
+    self.assertEqual(self.create({'skill_name': 'x' * 101, 'category': 'Crafts'})[0].status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SkillTaxonomyTests(TestCase):
+  def setUp(self):
+    self.arts = SkillCategory.objects.create(name='Arts')
+    self.music = SkillCategory.objects.create(name='Music', parent=self.arts)
+    self.strings = SkillCategory.objects.create(name='Strings', parent=self.music)
+    self.guitar = Skill.objects.create(skill_name='Guitar', category='Strings')
+    self.piano = Skill.objects.create(skill_name='Piano', category='Music')
+    self.python = Skill.objects.create(skill_name='Python', category='Programming')
+
+  def under(self, *names):
+    return set(Skill.objects.filter(skill_id__in=skills_under(names)).values_list('skill_name', flat=True))
+
+  def ancestors(self, category):
+    return dict(
+      SkillCategoryClosure.objects.filter(descendant=category).values_list('ancestor__name', 'depth')
+    )
+
+  def test_skills_under_a_category_include_every_level_below(self):
+    self.assertEqual(self.under('Arts'), {'Guitar', 'Piano'})
+    self.assertEqual(self.under('Strings'), {'Guitar'})
+    self.assertEqual(self.under('Programming'), {'Python'})
+    self.assertEqual(self.ancestors(self.strings), {'Strings': 0, 'Music': 1, 'Arts': 2})
+
+  def test_moving_a_category_moves_its_subtree(self):
+    crafts = SkillCategory.objects.create(name='Crafts')
+    self.music.parent = crafts
+    self.music.save()
+    self.assertEqual(self.ancestors(self.strings), {'Strings': 0, 'Music': 1, 'Crafts': 2})
+    self.assertEqual(self.under('Arts'), set())
+    self.assertEqual(self.under('Crafts'), {'Guitar', 'Piano'})
+
+    self.arts.parent = self.strings
+    self.arts.save()
+    self.assertEqual(self.ancestors(self.arts), {'Arts': 0, 'Strings': 1, 'Music': 2, 'Crafts': 3})
+
+    self.music.parent = self.strings
+    with self.assertRaises(ValidationError):
+      self.music.save()
+
+  def test_aliases_resolve_to_their_skill(self):
+    SkillAlias.objects.create(skill=self.guitar, name='Acoustic  Guitar')
+    found, created = resolve_skills([{'skill_name': 'acoustic guitar'}, {'skill_name': 'PIANO'}])
+    self.assertEqual(created, [])
+    self.assertEqual(found, {'acoustic guitar': self.guitar, 'piano': self.piano})
+
+    skill_autocomplete.build()
+    self.assertEqual([row[1] for row in skill_autocomplete.suggest('acou')], ['Guitar'])
+    music = set(skills_under(['Music']).values_list('skill_id', flat=True))
+    self.assertEqual([row[1] for row in skill_autocomplete.suggest('p', within=music)], ['Piano'])
+
+  def test_skill_names_are_unique_ignoring_case(self):
+    with self.assertRaises(IntegrityError), transaction.atomic():
+      Skill.objects.create(skill_name='GUITAR', category='Music')
+
+    found, created = resolve_skills([{'skill_name': 'guitar'}, {'skill_name': 'Banjo'}])
+    self.assertEqual(found['guitar'], self.guitar)
+    self.assertEqual([skill.skill_name for skill in created], ['Banjo'])
+
+  def test_category_filters(self):
+    client = APIClient()
+    me, partner = User.objects.create_user(email='me@example.com'), User.objects.create_user(email='you@example.com')
+    SkillListing.objects.create(user=partner, skill_offered=self.guitar, skill_desired=self.python, title='t', description='d')
+    UserSkill.objects.create(user=me, skill=self.python, skill_type='offering')
+    UserSkill.objects.create(user=me, skill=self.guitar, skill_type='desiring')
+    UserSkill.objects.create(user=partner, skill=self.guitar, skill_type='offering')
+    UserSkill.objects.create(user=partner, skill=self.python, skill_type='desiring')
+    match_index.reset()
+    match_index.built_at = None
+    client.force_authenticate(me)
+
+    response = client.get('/api/v1/listings/search/', {'category': 'Arts'})
+    self.assertEqual(len(response.json()['results']), 1)
+    response = client.get('/api/v1/listings/search/', {'category': 'Programming'})
+    self.assertEqual(response.json()['results'], [])
+
+    response = client.get('/api/v1/user-skills/matches/', {'category': 'Music'})
+    self.assertEqual([row['user']['user_id'] for row in response.json()['results']], [partner.user_id])
+    response = client.get('/api/v1/user-skills/matches/', {'category': 'Programming'})
+    self.assertEqual(response.json()['results'], [])
+
+    skill_autocomplete.build()
+    response = client.get('/api/v1/skills/autocomplete/', {'q': 'p', 'category': 'Arts'})
+    self.assertEqual([row['skill_name'] for row in response.json()['results']], ['Piano'])
+
+
+class MergeSkillsCommandTests(TestCase):
+  def setUp(self):
+    self.guitar = Skill.objects.create(skill_name='Guitar', category='Music')
+    self.duplicate = Skill.objects.create(skill_name='Guitar playing', category='Music')
+    self.python = Skill.objects.create(skill_name='Python', category='Programming')
+    self.user = User.objects.create_user(email='one@example.com')
+    self.other = User.objects.create_user(email='two@example.com')
+
+  def merge(self, *args):
+    out = StringIO()
+    call_command('merge_skills', *map(str, args), '--batch-size', '1', stdout=out)
+    return out.getvalue()
+
+  def test_references_are_repointed_and_the_old_name_kept_as_an_alias(self):
+    UserSkill.objects.create(user=self.user, skill=self.guitar, skill_type='offering')
+    UserSkill.objects.create(user=self.user, skill=self.duplicate, skill_type='offering')  # duplicate once merged
+    UserSkill.objects.create(user=self.other, skill=self.duplicate, skill_type='offering')
+    UserSkill.objects.create(user=self.other, skill=self.duplicate, skill_type='desiring')
+    listing = SkillListing.objects.create(
+      user=self.user, skill_offered=self.duplicate, skill_desired=self.python, title='Lessons', description='d'
+    )
+    trade = Trade.objects.create(user1=self.user, user2=self.other, skill1=self.duplicate, skill2=self.python)
+
+    output = self.merge(self.guitar.skill_id, self.duplicate.skill_id)
+    self.assertIn('Successfully merged 1 skills into "Guitar"', output)
+
+    self.assertFalse(Skill.objects.filter(pk=self.duplicate.pk).exists())
+    self.assertEqual(UserSkill.objects.filter(skill=self.guitar).count(), 3)
+    self.assertEqual(UserSkill.objects.filter(user=self.user).count(), 1)
+    listing.refresh_from_db()
+    trade.refresh_from_db()
+    self.assertEqual((listing.skill_offered, trade.skill1), (self.guitar, self.guitar))
+    self.assertNotIn('playing', listing.search_document)
+    self.assertEqual(SkillAlias.objects.get().skill, self.guitar)
+    self.assertEqual(resolve_skills([{'skill_name': 'guitar playing'}])[0], {'guitar playing': self.guitar})
+
+  def test_unknown_or_identical_skills_are_refused(self):
+    with self.assertRaises(CommandError):
+      self.merge(self.guitar.skill_id, 999)
+    with self.assertRaises(CommandError):
+      self.merge(self.guitar.skill_id, self.guitar.skill_id)
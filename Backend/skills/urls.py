@@ -15,6 +15,7 @@ urlpatterns = [
 
 #  GET /api/v1/skills/ → List all skills
 # POST /api/v1/skills/ → Create a new skill
+# GET /api/v1/skills/autocomplete/?q= → Type-ahead suggestions, most used first
 # GET /api/v1/skills/{id}/ → Retrieve a skill
 # PUT /api/v1/skills/{id}/ → Update a skill
 # DELETE /api/v1/skills/{id}/ → Delete a skill
\ No newline at end of file
@@ -1,7 +1,13 @@
+from django.db import transaction
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from swapo.response_cache import cached_response
+from .autocomplete import MAX_SUGGESTIONS, skill_autocomplete
+from .catalogue import resolve_skills
 from .models import Skill
-from .serializers import SkillSerializer
+from .serializers import SkillInputSerializer, SkillSerializer
+from .taxonomy import skills_under
 from .permissions import IsAuthenticatedOrReadOnly
 
 class SkillViewSet(viewsets.ModelViewSet):
@@ -9,35 +15,54 @@ class SkillViewSet(viewsets.ModelViewSet):
   serializer_class = SkillSerializer
   permission_classes = [IsAuthenticatedOrReadOnly]
 
+  @cached_response(tags=lambda data, **kwargs: ['skills'])
+  def list(self, request, *args, **kwargs):
+    return super().list(request, *args, **kwargs)
+
   def create(self, request, *args, **kwargs):
+    """
+    Create one skill or a list of them. Names are canonicalised (spacing, case,
+    common abbreviations) and resolved all at once; only missing skills are created.
+    """
     is_many = isinstance(request.data, list)  # Check if a list is sent
-    data_to_create = []
-
-    if is_many:
-        for item in request.data:
-          skill_name = item.get("skill_name").strip()
-          if skill_name.lower() == "other":
-            # Ignore placeholder "Other"
-            continue
-          # Create if it does not exist
-          if not Skill.objects.filter(skill_name__iexact=skill_name).exists():
-            data_to_create.append(item)
-    else:
-        skill_name = request.data.get("skill_name")
-        if not Skill.objects.filter(skill_name__iexact=skill_name).exists():
-          data_to_create.append(request.data)
-
-    if not data_to_create:
+    serializer = SkillInputSerializer(data=request.data, many=is_many)
+    serializer.is_valid(raise_exception=True)
+    entries = serializer.validated_data if is_many else [serializer.validated_data]
+
+    with transaction.atomic():
+      _, created = resolve_skills(entries)
+
+    if not created:
         return Response(
           {"detail": "All skills already exist, nothing created."},
           status=status.HTTP_200_OK
         )
 
-    serializer = self.get_serializer(data=data_to_create, many=True)
-    serializer.is_valid(raise_exception=True)
-    self.perform_create(serializer)
-    headers = self.get_success_headers(serializer.data)
-    return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    return Response(SkillSerializer(created, many=True).data, status=status.HTTP_201_CREATED)
+
+  @action(detail=False, methods=['get'])
+  def autocomplete(self, request):
+    """
+    GET /skills/autocomplete/?q=gui&limit=10&category=Music
+    Skills with a word of their name or an alias starting with `q` (case and
+    accents ignored), most used first. Served from the in-process index, without
+    a database query unless ?category= (subcategories included) is given.
+    """
+    try:
+      limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_SUGGESTIONS))
+    except ValueError:
+      limit = 10
+    categories = [name.strip() for name in request.query_params.get('category', '').split(',') if name.strip()]
+    within = set(skills_under(categories).values_list('skill_id', flat=True)) if categories else None
+
+    skill_autocomplete.ensure_fresh()
+    suggestions = skill_autocomplete.suggest(request.query_params.get('q', ''), limit=limit, within=within)
+    return Response({
+      "results": [
+        {"skill_id": skill_id, "skill_name": name, "category": category, "popularity": popularity}
+        for skill_id, name, category, popularity in suggestions
+      ]
+    })
 
 
 # Permission:
@@ -2,6 +2,8 @@
 ASGI config for swapo project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP is served by Django; WebSocket connections are routed to the realtime
+event stream.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'swapo.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: the consumers touch models and settings.
+from realtime.consumers import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
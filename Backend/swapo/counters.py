@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class UnreadCounter:
+    """
+    A per-user unread count kept in the cache and adjusted in place as items
+    are created and read, so polling for badges does not run COUNT(*).
+
+    The database stays the source of truth: a missing key is recomputed with
+    `count_unread`, and every key expires after UNREAD_COUNTER_TIMEOUT so a
+    counter that drifted (a lost increment, another process' local cache)
+    heals on its own.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def key(self, user_id):
+        return f"unread:{self.name}:{user_id}"
+
+    def count_unread(self, user_id):
+        raise NotImplementedError
+
+    def get(self, user_id):
+        key = self.key(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = self.count_unread(user_id)
+            cache.set(key, count, settings.UNREAD_COUNTER_TIMEOUT)
+        return count
+
+    def add(self, user_id, delta):
+        """Adjust a cached count once the current transaction commits."""
+        if delta:
+            transaction.on_commit(lambda: self._add(user_id, delta))
+
+    def _add(self, user_id, delta):
+        key = self.key(user_id)
+        try:
+            if cache.incr(key, delta) < 0:
+                cache.delete(key)
+        except ValueError:
+            # Not cached: the next read computes it from the database.
+            pass
+
+    def reset(self, user_id):
+        transaction.on_commit(lambda: cache.delete(self.key(user_id)))
@@ -0,0 +1,121 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed, unique ordering.
+
+    The cursor holds the ordering values of the last row on the page, so the
+    next page is a single indexed range query (`WHERE (a, b) < (x, y)`) no
+    matter how deep the client has scrolled. The ordering must end with the
+    primary key so that every row has a distinct position.
+    """
+    ordering = ("-pk",)
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.queryset = queryset
+
+        queryset = queryset.order_by(*self.ordering)
+        encoded = request.query_params.get(self.cursor_query_param)
+        # Position the page starts after, or None on the first page.
+        self.position = self.decode_cursor(encoded) if encoded else None
+        if self.position is not None:
+            queryset = queryset.filter(self.get_seek_filter(self.position))
+
+        # Fetch one extra row to find out whether another page follows.
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_seek_filter(self, values):
+        """
+        Expand a row-value comparison into ORs of prefix equalities, e.g. for
+        `("-a", "-b")`: `a < x OR (a = x AND b < y)`.
+        """
+        clauses = []
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {f.lstrip("-"): v for f, v in zip(self.ordering[:i], values[:i])}
+            clauses.append(Q(**equal, **{f"{name}__{lookup}": values[i]}))
+        return reduce(lambda a, b: a | b, clauses)
+
+    def get_position(self, obj):
+        names = [f.lstrip("-") for f in self.ordering]
+        if isinstance(obj, dict):
+            # `.values()` querysets, e.g. grouped aggregates.
+            return [self.to_cursor_value(obj[name]) for name in names]
+        return [self.to_cursor_value(getattr(obj, name)) for name in names]
+
+    def to_cursor_value(self, value):
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        if hasattr(value, "pk"):
+            return value.pk
+        return value
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(f.lstrip("-"), v) for f, v in zip(self.ordering, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field.to_python(value)
+        return self.queryset.model._meta.get_field(name).to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.get_position(self.page[-1]))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
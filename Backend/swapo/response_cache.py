@@ -0,0 +1,182 @@
+"""
+Cached responses for public read endpoints.
+
+A cached entry holds the serialized data of one GET (keyed by path, sorted
+query parameters and negotiated media type) together with the *tags* it
+was built from, e.g. "listing:12", "user:3", "skill:7", each with the
+version the tag had at the time. Signals bump a tag's version when the
+rows behind it change (see the apps' signals modules), which invalidates
+exactly the entries that used it; nothing has to be found and deleted.
+
+Every bump also changes a global epoch, and a response is only stored when
+the epoch is the same as when its request started: a write that committed
+(and bumped) while the view was reading could otherwise have its stale data
+stored under the new versions. Versions are bumped both immediately and once
+the transaction commits. Entries also expire after RESPONSE_CACHE_TIMEOUT.
+
+Responses carry an ETag (a hash of the data) and Cache-Control, and a
+request whose If-None-Match matches gets an empty 304. Hits, misses and
+invalidations are counted in the cache (GET /api/v1/cache/stats/, staff only).
+
+Entries, versions and counters are only shared between processes when the
+backend is (file or redis, see RESPONSE_CACHE in settings). With the default
+locmem backend each worker process has its own: a bump in one worker does not
+reach the others, which keep serving their entries for up to
+RESPONSE_CACHE_TIMEOUT, and the counters are per worker. Use locmem only
+with a single worker process.
+"""
+import hashlib
+import json
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import urlencode
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+METRICS = ("hits", "misses", "not_modified", "invalidations")
+
+
+class ResponseCache:
+
+    @property
+    def cache(self):
+        return caches[settings.RESPONSE_CACHE_ALIAS]
+
+    def key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        raw = f"{request.path}?{query}|{request.accepted_media_type}"
+        return f"response:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+    def tag_key(self, tag):
+        return f"response-tag:{tag}"
+
+    def epoch(self):
+        """Changes with every invalidation; None until the first one"""
+        return self.cache.get("response-epoch")
+
+    def get(self, key):
+        """The cached entry, or None when missing or any of its tags changed since"""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        current = self.cache.get_many([self.tag_key(tag) for tag in entry["tags"]])
+        if any(current.get(self.tag_key(tag)) != version for tag, version in entry["tags"].items()):
+            return None
+        return entry
+
+    def set(self, key, data, tags, epoch):
+        """
+        The entry for `data`, stored unless an invalidation happened since
+        `epoch` was read (before the view queried the database).
+        """
+        tag_keys = {self.tag_key(tag): tag for tag in set(tags)}
+        versions = self.cache.get_many(tag_keys)
+        missing = tag_keys.keys() - versions.keys()
+        if missing:
+            # add() keeps a version another request set meanwhile; read back whichever won.
+            for tag_key in missing:
+                self.cache.add(tag_key, uuid.uuid4().hex, None)
+            versions.update(self.cache.get_many(missing))
+        entry = {
+            "data": data,
+            "etag": '"%s"' % hashlib.sha1(
+                json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+            ).hexdigest(),
+            "tags": {tag: versions.get(tag_key) for tag_key, tag in tag_keys.items()},
+        }
+        # Versions first, epoch second: a bump after this check changes versions read above.
+        if self.epoch() == epoch:
+            self.cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        return entry
+
+    def invalidate(self, *tags):
+        """Invalidate every entry built from any of `tags`, now and when the transaction commits"""
+        self.bump(tags)
+        transaction.on_commit(lambda: self.bump(tags))
+
+    def bump(self, tags):
+        versions = {self.tag_key(tag): uuid.uuid4().hex for tag in tags}
+        self.cache.set_many({**versions, "response-epoch": uuid.uuid4().hex}, None)
+        self.count("invalidations", len(tags))
+
+    def count(self, metric, n=1):
+        key = f"response-metric:{metric}"
+        try:
+            self.cache.incr(key, n)
+        except ValueError:
+            if not self.cache.add(key, n, None):
+                self.cache.incr(key, n)
+
+    def stats(self):
+        values = self.cache.get_many([f"response-metric:{metric}" for metric in METRICS])
+        return {metric: values.get(f"response-metric:{metric}", 0) for metric in METRICS}
+
+    def reset_stats(self):
+        self.cache.delete_many([f"response-metric:{metric}" for metric in METRICS])
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(tags, public=True):
+    """
+    Cache a view method's 200 responses. `tags(data, **kwargs)` names the
+    tags the response data was built from. Authentication and permissions
+    run before the method, so they are never skipped; `public=False` marks
+    responses as private to the client (Cache-Control) for views that need
+    a login but do not depend on who is logged in.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = response_cache.key(request)
+            entry = response_cache.get(key)
+            if entry is not None:
+                response_cache.count("hits")
+                outcome = "HIT"
+            else:
+                epoch = response_cache.epoch()
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                response_cache.count("misses")
+                entry = response_cache.set(key, response.data, tags(response.data, **kwargs), epoch)
+                outcome = "MISS"
+
+            if entry["etag"] in request.headers.get("If-None-Match", ""):
+                response_cache.count("not_modified")
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(entry["data"])
+            response["ETag"] = entry["etag"]
+            response["X-Cache"] = outcome
+            if public:
+                patch_cache_control(response, public=True, max_age=settings.RESPONSE_CACHE_MAX_AGE)
+            else:
+                patch_cache_control(response, private=True, max_age=settings.RESPONSE_CACHE_MAX_AGE)
+            patch_vary_headers(response, ["Accept"])
+            return response
+        return wrapper
+    return decorator
+
+
+class ResponseCacheStatsView(APIView):
+    """GET: hit/miss counters of the response cache and the hit ratio"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        stats = response_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        return Response({
+            "backend": settings.RESPONSE_CACHE,
+            **stats,
+            "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None,
+        })
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'trade',
     'notification',
     'message',
+    'realtime',
 ]
 
 MIDDLEWARE = [
@@ -86,6 +87,43 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'swapo.wsgi.application'
+ASGI_APPLICATION = 'swapo.asgi.application'
+
+# Realtime push: the in-process broker only reaches clients connected to the
+# same process; point this at a networked BaseBroker subclass when running
+# more than one ASGI worker.
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'realtime.broker.InProcessBroker')
+
+# Notification fan-out: "async" writes notifications from background worker
+# threads in batches after the triggering request commits; "sync" writes them
+# in the committing thread (tests, one-off scripts).
+NOTIFICATION_DISPATCH_MODE = os.environ.get('NOTIFICATION_DISPATCH_MODE', 'async')
+NOTIFICATION_DISPATCH_WORKERS = 2
+NOTIFICATION_DISPATCH_BATCH_SIZE = 200
+NOTIFICATION_DISPATCH_FLUSH_INTERVAL = 0.05  # seconds
+
+# Notification retention (manage.py prune_notifications): read notifications
+# older than their type's TTL are deleted, or archived first when enabled.
+NOTIFICATION_RETENTION_DAYS = {
+    'new_message': 30,
+    'system_alert': 30,
+    'trade_proposal': 180,
+    'trade_accepted': 180,
+    'trade_active': 180,
+    'trade_completed': 365,
+}
+NOTIFICATION_RETENTION_DEFAULT_DAYS = 90
+NOTIFICATION_RETENTION_ARCHIVE = os.environ.get('NOTIFICATION_RETENTION_ARCHIVE', 'False') == 'True'
+NOTIFICATION_RETENTION_BATCH_SIZE = 500
+
+# Matchmaking (userSkills.matching): each process keeps an in-memory skill index,
+# updated incrementally by its own writes and rebuilt at least this often (seconds)
+# to pick up writes made by other processes.
+MATCHMAKING_INDEX_MAX_AGE = 300
+
+# Skill autocomplete (skills.autocomplete): likewise per process; new skills are
+# added incrementally, popularity is refreshed by the rebuild every this many seconds.
+SKILL_AUTOCOMPLETE_MAX_AGE = 300
 
 # Database - PostgreSQL in production, SQLite for local dev
 if os.environ.get('DATABASE_URL'):
@@ -105,6 +143,54 @@ else:
         }
     }
 
+# Cache - Redis when REDIS_URL is set (shared by all workers), local memory otherwise
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cached responses of public read endpoints (swapo.response_cache). RESPONSE_CACHE
+# picks the backend: locmem (per process), file (shared by the workers of one
+# host, under RESPONSE_CACHE_DIR) or redis (any Redis-compatible server at
+# RESPONSE_CACHE_URL, REDIS_URL by default). locmem is only safe with a single
+# worker process: invalidations made in one worker never reach another, whose
+# entries then stay stale for up to RESPONSE_CACHE_TIMEOUT.
+RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'redis' if os.environ.get('REDIS_URL') else 'locmem')
+if RESPONSE_CACHE == 'redis':
+    CACHES['responses'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_URL', os.environ.get('REDIS_URL')),
+    }
+elif RESPONSE_CACHE == 'file':
+    CACHES['responses'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_DIR', BASE_DIR / '.cache' / 'responses'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))},
+    }
+else:
+    CACHES['responses'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))},
+    }
+RESPONSE_CACHE_ALIAS = 'responses'
+# Server-side lifetime of a cached response (seconds); invalidation usually comes first
+RESPONSE_CACHE_TIMEOUT = 600
+# Cache-Control max-age sent to clients; 0 makes them revalidate with If-None-Match
+RESPONSE_CACHE_MAX_AGE = 0
+
+# Unread badge counters are recomputed from the database at least this often (seconds)
+UNREAD_COUNTER_TIMEOUT = 300
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -0,0 +1,21 @@
+from django.db import connection
+
+
+class QueryPlanMixin:
+    """
+    TestCase helpers for asserting that hot queries are served by an index.
+
+    Test tables hold a handful of rows, where a sequential scan is always
+    cheapest, so on PostgreSQL sequential scans are disabled for the EXPLAIN
+    to show which index the planner *would* use once the table is large.
+    """
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.explain(queryset)
+        self.assertIn(index_name, plan, f"{index_name} not used:\n{plan}")
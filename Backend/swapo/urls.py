@@ -23,6 +23,8 @@ from django.shortcuts import redirect
 from django.conf import settings
 from django.conf.urls.static import static
 
+from swapo.response_cache import ResponseCacheStatsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
 
@@ -52,6 +54,7 @@ urlpatterns = [
     path('api/v1/trades/', include('trade.urls')),
     path('api/v1/notifications/', include('notification.urls')),
     path('api/v1/messages/', include('message.urls')),
+    path('api/v1/cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
 
 
     # then in urlpatterns
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TradeProposal, Trade
+from .models import TradeProposal, Trade, TradeCycle, TradeCycleMember
 # Register your models here.
 
-admin.site.register([Trade, TradeProposal])
\ No newline at end of file
+admin.site.register([Trade, TradeProposal, TradeCycle, TradeCycleMember])
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Multi-party skill swaps: short cycles in the "can teach what they want" graph.
+
+Every user who both offers and desires something is a node, numbered
+0..n-1. There is an edge A -> B when A offers a skill B desires (from
+UserSkill rows and active SkillListings). A cycle A -> B -> C -> A is a
+3-way trade where everybody teaches one person and learns from another.
+
+The graph is stored as compact integer arrays in CSR form (per-node
+offsets into one flat array of targets, plus the skill of each edge), so
+memory stays linear in the number of edges. Out-degree is capped at
+`max_degree` (rarer skills first) to bound both memory and search time.
+
+Each cycle is found exactly once, from its lowest-numbered member: the
+search from A only visits nodes numbered above A. Closing edges back to A
+are tested with set intersections against A's predecessors rather than by
+walking a further level.
+"""
+import multiprocessing
+import time
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from listings.models import SkillListing
+from userSkills.models import UserSkill
+from .models import TradeCycle, TradeCycleMember
+
+
+@dataclass
+class CycleGraph:
+    user_ids: array   # node -> user_id
+    offsets: array    # node -> start of its edges in targets/skills; offsets[n] == len(targets)
+    targets: array    # edge -> target node
+    skills: array     # edge -> skill the source teaches the target
+    predecessors: list  # node -> array of source nodes
+
+    @property
+    def node_count(self):
+        return len(self.user_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def out(self, node):
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def edge_skill(self, source, target):
+        start, end = self.offsets[source], self.offsets[source + 1]
+        return self.skills[start + self.targets[start:end].index(target)]
+
+
+def build_graph(offers, desires, max_degree=32):
+    """
+    `offers` / `desires`: user_id -> set of skill ids.
+    Users missing either side cannot be part of a cycle and are left out.
+    """
+    user_ids = array("q", sorted(user_id for user_id in offers if desires.get(user_id)))
+    node_of = {user_id: node for node, user_id in enumerate(user_ids)}
+
+    desired_by = defaultdict(list)
+    for user_id, skill_ids in desires.items():
+        node = node_of.get(user_id)
+        if node is not None:
+            for skill_id in skill_ids:
+                desired_by[skill_id].append(node)
+
+    offsets, targets, skills = array("q", [0]), array("q"), array("q")
+    predecessors = [array("q") for _ in user_ids]
+    for node, user_id in enumerate(user_ids):
+        seen = {node}
+        # Rarer skills first: they make the more specific, less contested swaps.
+        for skill_id in sorted(offers[user_id], key=lambda s: len(desired_by.get(s, ()))):
+            for target in desired_by.get(skill_id, ()):
+                if target in seen:
+                    continue
+                seen.add(target)
+                targets.append(target)
+                skills.append(skill_id)
+                predecessors[target].append(node)
+                if len(seen) > max_degree:
+                    break
+            if len(seen) > max_degree:
+                break
+        offsets.append(len(targets))
+    return CycleGraph(user_ids, offsets, targets, skills, predecessors)
+
+
+def load_graph(max_degree=32):
+    """The graph of current UserSkill rows and active listings."""
+    offers, desires = defaultdict(set), defaultdict(set)
+    for user_id, skill_id, skill_type in UserSkill.objects.values_list(
+        "user_id", "skill_id", "skill_type"
+    ).iterator(chunk_size=10000):
+        (offers if skill_type == "offering" else desires)[user_id].add(skill_id)
+    for user_id, offered, desired in SkillListing.objects.filter(status="active").values_list(
+        "user_id", "skill_offered_id", "skill_desired_id"
+    ).iterator(chunk_size=10000):
+        offers[user_id].add(offered)
+        desires[user_id].add(desired)
+    return build_graph(offers, desires, max_degree)
+
+
+def cycles_from(graph, start, max_length, max_per_start):
+    """Cycles whose lowest-numbered member is `start`, as tuples of nodes in edge order."""
+    closing = {node for node in graph.predecessors[start] if node > start}
+    if not closing:
+        return []
+    found = []
+    for second in graph.out(start):
+        if second <= start:
+            continue
+        for third in graph.out(second):
+            if third <= start or third == second:
+                continue
+            if third in closing:
+                found.append((start, second, third))
+            if max_length >= 4:
+                for fourth in closing.intersection(graph.out(third)):
+                    if fourth != second and fourth != third:
+                        found.append((start, second, third, fourth))
+            if len(found) >= max_per_start:
+                return found[:max_per_start]
+    return found
+
+
+# Set in the parent before forking, so workers share the graph copy-on-write.
+_worker_graph = None
+
+
+def _search_chunk(args):
+    starts, max_length, max_per_start, deadline = args
+    found = []
+    for start in starts:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        found += cycles_from(_worker_graph, start, max_length, max_per_start)
+    return found
+
+
+def find_cycles(graph, max_length=4, max_per_start=5, workers=1, time_limit=None, chunk_size=2000):
+    """
+    Search every start node, in `workers` forked processes when more than
+    one is asked for. Stops starting new nodes once `time_limit` seconds
+    have passed.
+    """
+    global _worker_graph
+    deadline = time.monotonic() + time_limit if time_limit else None
+    chunks = [
+        (range(first, min(first + chunk_size, graph.node_count)), max_length, max_per_start, deadline)
+        for first in range(0, graph.node_count, chunk_size)
+    ]
+    _worker_graph = graph
+    try:
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                results = pool.map(_search_chunk, chunks)
+        else:
+            results = map(_search_chunk, chunks)
+        return [cycle for chunk in results for cycle in chunk]
+    finally:
+        _worker_graph = None
+
+
+def save_cycles(graph, cycles, batch_size=1000):
+    """Replace the stored suggestions with `cycles`."""
+    with transaction.atomic():
+        TradeCycle.objects.all().delete()
+        for first in range(0, len(cycles), batch_size):
+            batch = cycles[first:first + batch_size]
+            stored = TradeCycle.objects.bulk_create([TradeCycle(length=len(cycle)) for cycle in batch])
+            TradeCycleMember.objects.bulk_create([
+                TradeCycleMember(
+                    cycle=trade_cycle,
+                    position=position,
+                    user_id=graph.user_ids[node],
+                    # What this member teaches the next one round the cycle.
+                    teaches_id=graph.edge_skill(node, cycle[(position + 1) % len(cycle)]),
+                )
+                for trade_cycle, cycle in zip(stored, batch)
+                for position, node in enumerate(cycle)
+            ])
+    return len(cycles)
@@ -0,0 +1,51 @@
+import random
+import resource
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from trade.cycles import build_graph, find_cycles
+
+
+class Command(BaseCommand):
+    help = 'Benchmark trade cycle detection on synthetic graphs of growing size (nothing is written to the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            default='1000,10000,50000,100000',
+            help='Comma-separated graph sizes (number of users) to run'
+        )
+        parser.add_argument('--skills-per-user', type=int, default=10, help='User-skill rows per user')
+        parser.add_argument('--skills', type=int, default=5_000, help='Number of distinct skills')
+        parser.add_argument('--max-degree', type=int, default=32)
+        parser.add_argument('--max-per-user', type=int, default=5)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        skills = options['skills']
+        # Skill popularity is skewed: a few skills are listed by many users, most by few.
+        popularity = [1 / (rank + 1) for rank in range(skills)]
+
+        for users in (int(size) for size in options['users'].split(',')):
+            rng = random.Random(options['seed'])
+            offers, desires = defaultdict(set), defaultdict(set)
+            skill_ids = rng.choices(range(1, skills + 1), weights=popularity, k=users * options['skills_per_user'])
+            for row, skill_id in enumerate(skill_ids):
+                user_id = row % users + 1
+                (offers if rng.random() < 0.5 else desires)[user_id].add(skill_id)
+
+            started = time.perf_counter()
+            graph = build_graph(offers, desires, max_degree=options['max_degree'])
+            built = time.perf_counter()
+            cycles = find_cycles(graph, max_per_start=options['max_per_user'], workers=options['workers'])
+            searched = time.perf_counter()
+
+            self.stdout.write(
+                f'{users:>9,} users: {graph.edge_count:>10,} edges, build {built - started:6.2f}s, '
+                f'search {searched - built:6.2f}s ({graph.node_count / (searched - built):,.0f} users/s), '
+                f'{len(cycles):,} cycles ({sum(len(c) == 3 for c in cycles):,} 3-way), '
+                f'max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
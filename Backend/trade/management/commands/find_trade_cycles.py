@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from trade.cycles import find_cycles, load_graph, save_cycles
+
+
+class Command(BaseCommand):
+    help = 'Find 3- and 4-way skill swaps among current skills and listings and store them as suggestions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-length', type=int, choices=[3, 4], default=4, help='Longest cycle to look for')
+        parser.add_argument(
+            '--max-degree',
+            type=int,
+            default=32,
+            help='Most people each user is linked to as a teacher; bounds memory and search time'
+        )
+        parser.add_argument('--max-per-user', type=int, default=5, help='Most cycles started from any one user')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes for the search')
+        parser.add_argument(
+            '--time-limit',
+            type=float,
+            default=None,
+            help='Seconds after which no new users are searched from (cycles found so far are kept)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        graph = load_graph(max_degree=options['max_degree'])
+        self.stdout.write(f'  graph: {graph.node_count} users, {graph.edge_count} edges')
+
+        cycles = find_cycles(
+            graph,
+            max_length=options['max_length'],
+            max_per_start=options['max_per_user'],
+            workers=options['workers'],
+            time_limit=options['time_limit'],
+        )
+        saved = save_cycles(graph, cycles)
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully stored {saved} trade cycles in {time.perf_counter() - started:.1f}s'
+        ))
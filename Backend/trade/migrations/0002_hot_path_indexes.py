@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_hot_path_indexes'),
+        ('skills', '0001_initial'),
+        ('trade', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user1', '-start_date'], name='trade_user1_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['user2', '-start_date'], name='trade_user2_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tradeproposal',
+            index=models.Index(fields=['recipient', 'status', '-proposal_date'], name='proposal_recipient_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tradeproposal',
+            index=models.Index(fields=['proposer', 'status', '-proposal_date'], name='proposal_proposer_status_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trade', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tradeproposal',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='trade.tradeproposal'),
+        ),
+        migrations.AddField(
+            model_name='tradeproposal',
+            name='root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='trade.tradeproposal'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0001_initial'),
+        ('trade', '0003_counter_chains'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeCycle',
+            fields=[
+                ('cycle_id', models.AutoField(primary_key=True, serialize=False)),
+                ('length', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TradeCycleMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='trade.tradecycle')),
+                ('teaches', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.skill')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trade_cycle_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['cycle', 'position'],
+                'indexes': [models.Index(fields=['user', 'cycle'], name='trade_cycle_member_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cycle', 'position'), name='trade_cycle_member_position_uniq')],
+            },
+        ),
+    ]
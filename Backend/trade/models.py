@@ -1,10 +1,24 @@
 from django.db import models
+from django.db.models import Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from accounts.models import User
 from skills.models import Skill
 from listings.models import SkillListing
 
 
+class TradeProposalManager(models.Manager):
+    def thread(self, proposal_id):
+        """
+        Every proposal in the negotiation `proposal_id` belongs to, oldest first.
+        The stored root makes this a single query whatever the chain's depth.
+        """
+        root = self.filter(proposal_id=proposal_id).values(thread=Coalesce("root_id", "proposal_id"))
+        return self.filter(
+            Q(proposal_id=Subquery(root)) | Q(root_id=Subquery(root))
+        ).order_by("proposal_date", "proposal_id")
+
+
 class TradeProposal(models.Model):
     PROPOSAL_STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -24,6 +38,27 @@ class TradeProposal(models.Model):
     proposal_date = models.DateTimeField(default=timezone.now)
     status = models.CharField(max_length=20, choices=PROPOSAL_STATUS_CHOICES, default="pending")
     last_status_update = models.DateTimeField(auto_now=True)
+    # Counter-offers: the proposal this one answers, and the first proposal of the
+    # negotiation (null on that first proposal itself), so a thread is one lookup.
+    parent = models.ForeignKey(
+        "self", on_delete=models.CASCADE, null=True, blank=True, related_name="counters"
+    )
+    root = models.ForeignKey(
+        "self", on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+
+    objects = TradeProposalManager()
+
+    class Meta:
+        indexes = [
+            # Proposals received / made by a user, by status, newest first.
+            models.Index(fields=["recipient", "status", "-proposal_date"], name="proposal_recipient_status_idx"),
+            models.Index(fields=["proposer", "status", "-proposal_date"], name="proposal_proposer_status_idx"),
+        ]
+
+    @property
+    def thread_id(self):
+        return self.root_id or self.proposal_id
 
     def __str__(self):
         return f"Proposal {self.proposal_id} by {self.proposer} to {self.recipient}"
@@ -53,5 +88,47 @@ class Trade(models.Model):
     status = models.CharField(max_length=20, choices=TRADE_STATUS_CHOICES, default="active")
     terms_agreed = models.TextField()
 
+    class Meta:
+        indexes = [
+            # A user's trades, newest first, from either side of the trade.
+            models.Index(fields=["user1", "-start_date"], name="trade_user1_start_idx"),
+            models.Index(fields=["user2", "-start_date"], name="trade_user2_start_idx"),
+        ]
+
     def __str__(self):
         return f"Trade {self.trade_id}: {self.user1} ↔ {self.user2}"
+
+
+class TradeCycle(models.Model):
+    """
+    A suggested multi-party swap found by `find_trade_cycles`: each member
+    teaches the next one round the cycle and learns from the previous one.
+    The whole set is replaced on every run.
+    """
+    cycle_id = models.AutoField(primary_key=True)
+    length = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Trade cycle {self.cycle_id} ({self.length} members)"
+
+
+class TradeCycleMember(models.Model):
+    cycle = models.ForeignKey(TradeCycle, on_delete=models.CASCADE, related_name="members")
+    position = models.PositiveSmallIntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="trade_cycle_memberships")
+    # What this member teaches the member at the next position (wrapping round to the first).
+    teaches = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        ordering = ["cycle", "position"]
+        constraints = [
+            models.UniqueConstraint(fields=["cycle", "position"], name="trade_cycle_member_position_uniq"),
+        ]
+        indexes = [
+            # The cycles a user takes part in.
+            models.Index(fields=["user", "cycle"], name="trade_cycle_member_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in cycle {self.cycle_id} at {self.position}"
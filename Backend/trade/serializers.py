@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import Trade, TradeProposal
+from .models import Trade, TradeCycle, TradeCycleMember, TradeProposal
 from accounts.serializers import PublicUserSerializer
+from skills.models import Skill
 from skills.serializers import SkillSerializer
 
 
@@ -10,11 +11,13 @@ class TradeProposalSerializer(serializers.ModelSerializer):
     recipient_details = PublicUserSerializer(source='recipient', read_only=True)
     skill_offered_details = SkillSerializer(source='skill_offered_by_proposer', read_only=True)
     skill_desired_details = SkillSerializer(source='skill_desired_by_proposer', read_only=True)
+    thread_id = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = TradeProposal
         fields = "__all__"
-        read_only_fields = ["proposal_id", "proposal_date", "last_status_update"]
+        # Status and the counter-offer chain only change through the workflow actions (accept, counter, ...).
+        read_only_fields = ["proposal_id", "proposal_date", "status", "last_status_update", "parent", "root"]
 
 
 class TradeSerializer(serializers.ModelSerializer):
@@ -27,4 +30,28 @@ class TradeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Trade
         fields = "__all__"
-        read_only_fields = ["trade_id", "start_date"]
+        read_only_fields = ["trade_id", "start_date", "status", "actual_completion_date"]
+
+
+class CounterProposalSerializer(serializers.Serializer):
+    """Input for a counter-offer; skills are from the counter's proposer's point of view."""
+    message = serializers.CharField(required=False, allow_blank=True, default="")
+    skill_offered_by_proposer = serializers.PrimaryKeyRelatedField(queryset=Skill.objects.all(), required=False)
+    skill_desired_by_proposer = serializers.PrimaryKeyRelatedField(queryset=Skill.objects.all(), required=False)
+
+
+class TradeCycleMemberSerializer(serializers.ModelSerializer):
+    user_details = PublicUserSerializer(source='user', read_only=True)
+    teaches_details = SkillSerializer(source='teaches', read_only=True)
+
+    class Meta:
+        model = TradeCycleMember
+        fields = ["position", "user", "user_details", "teaches", "teaches_details"]
+
+
+class TradeCycleSerializer(serializers.ModelSerializer):
+    members = TradeCycleMemberSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = TradeCycle
+        fields = ["cycle_id", "length", "created_at", "members"]
@@ -1,3 +1,360 @@
-from django.test import TestCase
+import threading
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from listings.models import SkillListing
+from notification.models import Notification
+from skills.models import Skill
+from swapo.testing import QueryPlanMixin
+from userblocks.models import UserBlock
+from userSkills.models import UserSkill
+from . import workflow
+from .cycles import build_graph, find_cycles, load_graph
+from .models import Trade, TradeCycle, TradeProposal
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TradeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.me = User.objects.create_user(email="me@example.com")
+        cls.guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+        cls.python = Skill.objects.create(skill_name="Python", category="Programming")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def make_proposal(self, proposer, recipient, **kwargs):
+        listing = SkillListing.objects.create(
+            user=recipient, skill_offered=self.python, skill_desired=self.guitar, title="t", description="d"
+        )
+        return TradeProposal.objects.create(
+            listing=listing, proposer=proposer, recipient=recipient,
+            skill_offered_by_proposer=self.guitar, skill_desired_by_proposer=self.python, message="hi", **kwargs
+        )
+
+    def make_trades(self, count, **kwargs):
+        trades = []
+        for _ in range(count):
+            partner = User.objects.create_user(email=f"partner{User.objects.count()}@example.com")
+            proposal = self.make_proposal(partner, self.me, status="accepted")
+            trades.append(Trade.objects.create(
+                proposal=proposal, user1=partner, user2=self.me,
+                skill1=self.guitar, skill2=self.python, terms_agreed="hi", **kwargs
+            ))
+        return trades
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(ctx.captured_queries)
+
+    def test_trade_list_query_count_is_flat(self):
+        self.make_trades(2)
+        _, small = self.get("/api/v1/trades/", page_size=100)
+        self.make_trades(20)
+        body, large = self.get("/api/v1/trades/", page_size=100)
+        self.assertEqual(len(body["results"]), 22)
+        self.assertEqual(large, small)
+
+    def test_proposal_list_query_count_is_flat(self):
+        stranger = User.objects.create_user(email="stranger@example.com")
+        self.make_proposal(stranger, self.me)
+        _, small = self.get("/api/v1/trades/proposals/", page_size=100)
+        for _ in range(20):
+            self.make_proposal(stranger, self.me)
+        body, large = self.get("/api/v1/trades/proposals/", page_size=100)
+        self.assertEqual(len(body["results"]), 21)
+        self.assertEqual(large, small)
+
+    def test_proposals_are_scoped_and_filtered_by_role_and_status(self):
+        other = User.objects.create_user(email="other@example.com")
+        received = self.make_proposal(other, self.me)
+        self.make_proposal(other, self.me, status="rejected")
+        sent = self.make_proposal(self.me, other)
+        self.make_proposal(other, User.objects.create_user(email="third@example.com"))
+
+        def ids(**params):
+            return [p["proposal_id"] for p in self.get("/api/v1/trades/proposals/", **params)[0]["results"]]
+
+        self.assertEqual(len(ids()), 3)
+        self.assertEqual(ids(role="received", status="pending"), [received.proposal_id])
+        self.assertEqual(ids(role="sent"), [sent.proposal_id])
+
+    def test_trades_filter_by_status(self):
+        active = self.make_trades(2)
+        self.make_trades(1, status="completed")
+        body, _ = self.get("/api/v1/trades/", status="active,in_progress")
+        self.assertEqual([t["trade_id"] for t in body["results"]], [t.trade_id for t in reversed(active)])
+
+    def test_unknown_filters_are_rejected(self):
+        self.assertEqual(self.client.get("/api/v1/trades/", {"status": "bogus"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/trades/proposals/", {"role": "bogus"}).status_code, 400)
+
+    def test_cursor_walks_every_trade_once(self):
+        trades = self.make_trades(5)
+        seen, url = [], "/api/v1/trades/?page_size=2"
+        while url:
+            body = self.client.get(url).json()
+            seen += [t["trade_id"] for t in body["results"]]
+            url = body["next"]
+        self.assertEqual(seen, [t.trade_id for t in reversed(trades)])
+
+
+class WorkflowTestData:
+    def setUp(self):
+        self.alice = User.objects.create_user(email="alice@example.com")
+        self.bob = User.objects.create_user(email="bob@example.com")
+        self.guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+        self.python = Skill.objects.create(skill_name="Python", category="Programming")
+        listing = SkillListing.objects.create(
+            user=self.bob, skill_offered=self.python, skill_desired=self.guitar, title="t", description="d"
+        )
+        self.proposal = TradeProposal.objects.create(
+            listing=listing, proposer=self.alice, recipient=self.bob,
+            skill_offered_by_proposer=self.guitar, skill_desired_by_proposer=self.python, message="hi",
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATION_DISPATCH_MODE="sync")
+class TradeWorkflowTests(WorkflowTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def post(self, user, url, data=None):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, data or {})
+
+    def notifications(self):
+        return list(Notification.objects.order_by("notification_id").values_list("user_id", "type"))
+
+    def test_accept_creates_one_trade_and_one_notification(self):
+        url = f"/api/v1/trades/proposals/{self.proposal.pk}/accept/"
+        self.assertEqual(self.post(self.alice, url).status_code, 403)
+        self.assertEqual(self.post(self.bob, url).status_code, 200)
+        self.assertEqual(self.post(self.bob, url).status_code, 400)
+
+        trade = Trade.objects.get()
+        self.assertEqual((trade.proposal, trade.status), (self.proposal, "active"))
+        self.assertEqual(self.notifications(), [(self.alice.pk, "trade_accepted")])
+
+    def test_trade_lifecycle(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            _, trade = workflow.accept_proposal(self.proposal.pk, self.bob)
+        base = f"/api/v1/trades/{trade.pk}"
+
+        self.assertEqual(self.post(self.alice, f"{base}/start/").status_code, 200)
+        self.assertEqual(self.post(self.alice, f"{base}/start/").status_code, 400)
+        self.assertEqual(self.post(self.bob, f"{base}/completed/").status_code, 200)
+        self.assertEqual(self.post(self.bob, f"{base}/cancel/").status_code, 400)
+
+        trade.refresh_from_db()
+        self.assertEqual(trade.status, "completed")
+        self.assertIsNotNone(trade.actual_completion_date)
+        self.assertEqual(
+            sorted(self.notifications()[1:]),
+            sorted([(self.alice.pk, "trade_active"), (self.bob.pk, "trade_active"),
+                    (self.alice.pk, "trade_completed"), (self.bob.pk, "trade_completed")]),
+        )
+
+    def test_withdraw_and_counter_only_from_pending(self):
+        response = self.post(self.bob, f"/api/v1/trades/proposals/{self.proposal.pk}/counter/", {"message": "how about"})
+        self.assertEqual(response.status_code, 201)
+        counter = TradeProposal.objects.get(pk=response.json()["counter"]["proposal_id"])
+        self.assertEqual((counter.proposer, counter.skill_offered_by_proposer), (self.bob, self.python))
+
+        self.assertEqual(self.post(self.alice, f"/api/v1/trades/proposals/{self.proposal.pk}/withdraw/").status_code, 400)
+        self.assertEqual(self.post(self.bob, f"/api/v1/trades/proposals/{counter.pk}/withdraw/").status_code, 200)
+        # One notification per transition: the counter-offer, then its withdrawal, both to alice.
+        self.assertEqual(self.notifications(), [(self.alice.pk, "trade_proposal")] * 2)
+
+    def test_status_cannot_be_patched_directly(self):
+        self.client.force_authenticate(self.bob)
+        self.client.patch(f"/api/v1/trades/proposals/{self.proposal.pk}/", {"status": "accepted"})
+        self.proposal.refresh_from_db()
+        self.assertEqual(self.proposal.status, "pending")
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CounterOfferThreadTests(WorkflowTestData, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        # alice proposes, bob counters, alice counters back.
+        _, self.first_counter = workflow.counter_proposal(self.proposal.pk, self.bob, "what about")
+        _, self.latest = workflow.counter_proposal(self.first_counter.pk, self.alice, "or this")
+
+    def test_counters_link_to_parent_and_root(self):
+        self.assertEqual((self.first_counter.parent, self.first_counter.root), (self.proposal, self.proposal))
+        self.assertEqual((self.latest.parent, self.latest.root), (self.first_counter, self.proposal))
+        self.assertEqual({p.thread_id for p in (self.proposal, self.first_counter, self.latest)}, {self.proposal.pk})
+
+    def test_thread_is_one_query_from_any_member(self):
+        with self.assertNumQueries(1):
+            thread = list(TradeProposal.objects.thread(self.first_counter.pk))
+        self.assertEqual(thread, [self.proposal, self.first_counter, self.latest])
+
+        self.client.force_authenticate(self.bob)
+        body = self.client.get(f"/api/v1/trades/proposals/{self.latest.pk}/thread/").json()
+        self.assertEqual(
+            [p["proposal_id"] for p in body["results"]],
+            [self.proposal.pk, self.first_counter.pk, self.latest.pk],
+        )
+
+    def test_thread_is_hidden_from_outsiders(self):
+        self.client.force_authenticate(User.objects.create_user(email="carol@example.com"))
+        response = self.client.get(f"/api/v1/trades/proposals/{self.proposal.pk}/thread/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_shows_only_the_latest_offer_per_thread(self):
+        self.client.force_authenticate(self.bob)
+        body = self.client.get("/api/v1/trades/proposals/").json()
+        self.assertEqual([p["proposal_id"] for p in body["results"]], [self.latest.pk])
+
+        countered = self.client.get("/api/v1/trades/proposals/", {"status": "countered"}).json()
+        self.assertEqual(len(countered["results"]), 2)
+
+
+class TradeAcceptConcurrencyTests(WorkflowTestData, TransactionTestCase):
+    def test_concurrent_accepts_create_a_single_trade(self):
+        outcomes = []
+        barrier = threading.Barrier(8)
+
+        def accept():
+            try:
+                barrier.wait()
+                workflow.accept_proposal(self.proposal.pk, self.bob)
+                outcomes.append("accepted")
+            except (workflow.TransitionError, OperationalError):
+                # OperationalError: SQLite reports a lock conflict instead of waiting on the row lock.
+                outcomes.append("refused")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count("accepted"), 1)
+        self.assertEqual(len(outcomes), 8)
+        self.assertEqual(Trade.objects.count(), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TradeCycleTests(TestCase):
+    """
+    a -> b -> c -> a and a -> b -> d -> e -> a, where "x -> y" means x
+    teaches y something y wants; a <-> f is a plain two-way match.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c, cls.d, cls.e, cls.f = (
+            User.objects.create_user(email=f"{name}@example.com") for name in "abcdef"
+        )
+        cls.s1, cls.s2, cls.s3, cls.s4 = (
+            Skill.objects.create(skill_name=f"Skill {n}", category="Test") for n in range(1, 5)
+        )
+        for user, skill, skill_type in [
+            (cls.a, cls.s1, "offering"), (cls.a, cls.s3, "desiring"),
+            (cls.b, cls.s2, "offering"), (cls.b, cls.s1, "desiring"),
+            (cls.c, cls.s3, "offering"), (cls.c, cls.s2, "desiring"),
+            (cls.d, cls.s4, "offering"), (cls.d, cls.s2, "desiring"),
+            (cls.f, cls.s3, "offering"), (cls.f, cls.s1, "desiring"),
+        ]:
+            UserSkill.objects.create(user=user, skill=skill, skill_type=skill_type)
+        # e only takes part through an active listing.
+        SkillListing.objects.create(
+            user=cls.e, skill_offered=cls.s3, skill_desired=cls.s4, title="t", description="d"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def user_cycles(self, graph, cycles):
+        return sorted(tuple(graph.user_ids[node] for node in cycle) for cycle in cycles)
+
+    def test_finds_each_three_and_four_way_cycle_once(self):
+        graph = load_graph()
+        cycles = find_cycles(graph)
+        self.assertEqual(self.user_cycles(graph, cycles), [
+            (self.a.pk, self.b.pk, self.c.pk),
+            (self.a.pk, self.b.pk, self.d.pk, self.e.pk),
+        ])
+        self.assertEqual(self.user_cycles(graph, find_cycles(graph, max_length=3)), [
+            (self.a.pk, self.b.pk, self.c.pk),
+        ])
+
+    def test_inactive_listings_are_ignored(self):
+        SkillListing.objects.filter(user=self.e).update(status="inactive")
+        graph = load_graph()
+        self.assertEqual(len(find_cycles(graph)), 1)
+
+    def test_degree_cap_and_workers(self):
+        offers = {user: {user % 7, user % 11} for user in range(1, 301)}
+        desires = {user: {user % 5, user % 13} for user in range(1, 301)}
+        capped = build_graph(offers, desires, max_degree=3)
+        self.assertTrue(all(len(capped.out(node)) <= 3 for node in range(capped.node_count)))
+
+        graph = build_graph(offers, desires)
+        serial = find_cycles(graph, workers=1, chunk_size=50)
+        self.assertTrue(serial)
+        self.assertEqual(sorted(find_cycles(graph, workers=2, chunk_size=50)), sorted(serial))
+
+    def test_command_replaces_stored_cycles(self):
+        call_command("find_trade_cycles", stdout=StringIO())
+        call_command("find_trade_cycles", stdout=StringIO())
+        self.assertEqual(TradeCycle.objects.count(), 2)
+        three_way = TradeCycle.objects.get(length=3)
+        self.assertEqual(
+            list(three_way.members.values_list("user_id", "teaches_id")),
+            [(self.a.pk, self.s1.pk), (self.b.pk, self.s2.pk), (self.c.pk, self.s3.pk)],
+        )
+
+    def test_endpoint_lists_the_users_cycles_shortest_first(self):
+        call_command("find_trade_cycles", stdout=StringIO())
+        self.client.force_authenticate(self.a)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/v1/trades/cycles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([cycle["length"] for cycle in response.json()["results"]], [3, 4])
+        members = response.json()["results"][0]["members"]
+        self.assertEqual([member["user"] for member in members], [self.a.pk, self.b.pk, self.c.pk])
+        self.assertEqual(members[2]["teaches_details"]["skill_name"], "Skill 3")
+        # Blocks, cycles, members with their users and skills.
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+        self.client.force_authenticate(self.c)
+        self.assertEqual(len(self.client.get("/api/v1/trades/cycles/").json()["results"]), 1)
+        self.client.force_authenticate(self.f)
+        self.assertEqual(self.client.get("/api/v1/trades/cycles/").json()["results"], [])
+
+    def test_endpoint_leaves_out_cycles_with_blocked_users(self):
+        call_command("find_trade_cycles", stdout=StringIO())
+        UserBlock.objects.create(blocker=self.d, blocked=self.a)
+        self.client.force_authenticate(self.a)
+        self.assertEqual([cycle["length"] for cycle in self.client.get("/api/v1/trades/cycles/").json()["results"]], [3])
+
+
+class TradeIndexTests(QueryPlanMixin, TestCase):
+    def test_user_trades_use_per_side_indexes(self):
+        trades = Trade.objects.filter(Q(user1_id=1) | Q(user2_id=1)).order_by("-start_date")
+        self.assertUsesIndex(trades, "trade_user1_start_idx")
+        self.assertUsesIndex(trades, "trade_user2_start_idx")
+
+    def test_received_proposals_use_recipient_status_index(self):
+        received = TradeProposal.objects.filter(recipient_id=1, status="pending").order_by("-proposal_date")
+        self.assertUsesIndex(received, "proposal_recipient_status_idx")
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TradeViewSet, TradeProposalViewSet
+from .views import TradeViewSet, TradeProposalViewSet, TradeCycleListView
 
 router = DefaultRouter()
 router.register(r'proposals', TradeProposalViewSet, basename='tradeproposal')
 router.register(r'', TradeViewSet, basename='trade')
 
 urlpatterns = [
+    # Before the router, whose trade detail route would otherwise take "cycles".
+    path('cycles/', TradeCycleListView.as_view(), name='trade-cycles'),
     path('', include(router.urls)),
 ]
@@ -1,102 +1,253 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import generics, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from django.utils import timezone
+from django.db.models import Prefetch, Q
 
-from .models import Trade, TradeProposal
-from .serializers import TradeSerializer, TradeProposalSerializer
+from . import workflow
+from .models import Trade, TradeCycle, TradeCycleMember, TradeProposal
+from .serializers import TradeSerializer, TradeProposalSerializer, CounterProposalSerializer, TradeCycleSerializer
+from swapo.pagination import KeysetCursorPagination
+from userblocks.models import UserBlock
+
+
+class TradeProposalPagination(KeysetCursorPagination):
+    ordering = ("-proposal_date", "-proposal_id")
+    page_size = 20
+    max_page_size = 100
+
+
+class TradePagination(KeysetCursorPagination):
+    ordering = ("-start_date", "-trade_id")
+    page_size = 20
+    max_page_size = 100
+
+
+class TradeCyclePagination(KeysetCursorPagination):
+    # Shorter cycles first: fewer people to coordinate.
+    ordering = ("length", "cycle_id")
+    page_size = 20
+    max_page_size = 100
+
+
+def status_filter(request, choices):
+    """
+    Parse `?status=a,b` into a list of statuses, or None when absent.
+    Unknown values are a 400 rather than an empty page.
+    """
+    raw = request.query_params.get("status")
+    if not raw:
+        return None
+    statuses = [value.strip() for value in raw.split(",") if value.strip()]
+    unknown = set(statuses) - {value for value, _ in choices}
+    if unknown:
+        raise ValidationError({"status": f"Unknown status: {', '.join(sorted(unknown))}"})
+    return statuses
+
+
+def transition_failed(error):
+    code = status.HTTP_403_FORBIDDEN if isinstance(error, workflow.NotParticipant) else status.HTTP_400_BAD_REQUEST
+    return Response({"detail": str(error)}, status=code)
 
 
 class TradeProposalViewSet(viewsets.ModelViewSet):
-    queryset = TradeProposal.objects.all().order_by("-proposal_date")
     serializer_class = TradeProposalSerializer
-    # permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TradeProposalPagination
+
+    def get_queryset(self):
+        """
+        Proposals the user made or received.
+        ?role=received|sent narrows to one side, ?status=pending,countered filters by status,
+        e.g. ?role=received&status=pending for the proposals awaiting an answer.
+        Without ?status the list leaves out countered proposals.
+        """
+        user = self.request.user
+        role = self.request.query_params.get("role")
+        if role == "received":
+            proposals = TradeProposal.objects.filter(recipient=user)
+        elif role == "sent":
+            proposals = TradeProposal.objects.filter(proposer=user)
+        elif role:
+            raise ValidationError({"role": "Expected 'received' or 'sent'"})
+        else:
+            proposals = TradeProposal.objects.filter(Q(proposer=user) | Q(recipient=user))
+
+        statuses = status_filter(self.request, TradeProposal.PROPOSAL_STATUS_CHOICES)
+        if statuses:
+            proposals = proposals.filter(status__in=statuses)
+        elif self.action == "list":
+            # A countered proposal has been superseded; only the latest offer of each thread is listed.
+            proposals = proposals.exclude(status="countered")
+
+        return proposals.select_related(
+            "proposer", "recipient", "skill_offered_by_proposer", "skill_desired_by_proposer"
+        ).order_by("-proposal_date", "-proposal_id")
+
+    @action(detail=True, methods=['get'])
+    def thread(self, request, pk=None):
+        """The whole negotiation the proposal belongs to, oldest offer first, in one query"""
+        try:
+            proposal_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        user = request.user
+        proposals = list(
+            TradeProposal.objects.thread(proposal_id)
+            .filter(Q(proposer=user) | Q(recipient=user))
+            .select_related("proposer", "recipient", "skill_offered_by_proposer", "skill_desired_by_proposer")
+        )
+        if not proposals:
+            raise NotFound()
+        return Response({"results": TradeProposalSerializer(proposals, many=True).data})
 
     @action(detail=True, methods=['post'])
     def accept(self, request, pk=None):
         """Accept a trade proposal and create a Trade object"""
         proposal = self.get_object()
-        
-        # Check if proposal is already accepted or has a trade
-        if proposal.status == 'accepted':
-            return Response(
-                {"detail": "Proposal already accepted"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update proposal status to accepted
-        proposal.status = 'accepted'
-        proposal.save()
-        
-        # Create Trade from accepted proposal
-        trade = Trade.objects.create(
-            proposal=proposal,
-            user1=proposal.proposer,
-            user2=proposal.recipient,
-            skill1=proposal.skill_offered_by_proposer,
-            skill2=proposal.skill_desired_by_proposer,
-            terms_agreed=proposal.message or "No agreement terms available",
-            status='active'
-        )
-        
+        try:
+            proposal, trade = workflow.accept_proposal(proposal.proposal_id, request.user)
+        except workflow.TransitionError as error:
+            return transition_failed(error)
+
         return Response({
             "detail": "Proposal accepted and trade created",
             "proposal": TradeProposalSerializer(proposal).data,
             "trade": TradeSerializer(trade).data
         }, status=status.HTTP_200_OK)
-    
+
     @action(detail=True, methods=['post'])
     def reject(self, request, pk=None):
         """Reject a trade proposal"""
         proposal = self.get_object()
-        
-        # Check if proposal is already rejected
-        if proposal.status == 'rejected':
-            return Response(
-                {"detail": "Proposal already rejected"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update proposal status to rejected
-        proposal.status = 'rejected'
-        proposal.save()
-        
+        try:
+            proposal = workflow.reject_proposal(proposal.proposal_id, request.user)
+        except workflow.TransitionError as error:
+            return transition_failed(error)
+
         return Response({
             "detail": "Proposal rejected",
             "proposal": TradeProposalSerializer(proposal).data
         }, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['post'])
+    def withdraw(self, request, pk=None):
+        """Withdraw a trade proposal the user made"""
+        proposal = self.get_object()
+        try:
+            proposal = workflow.withdraw_proposal(proposal.proposal_id, request.user)
+        except workflow.TransitionError as error:
+            return transition_failed(error)
+
+        return Response({
+            "detail": "Proposal withdrawn",
+            "proposal": TradeProposalSerializer(proposal).data
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def counter(self, request, pk=None):
+        """
+        Answer a proposal with a counter-offer.
+        Body: CounterProposalSerializer; skills default to the original ones, swapped.
+        """
+        proposal = self.get_object()
+        serializer = CounterProposalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        offered = serializer.validated_data.get("skill_offered_by_proposer")
+        desired = serializer.validated_data.get("skill_desired_by_proposer")
+        try:
+            proposal, counter = workflow.counter_proposal(
+                proposal.proposal_id,
+                request.user,
+                message=serializer.validated_data["message"],
+                skill_offered_id=offered and offered.skill_id,
+                skill_desired_id=desired and desired.skill_id,
+            )
+        except workflow.TransitionError as error:
+            return transition_failed(error)
+
+        return Response({
+            "detail": "Counter-proposal sent",
+            "proposal": TradeProposalSerializer(proposal).data,
+            "counter": TradeProposalSerializer(counter).data
+        }, status=status.HTTP_201_CREATED)
+
 
 class TradeViewSet(viewsets.ModelViewSet):
     serializer_class = TradeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TradePagination
 
     def get_queryset(self):
-        """Filter trades to show only those the user is involved in"""
+        """
+        Filter trades to show only those the user is involved in.
+        ?status=active,in_progress filters by status, e.g. for the user's active trades.
+        """
         user = self.request.user
-        from django.db.models import Q
-        return Trade.objects.filter(
-            Q(user1=user) | Q(user2=user)
-        ).order_by("-start_date")
+        trades = Trade.objects.filter(Q(user1=user) | Q(user2=user))
 
-    @action(detail=True, methods=['post'])
-    def completed(self, request, pk=None):
-        """Mark a proposal as completed"""
+        statuses = status_filter(self.request, Trade.TRADE_STATUS_CHOICES)
+        if statuses:
+            trades = trades.filter(status__in=statuses)
+
+        # TradeSerializer nests both users, both skills and the whole proposal.
+        return trades.select_related(
+            "user1", "user2", "skill1", "skill2",
+            "proposal__proposer", "proposal__recipient",
+            "proposal__skill_offered_by_proposer", "proposal__skill_desired_by_proposer",
+        ).order_by("-start_date", "-trade_id")
+
+    def trade_action(self, transition, detail):
         trade = self.get_object()
-        
-        # Check if proposal is already accepted or has a trade
-        if trade.status == 'completed':
-            return Response(
-                {"detail": "Trade is already completed"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update status to completed
-        trade.status = 'completed'
-        trade.actual_completion_date = timezone.now()
-        trade.save()
-        
+        try:
+            trade = transition(trade.trade_id, self.request.user)
+        except workflow.TransitionError as error:
+            return transition_failed(error)
+
         return Response({
-            "detail": "Trade marked as completed",
+            "detail": detail,
             "trade": TradeSerializer(trade).data
         }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def start(self, request, pk=None):
+        """Mark an active trade as in progress"""
+        return self.trade_action(workflow.start_trade, "Trade started")
+
+    @action(detail=True, methods=['post'])
+    def completed(self, request, pk=None):
+        """Mark a trade as completed"""
+        return self.trade_action(workflow.complete_trade, "Trade marked as completed")
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a trade that has not been completed"""
+        return self.trade_action(workflow.cancel_trade, "Trade cancelled")
+
+
+class TradeCycleListView(generics.ListAPIView):
+    """
+    GET /trades/cycles/
+    Suggested 3- and 4-way swaps the current user is part of, as found by the
+    last `find_trade_cycles` run. Cycles with a blocked user (either way) are left out.
+    """
+    serializer_class = TradeCycleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TradeCyclePagination
+
+    def get_queryset(self):
+        user = self.request.user
+        blocked = set()
+        for blocker_id, blocked_id in UserBlock.objects.filter(
+            Q(blocker=user) | Q(blocked=user)
+        ).values_list("blocker_id", "blocked_id"):
+            blocked.update((blocker_id, blocked_id))
+        blocked.discard(user.user_id)
+
+        cycles = TradeCycle.objects.filter(members__user=user)
+        if blocked:
+            cycles = cycles.exclude(members__user__in=blocked)
+        # One more query for every member of the page, with their users and skills.
+        return cycles.prefetch_related(
+            Prefetch("members", queryset=TradeCycleMember.objects.select_related("user", "teaches"))
+        )
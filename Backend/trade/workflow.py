@@ -0,0 +1,140 @@
+"""
+Trade workflow: every status change of a proposal or trade goes through here.
+
+Each transition runs in one transaction that locks the row with
+select_for_update, checks who is acting, and writes the new status with a
+conditional UPDATE (`WHERE status IN (<allowed>)`), so two concurrent
+requests cannot both move the same row. Conditional updates fire no
+post_save, so each transition dispatches exactly one notification event
+itself, once the transaction commits.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from notification.signals import dispatch_on_commit
+from .models import Trade, TradeProposal
+
+
+class TransitionError(Exception):
+    """The row is not in a state the transition can start from."""
+
+
+class NotParticipant(TransitionError):
+    """The acting user may not perform this transition."""
+
+
+def lock_proposal(proposal_id):
+    return TradeProposal.objects.select_for_update().get(proposal_id=proposal_id)
+
+
+def lock_trade(trade_id):
+    return Trade.objects.select_for_update().get(trade_id=trade_id)
+
+
+def set_proposal_status(proposal, allowed, new_status):
+    updated = TradeProposal.objects.filter(
+        proposal_id=proposal.proposal_id, status__in=allowed
+    ).update(status=new_status, last_status_update=timezone.now())
+    if not updated:
+        raise TransitionError(f"Proposal is already {proposal.status}")
+    proposal.status = new_status
+
+
+def set_trade_status(trade, allowed, new_status, **changes):
+    updated = Trade.objects.filter(
+        trade_id=trade.trade_id, status__in=allowed
+    ).update(status=new_status, **changes)
+    if not updated:
+        raise TransitionError(f"Trade is already {trade.status}")
+    trade.status = new_status
+    for name, value in changes.items():
+        setattr(trade, name, value)
+
+
+@transaction.atomic
+def accept_proposal(proposal_id, user):
+    """The recipient accepts a pending proposal; creates the Trade."""
+    proposal = lock_proposal(proposal_id)
+    if proposal.recipient_id != user.user_id:
+        raise NotParticipant("Only the recipient can accept a proposal")
+    set_proposal_status(proposal, ["pending"], "accepted")
+    trade = Trade.objects.create(
+        proposal=proposal,
+        user1_id=proposal.proposer_id,
+        user2_id=proposal.recipient_id,
+        skill1_id=proposal.skill_offered_by_proposer_id,
+        skill2_id=proposal.skill_desired_by_proposer_id,
+        terms_agreed=proposal.message or "No agreement terms available",
+        status="active",
+    )
+    dispatch_on_commit("proposal_accepted", proposal.proposal_id)
+    return proposal, trade
+
+
+@transaction.atomic
+def reject_proposal(proposal_id, user):
+    """The recipient declines a pending proposal."""
+    proposal = lock_proposal(proposal_id)
+    if proposal.recipient_id != user.user_id:
+        raise NotParticipant("Only the recipient can reject a proposal")
+    set_proposal_status(proposal, ["pending"], "rejected")
+    dispatch_on_commit("proposal_rejected", proposal.proposal_id)
+    return proposal
+
+
+@transaction.atomic
+def withdraw_proposal(proposal_id, user):
+    """The proposer takes back a proposal that has not been answered yet."""
+    proposal = lock_proposal(proposal_id)
+    if proposal.proposer_id != user.user_id:
+        raise NotParticipant("Only the proposer can withdraw a proposal")
+    set_proposal_status(proposal, ["pending"], "withdrawn")
+    dispatch_on_commit("proposal_withdrawn", proposal.proposal_id)
+    return proposal
+
+
+@transaction.atomic
+def counter_proposal(proposal_id, user, message, skill_offered_id=None, skill_desired_id=None):
+    """
+    The recipient answers a pending proposal with one of their own, roles swapped.
+    The new proposal's post_save is its single notification event.
+    """
+    proposal = lock_proposal(proposal_id)
+    if proposal.recipient_id != user.user_id:
+        raise NotParticipant("Only the recipient can counter a proposal")
+    set_proposal_status(proposal, ["pending"], "countered")
+    counter = TradeProposal.objects.create(
+        listing_id=proposal.listing_id,
+        proposer_id=proposal.recipient_id,
+        recipient_id=proposal.proposer_id,
+        skill_offered_by_proposer_id=skill_offered_id or proposal.skill_desired_by_proposer_id,
+        skill_desired_by_proposer_id=skill_desired_id or proposal.skill_offered_by_proposer_id,
+        message=message,
+        parent=proposal,
+        root_id=proposal.thread_id,
+    )
+    return proposal, counter
+
+
+def change_trade_status(trade_id, user, allowed, new_status, **changes):
+    with transaction.atomic():
+        trade = lock_trade(trade_id)
+        if user.user_id not in (trade.user1_id, trade.user2_id):
+            raise NotParticipant("Only the people trading can change a trade")
+        set_trade_status(trade, allowed, new_status, **changes)
+        dispatch_on_commit("trade_status", (trade.trade_id, new_status))
+    return trade
+
+
+def start_trade(trade_id, user):
+    return change_trade_status(trade_id, user, ["active"], "in_progress")
+
+
+def complete_trade(trade_id, user):
+    return change_trade_status(
+        trade_id, user, ["active", "in_progress"], "completed", actual_completion_date=timezone.now()
+    )
+
+
+def cancel_trade(trade_id, user):
+    return change_trade_status(trade_id, user, ["active", "in_progress"], "cancelled")
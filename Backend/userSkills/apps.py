@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UserskillsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'userSkills'
+
+    def ready(self):
+        import userSkills.signals
@@ -0,0 +1,56 @@
+import random
+import resource
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from userSkills.matching import MatchIndex, PROFICIENCY_WEIGHTS
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the matchmaking index on synthetic user-skill rows (nothing is written to the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of user-skill rows')
+        parser.add_argument('--users', type=int, default=100_000, help='Number of distinct users')
+        parser.add_argument('--skills', type=int, default=5_000, help='Number of distinct skills')
+        parser.add_argument('--queries', type=int, default=1_000, help='Number of match lookups to time')
+        parser.add_argument('--locations', type=int, default=200, help='Number of distinct locations')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        users, skills = options['users'], options['skills']
+        proficiencies = [*PROFICIENCY_WEIGHTS, None]
+        # Skill popularity is skewed: a few skills are listed by many users, most by few.
+        popularity = [1 / (rank + 1) for rank in range(skills)]
+        skill_ids = rng.choices(range(1, skills + 1), weights=popularity, k=options['rows'])
+
+        rows = (
+            (rng.randint(1, users), skill_id, rng.choice(('offering', 'desiring')), rng.choice(proficiencies))
+            for skill_id in skill_ids
+        )
+        locations = ((user_id, f'city {rng.randrange(options["locations"])}') for user_id in range(1, users + 1))
+
+        index = MatchIndex()
+        started = time.perf_counter()
+        index.build(rows=rows, locations=locations)
+        build_seconds = time.perf_counter() - started
+        self.stdout.write(
+            f'Built index over {options["rows"]:,} rows in {build_seconds:.2f}s '
+            f'(max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB)'
+        )
+
+        timings, found = [], 0
+        for _ in range(options['queries']):
+            user_id = rng.randint(1, users)
+            started = time.perf_counter()
+            found += len(index.matches(user_id, limit=20))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["queries"]} lookups: p50 {statistics.median(timings):.2f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, max {timings[-1]:.2f} ms, '
+            f'{found / options["queries"]:.1f} matches per user'
+        ))
@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import takewhile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from .models import UserSkill
+
+User = get_user_model()
+
+PROFICIENCY_WEIGHTS = {'Beginner': 1, 'Intermediate': 2, 'Expert': 3}
+# Proficiency is optional; an unstated level counts as a beginner.
+DEFAULT_WEIGHT = 1
+# Added once when both users list the same location.
+LOCATION_BONUS = 2
+
+
+def normalise_location(location):
+  return location.strip().casefold() if location else None
+
+
+@dataclass
+class Match:
+  user_id: int
+  score: int
+  they_offer: list  # skill ids the other user offers and we desire
+  they_want: list   # skill ids we offer and the other user desires
+  same_location: bool
+
+
+class MatchIndex:
+  """
+  In-memory inverted indexes from skill to the users offering / desiring it.
+
+  A user's matches are the users that offer one of their desired skills
+  *and* desire one of their offered skills, so a lookup only touches the
+  posting sets of the user's own skills, never the whole user base.
+
+  The index is per process. Writes made through this process are applied
+  incrementally (see userSkills.signals); the whole index is rebuilt from
+  the database once it is older than MATCHMAKING_INDEX_MAX_AGE, which is
+  how writes handled by other processes reach it.
+  """
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.rebuild_lock = threading.Lock()  # held while a request rebuilds the index
+    self.built_at = None
+    self.reset()
+
+  def reset(self):
+    self.offered_by = defaultdict(lambda: defaultdict(set))  # skill_id -> {weight: {user_id}}
+    self.desired_by = defaultdict(set)  # skill_id -> {user_id}
+    self.offers = defaultdict(dict)     # user_id -> {skill_id: proficiency weight}
+    self.desires = defaultdict(set)     # user_id -> {skill_id}
+    self.locations = {}                 # user_id -> normalised location
+    self.located = defaultdict(set)     # normalised location -> {user_id}
+
+  @property
+  def is_built(self):
+    return self.built_at is not None
+
+  @property
+  def is_stale(self):
+    return not self.is_built or time.monotonic() - self.built_at > settings.MATCHMAKING_INDEX_MAX_AGE
+
+  def ensure_fresh(self):
+    """
+    Rebuild once stale, one request at a time: while one rebuilds, the others
+    keep using the old index (before the very first build, they wait for it).
+    """
+    if not self.is_stale:
+      return
+    if not self.rebuild_lock.acquire(blocking=not self.is_built):
+      return
+    try:
+      # Another request may have finished a build while this one waited.
+      if self.is_stale:
+        self.build()
+    finally:
+      self.rebuild_lock.release()
+
+  def build(self, rows=None, locations=None):
+    """
+    (Re)build from `rows` of (user_id, skill_id, skill_type, proficiency_level)
+    and `locations` of (user_id, location), read from the database by default.
+    The new index is assembled aside and swapped in, so lookups keep being
+    served from the old one meanwhile.
+    """
+    if rows is None:
+      rows = UserSkill.objects.values_list(
+        'user_id', 'skill_id', 'skill_type', 'proficiency_level'
+      ).iterator(chunk_size=10000)
+    if locations is None:
+      locations = User.objects.exclude(location__isnull=True).exclude(location='').values_list(
+        'user_id', 'location'
+      ).iterator(chunk_size=10000)
+
+    fresh = MatchIndex()
+    for user_id, skill_id, skill_type, proficiency in rows:
+      fresh.add_skill(user_id, skill_id, skill_type, proficiency)
+    for user_id, location in locations:
+      fresh.set_location(user_id, location)
+
+    with self.lock:
+      self.offered_by, self.desired_by = fresh.offered_by, fresh.desired_by
+      self.offers, self.desires = fresh.offers, fresh.desires
+      self.locations, self.located = fresh.locations, fresh.located
+      self.built_at = time.monotonic()
+
+  def add_skill(self, user_id, skill_id, skill_type, proficiency=None):
+    if skill_type == 'offering':
+      self.remove_skill(user_id, skill_id, 'offering')
+      weight = PROFICIENCY_WEIGHTS.get(proficiency, DEFAULT_WEIGHT)
+      self.offered_by[skill_id][weight].add(user_id)
+      self.offers[user_id][skill_id] = weight
+    else:
+      self.desired_by[skill_id].add(user_id)
+      self.desires[user_id].add(skill_id)
+
+  def remove_skill(self, user_id, skill_id, skill_type):
+    if skill_type == 'offering':
+      weight = self.offers.get(user_id, {}).pop(skill_id, None)
+      if weight is not None:
+        self.offered_by[skill_id][weight].discard(user_id)
+    else:
+      self.desired_by.get(skill_id, set()).discard(user_id)
+      self.desires.get(user_id, set()).discard(skill_id)
+
+  def set_location(self, user_id, location):
+    previous = self.locations.pop(user_id, None)
+    if previous is not None:
+      self.located[previous].discard(user_id)
+    location = normalise_location(location)
+    if location:
+      self.locations[user_id] = location
+      self.located[location].add(user_id)
+
+  def skill_saved(self, user_id, skill_id, skill_type, proficiency):
+    with self.lock:
+      self.add_skill(user_id, skill_id, skill_type, proficiency)
+
+  def skill_deleted(self, user_id, skill_id, skill_type):
+    with self.lock:
+      self.remove_skill(user_id, skill_id, skill_type)
+
+  def location_changed(self, user_id, location):
+    with self.lock:
+      self.set_location(user_id, location)
+
+  def refresh_user(self, user_id):
+    """Reload one user's skills from the database, for writes that bypass signals (bulk upserts)."""
+    rows = list(UserSkill.objects.filter(user_id=user_id).values_list('skill_id', 'skill_type', 'proficiency_level'))
+    with self.lock:
+      for skill_id in list(self.offers.get(user_id, ())):
+        self.remove_skill(user_id, skill_id, 'offering')
+      for skill_id in list(self.desires.get(user_id, ())):
+        self.remove_skill(user_id, skill_id, 'desiring')
+      for skill_id, skill_type, proficiency in rows:
+        self.add_skill(user_id, skill_id, skill_type, proficiency)
+
+  def matches(self, user_id, limit=20, exclude=(), wanted_within=None):
+    """
+    The `limit` best reciprocal matches for `user_id`, best first.
+    `wanted_within`: a set of skill ids; only swaps where the user learns one of them count.
+    Score: the proficiency of every skill exchanged in either direction,
+    plus LOCATION_BONUS when both users are in the same place.
+
+    Popular skills can put most users into a posting set, so the work is
+    done with set unions/intersections and Counter.update over whole sets
+    (all C loops); Python-level work is limited to the returned matches.
+    """
+    with self.lock:
+      wanted = self.desires.get(user_id, set())
+      if wanted_within is not None:
+        wanted = wanted & wanted_within
+      offered = self.offers.get(user_id, {})
+      if not wanted or not offered:
+        return []
+
+      # Candidates offer something we want *and* want something we offer.
+      givers = set().union(*(
+        users for skill_id in wanted for users in self.offered_by.get(skill_id, {}).values()
+      ))
+      takers = set().union(*(self.desired_by.get(skill_id, ()) for skill_id in offered))
+      candidates = givers & takers
+      candidates.discard(user_id)
+      candidates.difference_update(exclude)
+      if not candidates:
+        return []
+
+      # Add each weight by counting a posting set `weight` times.
+      scores = Counter()
+      for skill_id in wanted:
+        for weight, users in self.offered_by.get(skill_id, {}).items():
+          users = users & candidates
+          for _ in range(weight):
+            scores.update(users)
+      for skill_id, weight in offered.items():
+        users = self.desired_by.get(skill_id, set()) & candidates
+        for _ in range(weight):
+          scores.update(users)
+      location = self.locations.get(user_id)
+      if location:
+        neighbours = self.located[location] & candidates
+        for _ in range(LOCATION_BONUS):
+          scores.update(neighbours)
+
+      # most_common() sorts in C; take everything tied with the last place
+      # and break those ties by user id.
+      ranked = scores.most_common()
+      cutoff = ranked[min(limit, len(ranked)) - 1][1]
+      best = sorted(
+        takewhile(lambda item: item[1] >= cutoff, ranked), key=lambda item: (-item[1], item[0])
+      )
+
+      return [
+        Match(
+          other,
+          score,
+          sorted(skill_id for skill_id in self.offers[other] if skill_id in wanted),
+          sorted(skill_id for skill_id in offered if skill_id in self.desires[other]),
+          location is not None and self.locations.get(other) == location,
+        )
+        for other, score in best[:limit]
+      ]
+
+
+match_index = MatchIndex()
@@ -1,6 +1,9 @@
+from django.db import transaction
 from rest_framework import serializers
 from userSkills.models import UserSkill
-from skills.models import Skill
+from skills.catalogue import name_key, resolve_skills
+from swapo.response_cache import response_cache
+from .matching import match_index
 
 
 class UserSkillSerializer(serializers.ModelSerializer):
@@ -19,45 +22,48 @@ class AddUserSkillSerializer(serializers.Serializer):
     """
     Create or update UserSkill instances for offerings and desires.
     Automatically creates a Skill if it doesn't exist.
+    All names are resolved at once and all the user's skills are written in a
+    single upsert, so the number of queries does not grow with the number of skills.
     """
     user = self.context['request'].user
-    created_skills = []
-
-    def add_skills(skill_list, skill_type):
-      for skill_data in skill_list:
-        skill_name = skill_data.get('skill_name')
-        
-        # Skip if no skill name provided
-        if not skill_name:
+    entries = [
+      (skill_data, skill_type)
+      for skill_type, key in (('offering', 'offerings'), ('desiring', 'desires'))
+      for skill_data in validated_data.get(key, [])
+      # Skip if no skill name provided
+      if skill_data.get('skill_name')
+    ]
+
+    with transaction.atomic():
+      skills, _ = resolve_skills([skill_data for skill_data, _ in entries])
+
+      # One row per (skill, type); a skill listed twice keeps its last details.
+      user_skills = {}
+      for skill_data, skill_type in entries:
+        skill = skills.get(name_key(skill_data['skill_name']))
+        if skill is None:
+          # A placeholder such as "Other"
           continue
-        
-        category = skill_data.get('category', 'General')
-        description = skill_data.get('description', '')
-
-        # Get or create Skill by skill_name (not skill_id)
-        skill_obj, _ = Skill.objects.get_or_create(
-          skill_name=skill_name,
-          defaults={
-            'category': category,
-            'description': description
-          }
-        )
-
-        # Create or update UserSkill
-        skill_instance, _ = UserSkill.objects.update_or_create(
+        user_skills[skill.skill_id, skill_type] = UserSkill(
           user=user,
-          skill=skill_obj,
+          skill=skill,
           skill_type=skill_type,
-          defaults={
-            'proficiency_level': skill_data.get('proficiency_level', ''),
-            'details': skill_data.get('details', '')
-          }
+          proficiency_level=skill_data.get('proficiency_level', ''),
+          details=skill_data.get('details', ''),
         )
-        created_skills.append(skill_instance)
 
-    # Add offerings and desires
-    add_skills(validated_data.get('offerings', []), 'offering')
-    add_skills(validated_data.get('desires', []), 'desiring')
+      created_skills = UserSkill.objects.bulk_create(
+        list(user_skills.values()),
+        update_conflicts=True,
+        unique_fields=['user', 'skill', 'skill_type'],
+        update_fields=['proficiency_level', 'details'],
+      )
+
+      # bulk_create sends no post_save, so invalidate the user's cached skills and
+      # reload the user into the match index directly.
+      response_cache.invalidate(f'user-skills:{user.user_id}')
+      if match_index.is_built:
+        transaction.on_commit(lambda: match_index.refresh_user(user.user_id))
 
     return created_skills
 
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from swapo.response_cache import response_cache
+from .matching import match_index
+from .models import UserSkill
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=UserSkill)
+def index_saved_skill(sender, instance, **kwargs):
+  """Apply an added or edited skill to this process's match index once committed"""
+  if match_index.is_built:
+    values = (instance.user_id, instance.skill_id, instance.skill_type, instance.proficiency_level)
+    transaction.on_commit(lambda: match_index.skill_saved(*values))
+
+
+@receiver(post_delete, sender=UserSkill)
+def unindex_deleted_skill(sender, instance, **kwargs):
+  """Drop a deleted skill from this process's match index once committed"""
+  if match_index.is_built:
+    values = (instance.user_id, instance.skill_id, instance.skill_type)
+    transaction.on_commit(lambda: match_index.skill_deleted(*values))
+
+
+@receiver(post_save, sender=UserSkill)
+@receiver(post_delete, sender=UserSkill)
+def invalidate_cached_user_skills(sender, instance, **kwargs):
+  response_cache.invalidate(f'user-skills:{instance.user_id}')
+
+
+@receiver(post_save, sender=User)
+def index_location(sender, instance, **kwargs):
+  """Location is part of the match score"""
+  if match_index.is_built:
+    values = (instance.user_id, instance.location)
+    transaction.on_commit(lambda: match_index.location_changed(*values))
@@ -1,3 +1,187 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import User
+from skills.models import Skill, SkillCategory
+from userblocks.models import UserBlock
+from .matching import MatchIndex, match_index
+from .models import UserSkill
+
+
+class MatchIndexTests(TestCase):
+  def setUp(self):
+    self.index = MatchIndex()
+    # user 1 offers guitar (10) and wants python (20).
+    self.index.build(
+      rows=[
+        (1, 10, 'offering', 'Expert'), (1, 20, 'desiring', None),
+        (2, 20, 'offering', 'Intermediate'), (2, 10, 'desiring', None),  # reciprocal, same city
+        (3, 20, 'offering', 'Expert'), (3, 10, 'desiring', None),        # reciprocal, more proficient
+        (4, 20, 'offering', 'Expert'),                                   # one-way only
+        (5, 10, 'desiring', None),                                       # one-way only
+      ],
+      locations=[(1, 'Lagos '), (2, 'lagos')],
+    )
+
+  def test_only_reciprocal_pairs_ranked_by_proficiency_and_location(self):
+    matches = self.index.matches(1)
+    self.assertEqual([m.user_id for m in matches], [2, 3])
+    self.assertEqual((matches[0].score, matches[0].same_location), (2 + 3 + 2, True))
+    self.assertEqual((matches[1].score, matches[1].same_location), (3 + 3, False))
+    self.assertEqual((matches[1].they_offer, matches[1].they_want), ([20], [10]))
+
+  def test_incremental_updates(self):
+    self.index.skill_deleted(3, 10, 'desiring')
+    self.index.skill_saved(5, 20, 'offering', 'Intermediate')
+    self.index.skill_saved(2, 20, 'offering', 'Expert')  # re-saved with a new level
+
+    scores = {m.user_id: m.score for m in self.index.matches(1)}
+    self.assertEqual(scores, {2: 3 + 3 + 2, 5: 2 + 3})
+
+  def test_limit_and_exclude(self):
+    self.assertEqual([m.user_id for m in self.index.matches(1, limit=1)], [2])
+    self.assertEqual([m.user_id for m in self.index.matches(1, exclude={2})], [3])
+    self.assertEqual(self.index.matches(4), [])
+
+  def test_wanted_within(self):
+    self.assertEqual([m.user_id for m in self.index.matches(1, wanted_within={20, 30})], [2, 3])
+    self.assertEqual(self.index.matches(1, wanted_within={30}), [])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MatchEndpointTests(TestCase):
+  def setUp(self):
+    match_index.reset()
+    match_index.built_at = None
+    self.guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+    self.python = Skill.objects.create(skill_name="Python", category="Programming")
+    self.me = User.objects.create_user(email="me@example.com")
+    self.partner = User.objects.create_user(email="partner@example.com")
+    UserSkill.objects.create(user=self.me, skill=self.guitar, skill_type='offering')
+    UserSkill.objects.create(user=self.me, skill=self.python, skill_type='desiring')
+    UserSkill.objects.create(user=self.partner, skill=self.python, skill_type='offering', proficiency_level='Expert')
+    self.client = APIClient()
+
+  def matches(self, user):
+    self.client.force_authenticate(user)
+    response = self.client.get("/api/v1/user-skills/matches/")
+    self.assertEqual(response.status_code, 200)
+    return response.json()["results"]
+
+  def test_index_follows_add_and_delete_views(self):
+    self.assertEqual(self.matches(self.me), [])
+
+    self.client.force_authenticate(self.partner)
+    with self.captureOnCommitCallbacks(execute=True):
+      self.client.post(
+        "/api/v1/user-skills/add-skills/", {"desires": [{"skill_name": "Guitar"}]}, format="json"
+      )
+    results = self.matches(self.me)
+    self.assertEqual([r["user"]["user_id"] for r in results], [self.partner.pk])
+    self.assertEqual([s["skill_name"] for s in results[0]["they_offer"]], ["Python"])
+
+    desire = UserSkill.objects.get(user=self.partner, skill_type='desiring')
+    self.client.force_authenticate(self.partner)
+    with self.captureOnCommitCallbacks(execute=True):
+      self.client.delete(f"/api/v1/user-skills/delete/{desire.pk}/")
+    self.assertEqual(self.matches(self.me), [])
+
+  def test_blocked_users_are_left_out(self):
+    UserSkill.objects.create(user=self.partner, skill=self.guitar, skill_type='desiring')
+    self.assertEqual(len(self.matches(self.me)), 1)
+    UserBlock.objects.create(blocker=self.partner, blocked=self.me)
+    self.assertEqual(self.matches(self.me), [])
+
+
+  def test_skills_deleted_behind_the_index_are_skipped(self):
+    UserSkill.objects.create(user=self.partner, skill=self.guitar, skill_type='desiring')
+    match_index.build()
+    # Deleted without signals, as merge_skills' queryset updates or another process would leave it.
+    UserSkill.objects.filter(skill=self.python).delete()
+    Skill.objects.filter(pk=self.python.pk).delete()
+    self.assertEqual(self.matches(self.me), [])
+
+  def test_only_one_request_rebuilds_a_stale_index(self):
+    match_index.build()
+    built_at = match_index.built_at
+    with override_settings(MATCHMAKING_INDEX_MAX_AGE=-1):
+      with match_index.rebuild_lock:
+        # Another request is rebuilding: keep serving the current index.
+        match_index.ensure_fresh()
+        self.assertEqual(match_index.built_at, built_at)
+      match_index.ensure_fresh()
+    self.assertGreater(match_index.built_at, built_at)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AddUserSkillBatchTests(TestCase):
+  def setUp(self):
+    self.me = User.objects.create_user(email="batch@example.com")
+    self.client = APIClient()
+    self.client.force_authenticate(self.me)
+
+  def add(self, payload):
+    with CaptureQueriesContext(connection) as ctx:
+      response = self.client.post("/api/v1/user-skills/add-skills/", payload, format="json")
+    self.assertEqual(response.status_code, 201)
+    return response.json(), len(ctx.captured_queries)
+
+  def payload(self, prefix, count):
+    return {
+      "offerings": [{"skill_name": f"{prefix} offer {n}", "proficiency_level": "Expert"} for n in range(count)],
+      "desires": [{"skill_name": f"{prefix} desire {n}"} for n in range(count)],
+    }
+
+  def test_query_count_does_not_depend_on_batch_size(self):
+    # New skills go to the default category; create it so that neither request has to.
+    SkillCategory.objects.create(name="General")
+    _, small = self.add(self.payload("small", 1))
+    body, large = self.add(self.payload("large", 20))
+    self.assertEqual(len(body["skills"]), 40)
+    self.assertEqual(large, small)
+    # Existing skills only: no insert and no read-back.
+    _, existing = self.add(self.payload("large", 20))
+    self.assertLess(existing, large)
+
+  def test_names_are_canonicalised_and_rows_upserted(self):
+    guitar = Skill.objects.create(skill_name="Guitar", category="Music")
+    body, _ = self.add({
+      "offerings": [
+        {"skill_name": "  guitar ", "proficiency_level": "Beginner"},
+        {"skill_name": "js"},
+        {"skill_name": "Other"},
+      ],
+    })
+    self.assertEqual(sorted(s["skill_name"] for s in body["skills"]), ["Guitar", "JavaScript"])
+    self.assertTrue(all(s["user_skill_id"] for s in body["skills"]))
+
+    self.add({"offerings": [{"skill_name": "GUITAR", "proficiency_level": "Expert"}]})
+    row = UserSkill.objects.get(user=self.me, skill=guitar)
+    self.assertEqual(row.proficiency_level, "Expert")
+    self.assertEqual(UserSkill.objects.filter(user=self.me).count(), 2)
+    self.assertFalse(Skill.objects.filter(skill_name__in=["guitar", "Other"]).exists())
+
+  def test_match_index_sees_bulk_upserts(self):
+    partner = User.objects.create_user(email="batch-partner@example.com")
+    match_index.build()
+    self.client.force_authenticate(partner)
+    with self.captureOnCommitCallbacks(execute=True):
+      self.add({"offerings": [{"skill_name": "Cello"}], "desires": [{"skill_name": "Chess"}]})
+    self.client.force_authenticate(self.me)
+    with self.captureOnCommitCallbacks(execute=True):
+      self.add({"offerings": [{"skill_name": "Chess"}], "desires": [{"skill_name": "cello"}]})
+    self.assertEqual([m.user_id for m in match_index.matches(self.me.user_id)], [partner.user_id])
+
+  def test_cached_public_skills_follow_batch_upserts(self):
+    caches["responses"].clear()
+    public = f"/api/v1/user-skills/{self.me.user_id}/"
+    self.assertEqual(self.client.get(public).json()["offerings"], [])
+    self.assertEqual(self.client.get(public)["X-Cache"], "HIT")
+
+    self.add({"offerings": [{"skill_name": "Guitar", "proficiency_level": "Beginner"}]})
+    response = self.client.get(public)
+    self.assertEqual(response["X-Cache"], "MISS")
+    self.assertEqual([s["skill_name"] for s in response.json()["offerings"]], ["Guitar"])
@@ -5,6 +5,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
 from rest_framework.generics import get_object_or_404
+from django.db.models import Q
+from accounts.serializers import PublicUserSerializer
+from skills.models import Skill
+from skills.serializers import SkillSerializer
+from skills.taxonomy import skills_under
+from swapo.response_cache import cached_response
+from userblocks.models import UserBlock
+from .matching import match_index
 from .models import UserSkill
 from .serializers import UserSkillSerializer, AddUserSkillSerializer
 
@@ -17,6 +25,9 @@ class PublicUserSkillsView(APIView):
   """
   permission_classes = []  # No authentication required
 
+  @cached_response(tags=lambda data, user_id: [f'user-skills:{user_id}'] + [
+    f"skill:{skill['skill']}" for skill in data['offerings'] + data['desires']
+  ])
   def get(self, request, user_id):
     try:
       user = User.objects.get(user_id=user_id)
@@ -83,6 +94,60 @@ class DeleteUserSkillView(APIView):
     )
 
 
+class MatchListView(APIView):
+  """
+  GET /user-skills/matches/?limit=20&category=Programming
+  Users who offer a skill the current user desires and desire a skill the
+  current user offers, best match first. Blocked users (either way) are left out.
+  ?category= (comma-separated) keeps to swaps where the current user learns a
+  skill in one of those categories or below them.
+  """
+  permission_classes = [IsAuthenticated]
+  default_limit = 20
+  max_limit = 100
+
+  def get(self, request):
+    try:
+      limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+    except ValueError:
+      limit = self.default_limit
+
+    user = request.user
+    blocked = set()
+    for blocker_id, blocked_id in UserBlock.objects.filter(
+      Q(blocker=user) | Q(blocked=user)
+    ).values_list('blocker_id', 'blocked_id'):
+      blocked.update((blocker_id, blocked_id))
+
+    categories = [name.strip() for name in request.query_params.get('category', '').split(',') if name.strip()]
+    within = set(skills_under(categories).values_list('skill_id', flat=True)) if categories else None
+
+    match_index.ensure_fresh()
+    matches = match_index.matches(user.user_id, limit=limit, exclude=blocked, wanted_within=within)
+
+    # Two queries for the whole page, however many matches and skills it holds.
+    users = User.objects.in_bulk([match.user_id for match in matches])
+    skills = Skill.objects.in_bulk({
+      skill_id for match in matches for skill_id in match.they_offer + match.they_want
+    })
+
+    return Response({
+      "results": [
+        {
+          "user": PublicUserSerializer(users[match.user_id]).data,
+          "score": match.score,
+          # The index may still hold skills deleted by another process or a merge.
+          "they_offer": SkillSerializer([skills[pk] for pk in match.they_offer if pk in skills], many=True).data,
+          "they_want": SkillSerializer([skills[pk] for pk in match.they_want if pk in skills], many=True).data,
+          "same_location": match.same_location,
+        }
+        for match in matches
+        if match.user_id in users
+        and any(pk in skills for pk in match.they_offer) and any(pk in skills for pk in match.they_want)
+      ]
+    })
+
+
 """
 Example GET request
 GET /user-skills/?user_id=5
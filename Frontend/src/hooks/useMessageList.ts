@@ -7,7 +7,7 @@ export const useMessageList = () => {
     queryKey: ['conversations'],
     queryFn: async () => {
       const res = await axiosInstance.get('messages/conversations/');
-      return res.data;
+      return res.data.results;
     },
   });
 };
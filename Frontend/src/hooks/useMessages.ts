@@ -1,17 +1,80 @@
 // src/hooks/useMessages.ts
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import axios from 'axios';
 import axiosInstance from '@/utils/axiosInstance';
 
+interface ChatMessage {
+  message_id: number;
+  [key: string]: any;
+}
+
+interface Conversation {
+  // Oldest first, like the API returns each page
+  messages: ChatMessage[];
+  // Cursor URL of the page of older messages, null once the start is loaded
+  older: string | null;
+}
+
+const POLL_INTERVAL = 5000;
+
 export const useMessages = (userId?: string | number | null) => {
   const queryClient = useQueryClient();
+  const queryKey = ['messages', userId];
+
+  const fetchLatest = async (): Promise<Conversation> => {
+    const res = await axiosInstance.get(`/messages/conversation/${userId}/`);
+    return { messages: res.data.results, older: res.data.next };
+  };
+
+  // Only fetch what arrived after the last message we hold, following `next`
+  // while the server reports more than one batch waiting.
+  const fetchNewer = async (cached: Conversation): Promise<Conversation> => {
+    const last = cached.messages[cached.messages.length - 1];
+    let messages = cached.messages;
+    let url: string | null =
+      `/messages/conversation/${userId}/?after=${last.message_id}`;
+    while (url) {
+      const res: { data: any } = await axiosInstance.get(url);
+      messages = [...messages, ...res.data.results];
+      url = res.data.has_more ? res.data.next : null;
+    }
+    return { ...cached, messages };
+  };
 
   const messagesQuery = useQuery({
-    queryKey: ['messages', userId],
+    queryKey,
     queryFn: async () => {
-      const res = await axiosInstance.get(`/messages/conversation/${userId}/`);
-      return res.data;
+      const cached = queryClient.getQueryData<Conversation>(queryKey);
+      if (!cached?.messages.length) return fetchLatest();
+      try {
+        return await fetchNewer(cached);
+      } catch (err) {
+        // 400: the last message we hold was deleted; start over from the newest page.
+        if (axios.isAxiosError(err) && err.response?.status === 400) {
+          return fetchLatest();
+        }
+        throw err;
+      }
     },
     enabled: !!userId,
+    refetchInterval: POLL_INTERVAL,
+  });
+
+  const loadOlder = useMutation({
+    mutationFn: async (url: string) => {
+      const res = await axiosInstance.get(url);
+      return res.data as { next: string | null; results: ChatMessage[] };
+    },
+    onSuccess: (page) => {
+      queryClient.setQueryData<Conversation>(queryKey, (current) =>
+        current
+          ? {
+              messages: [...page.results, ...current.messages],
+              older: page.next,
+            }
+          : current,
+      );
+    },
   });
 
   const sendMessage = useMutation({
@@ -28,5 +91,16 @@ export const useMessages = (userId?: string | number | null) => {
     },
   });
 
-  return { ...messagesQuery, sendMessage };
+  const older = messagesQuery.data?.older ?? null;
+
+  return {
+    ...messagesQuery,
+    data: messagesQuery.data?.messages,
+    hasOlder: !!older,
+    loadOlder: () => {
+      if (older && !loadOlder.isPending) loadOlder.mutate(older);
+    },
+    loadingOlder: loadOlder.isPending,
+    sendMessage,
+  };
 };
@@ -2,8 +2,10 @@ import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import axios from '@/utils/axiosInstance';
 
 interface Notification {
-  notification_id: number;
-  user: number;
+  notification_id: number | null;
+  // Set on broadcast (all-user) notifications instead of notification_id
+  broadcast_id?: number;
+  user: number | null;
   message: number | null;
   proposal: number | null;
   trade: number | null;
@@ -42,7 +44,7 @@ export const useNotifications = () => {
     queryKey: ['notifications'],
     queryFn: async () => {
       const response = await axios.get('/notifications/');
-      return response.data as Notification[];
+      return response.data.results as Notification[];
     },
   });
 
@@ -70,10 +72,17 @@ export const useNotifications = () => {
 
   // Mark single notification as read
   const markAsRead = useMutation({
-    mutationFn: async (notificationId: number) => {
-      const response = await axios.patch(`/notifications/${notificationId}/`, {
-        is_read: true,
-      });
+    mutationFn: async (notification: Notification) => {
+      if (notification.broadcast_id) {
+        const response = await axios.post(
+          `/notifications/broadcasts/${notification.broadcast_id}/read/`,
+        );
+        return response.data;
+      }
+      const response = await axios.patch(
+        `/notifications/${notification.notification_id}/`,
+        { is_read: true },
+      );
       return response.data;
     },
     onSuccess: () => {
@@ -7,7 +7,7 @@ export const useTrades = () => {
     queryKey: ["trades"],
     queryFn: async () => {
       const response = await axiosInstance.get("trades/");
-      return response.data;
+      return response.data.results;
     },
   });
 };
@@ -22,6 +22,9 @@ const ChatWindow = ({
     data: messages = [],
     sendMessage,
     isLoading: chatLoading,
+    hasOlder,
+    loadOlder,
+    loadingOlder,
   } = useMessages(selectedChatId);
   const { data: chatList = [] } = useMessageList();
   const navigate = useNavigate();
@@ -53,9 +56,11 @@ const ChatWindow = ({
 
   useEnterKey(handleSend);
 
+  // Scroll only when a newer message arrives, not when older ones are prepended
+  const lastMessageId = messages[messages.length - 1]?.message_id;
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages]);
+  }, [lastMessageId]);
 
   if (chatLoading) return <ChatWindowSkeleton />;
 
@@ -94,6 +99,15 @@ const ChatWindow = ({
 
           {/* Messages */}
           <div className="hide-scrollbar-vertical mb-12 flex flex-1 flex-col space-y-3 overflow-y-auto px-4 py-4">
+            {hasOlder && (
+              <button
+                onClick={loadOlder}
+                disabled={loadingOlder}
+                className="mx-auto cursor-pointer text-sm font-medium text-gray-500 hover:text-gray-700 disabled:cursor-not-allowed dark:text-gray-400 dark:hover:text-gray-200"
+              >
+                {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+              </button>
+            )}
             {messages.map((msg: any, idx: number) => {
               // Get current user ID from profile
               const currentUserId =
@@ -48,6 +48,8 @@ const ListingPage = () => {
   const [search, setSearch] = useState('');
   const [listings, setListings] = useState<Listing[]>([]);
   const [loadingListing, setLoadingListing] = useState(false);
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const [_loadingUserProfile, setLoadingUserProfile] = useState(true);
   const [profile, setProfile] = useState<any>(null);
@@ -66,14 +68,21 @@ const ListingPage = () => {
     fetchProfile();
   }, []);
 
+  // The listings endpoint is cursor-paginated: `next` is the full URL of the following page.
+  const fetchListingPage = async (url: string) => {
+    const res = await fetch(url);
+    if (!res.ok) throw new Error('Failed to fetch listings');
+    const data: { next: string | null; results: Listing[] } = await res.json();
+    return data;
+  };
+
   useEffect(() => {
     const fetchListings = async () => {
       setLoadingListing(true);
       try {
-        const res = await fetch(`${API_BASE_URL}/listings/`);
-        if (!res.ok) throw new Error('Failed to fetch listings');
-        const data: Listing[] = await res.json();
-        setListings(data);
+        const data = await fetchListingPage(`${API_BASE_URL}/listings/`);
+        setListings(data.results);
+        setNextPage(data.next);
       } catch (err) {
         console.error(err);
       } finally {
@@ -83,6 +92,20 @@ const ListingPage = () => {
     fetchListings();
   }, []);
 
+  const loadMoreListings = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await fetchListingPage(nextPage);
+      setListings((prev) => [...prev, ...data.results]);
+      setNextPage(data.next);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Map API data to component format
   const mappedListings = listings.map((l) => ({
     ...l,
@@ -263,11 +286,21 @@ const ListingPage = () => {
             );
           })}
 
-          {filteredListings.length === 0 && (
+          {filteredListings.length === 0 && !nextPage && (
             <p className="col-span-full mt-10 text-center text-gray-500">
               No results found.
             </p>
           )}
+
+          {nextPage && (
+            <Button
+              onClick={loadMoreListings}
+              disabled={loadingMore}
+              className="rounded-xl bg-gray-100 py-2 text-sm text-gray-900 hover:bg-gray-200 dark:bg-gray-700 dark:text-white"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </Button>
+          )}
         </div>
       )}
 
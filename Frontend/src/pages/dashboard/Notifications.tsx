@@ -17,6 +17,8 @@ const Notifications = () => {
         'trade_proposal',
         'trade_accepted',
         'trade_active',
+        'trade_completed',
+        'trade_cancelled',
         'system_alert',
       ].includes(n.type),
     );
@@ -58,7 +60,7 @@ const Notifications = () => {
   const handleNotificationClick = (notification: (typeof notifications)[0]) => {
     // Mark as read
     if (!notification.is_read) {
-      markAsRead.mutate(notification.notification_id);
+      markAsRead.mutate(notification);
     }
 
     // Navigate based on notification type
@@ -90,6 +92,8 @@ const Notifications = () => {
         break;
       case 'trade_accepted':
       case 'trade_active':
+      case 'trade_completed':
+      case 'trade_cancelled':
         if (notification.trade_details) {
           navigate(
             `/app/dashboard/trade/${notification.trade_details.trade_id}`,
@@ -113,11 +117,15 @@ const Notifications = () => {
           ? `Message from ${notification.sender_details.first_name || notification.sender_details.username}`
           : 'New Message';
       case 'trade_proposal':
-        return 'New Trade Proposal';
+        return 'Trade Proposal';
       case 'trade_accepted':
         return 'Trade Accepted';
       case 'trade_active':
         return 'Active Trade';
+      case 'trade_completed':
+        return 'Trade Completed';
+      case 'trade_cancelled':
+        return 'Trade Cancelled';
       case 'system_alert':
         return 'System Announcement';
       default:
@@ -194,7 +202,7 @@ const Notifications = () => {
                   <div className="grid gap-3 md:gap-4">
                     {grouped.today.map((n) => (
                       <div
-                        key={n.notification_id}
+                        key={n.broadcast_id ? `broadcast-${n.broadcast_id}` : n.notification_id}
                         onClick={() => handleNotificationClick(n)}
                         className="flex cursor-pointer items-start gap-3 rounded-xl bg-white p-4 shadow-sm transition hover:bg-gray-50 md:p-5 dark:bg-gray-700 dark:hover:bg-gray-600"
                       >
@@ -248,7 +256,7 @@ const Notifications = () => {
                   <div className="grid gap-3 md:gap-4">
                     {grouped.yesterday.map((n) => (
                       <div
-                        key={n.notification_id}
+                        key={n.broadcast_id ? `broadcast-${n.broadcast_id}` : n.notification_id}
                         onClick={() => handleNotificationClick(n)}
                         className="flex cursor-pointer items-start gap-3 rounded-xl bg-white p-4 shadow-sm transition hover:bg-gray-50 md:p-5 dark:bg-gray-700 dark:hover:bg-gray-600"
                       >
@@ -295,7 +303,7 @@ const Notifications = () => {
                   <div className="grid gap-3 md:gap-4">
                     {grouped.older.map((n) => (
                       <div
-                        key={n.notification_id}
+                        key={n.broadcast_id ? `broadcast-${n.broadcast_id}` : n.notification_id}
                         onClick={() => handleNotificationClick(n)}
                         className="flex cursor-pointer gap-3 rounded-xl bg-white p-4 text-left shadow-sm transition hover:bg-gray-50 md:p-5 dark:bg-gray-700 dark:hover:bg-gray-600"
                       >